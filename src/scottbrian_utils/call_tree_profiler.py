@@ -0,0 +1,461 @@
+"""Module call_tree_profiler.
+
+================
+CallTreeProfiler
+================
+
+The CallTreeProfiler class builds an aggregated call tree of the
+functions traced with etrace (scottbrian_utils.entry_trace). The entry
+and exit events of each thread are matched with a stack that is kept
+for each thread, and the calls are aggregated by their call path (the
+traced functions from the outermost to the innermost) with the number
+of calls, the inclusive time (time spent in the function and the traced
+functions that it calls), and the exclusive time (time spent in the
+function itself) of each path. Only the instrumented functions appear
+in the tree, so the overhead is much less than that of cProfile.
+
+The CallTreeProfiler is passed to etrace with its recorder argument, or
+the events of a TraceRecorder (scottbrian_utils.trace_recorder) can be
+added to it with add_events. The hottest call paths can then be written
+as a table, or all call paths can be written as folded stacks for the
+common flamegraph tools, including at the end of the process.
+
+:Example: find the hottest call path
+
+>>> import time
+>>> from scottbrian_utils.entry_trace import etrace
+>>> from scottbrian_utils.call_tree_profiler import CallTreeProfiler
+>>> profiler = CallTreeProfiler()
+>>> @etrace(recorder=profiler)
+... def f2() -> None:
+...     time.sleep(0.01)
+>>> @etrace(recorder=profiler)
+... def f1() -> None:
+...     f2()
+>>> f1()
+>>> hot_path = profiler.get_hot_paths(top_n=1)[0]
+>>> print([name.split("::")[1].split(":")[0] for name in hot_path.path])
+['f1', 'f2']
+>>> print(hot_path.num_calls)
+1
+
+
+The call_tree_profiler module contains:
+
+    1) CallPathStats NamedTuple
+    2) CallTreeProfiler class with methods:
+
+       a. add_events
+       b. clear
+       c. get_call_paths
+       d. get_hot_paths
+       e. record
+       f. register
+       g. write_at_exit
+       h. write_folded_stacks
+       i. write_hot_paths
+
+"""
+
+########################################################################
+# Standard Library
+########################################################################
+import atexit
+import sys
+import threading
+import time
+from collections.abc import Iterable
+from os import PathLike
+from typing import NamedTuple, Optional, TextIO, Union
+
+########################################################################
+# Third Party
+########################################################################
+
+########################################################################
+# Local
+########################################################################
+from scottbrian_utils.trace_recorder import TraceEvent
+
+
+########################################################################
+# CallPathStats
+########################################################################
+class CallPathStats(NamedTuple):
+    """The aggregated calls of a call path."""
+
+    path: tuple[str, ...]
+    num_calls: int
+    inclusive_ns: int
+    exclusive_ns: int
+
+
+########################################################################
+# _CallNode class
+########################################################################
+class _CallNode:
+    """Node of the call tree of a thread."""
+
+    __slots__ = ("func_id", "count", "inclusive_ns", "children")
+
+    def __init__(self, func_id: int) -> None:
+        """Initialize the object.
+
+        Args:
+            func_id: the function id of the node, -1 for the root
+
+        """
+        self.func_id = func_id
+        self.count = 0
+        self.inclusive_ns = 0
+        self.children: dict[int, _CallNode] = {}
+
+
+# the stack of a thread has the root node at the bottom and then the
+# node and start time of each call that has not yet exited
+CallStack = list[tuple[_CallNode, int]]
+
+
+########################################################################
+# CallTreeProfiler class
+########################################################################
+class CallTreeProfiler:
+    """Aggregated call tree of the traced functions."""
+
+    ####################################################################
+    # __init__
+    ####################################################################
+    def __init__(self) -> None:
+        """Initialize the object."""
+        self._func_names: list[str] = []
+        self._func_ids: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        # each thread builds its own tree without a lock, and the trees
+        # are combined when the results are requested
+        self._local = threading.local()
+        self._roots: list[_CallNode] = []
+
+    ####################################################################
+    # __repr__
+    ####################################################################
+    def __repr__(self) -> str:
+        """Return a repr of the class.
+
+        Returns:
+            repr of the class
+
+        """
+        return f"{type(self).__name__}()"
+
+    ####################################################################
+    # register
+    ####################################################################
+    def register(self, func_name: str) -> int:
+        """Register a function and return its function id.
+
+        Args:
+            func_name: the name of the function as it is to appear in
+                the call paths
+
+        Returns:
+            The function id to pass to record
+
+        """
+        with self._lock:
+            return self._register(func_name)
+
+    ####################################################################
+    # _register
+    ####################################################################
+    def _register(self, func_name: str) -> int:
+        """Register a function while holding the lock.
+
+        Args:
+            func_name: the name of the function
+
+        Returns:
+            The function id of the function
+
+        """
+        try:
+            return self._func_ids[func_name]
+        except KeyError:
+            self._func_names.append(func_name)
+            func_id = self._func_ids[func_name] = len(self._func_names) - 1
+            return func_id
+
+    ####################################################################
+    # _new_stack
+    ####################################################################
+    def _new_stack(self) -> CallStack:
+        """Return a stack with a new root node for a thread.
+
+        Returns:
+            The new stack
+
+        """
+        root = _CallNode(-1)
+        with self._lock:
+            self._roots.append(root)
+        return [(root, 0)]
+
+    ####################################################################
+    # record
+    ####################################################################
+    def record(self, func_id: int, is_entry: bool) -> None:
+        """Record an entry or exit of the current thread.
+
+        Args:
+            func_id: the function id returned by register
+            is_entry: True for an entry, False for an exit
+
+        """
+        try:
+            stack = self._local.stack
+        except AttributeError:
+            stack = self._local.stack = self._new_stack()
+
+        self._add_event(stack, func_id, is_entry, time.perf_counter_ns())
+
+    ####################################################################
+    # add_events
+    ####################################################################
+    def add_events(self, events: Iterable[TraceEvent]) -> None:
+        """Add events recorded by a TraceRecorder.
+
+        The events of each thread are added to a new tree, so the calls
+        that were not complete when the events were recorded are not
+        included.
+
+        Args:
+            events: the events in time order, as returned by the
+                get_events method of TraceRecorder
+
+        """
+        stacks: dict[int, CallStack] = {}
+        for event in events:
+            try:
+                stack = stacks[event.thread_id]
+            except KeyError:
+                stack = stacks[event.thread_id] = self._new_stack()
+
+            with self._lock:
+                func_id = self._register(event.func_name)
+            self._add_event(stack, func_id, event.is_entry, event.time_ns)
+
+    ####################################################################
+    # _add_event
+    ####################################################################
+    @staticmethod
+    def _add_event(
+        stack: CallStack, func_id: int, is_entry: bool, time_ns: int
+    ) -> None:
+        """Add an entry or exit to the tree of a thread.
+
+        Args:
+            stack: the stack of the thread
+            func_id: the function id
+            is_entry: True for an entry, False for an exit
+            time_ns: the time of the event in nanoseconds
+
+        """
+        if is_entry:
+            parent = stack[-1][0]
+            try:
+                node = parent.children[func_id]
+            except KeyError:
+                node = parent.children[func_id] = _CallNode(func_id)
+            stack.append((node, time_ns))
+            return
+
+        # an exit normally matches the most recent entry, but a
+        # generator can be entered in one function and complete after
+        # that function has exited, in which case the calls above its
+        # entry are ended with it. An exit with no entry (e.g., for a
+        # call that started before the profiling) is ignored.
+        for idx in range(len(stack) - 1, 0, -1):
+            if stack[idx][0].func_id == func_id:
+                break
+        else:
+            return
+
+        while len(stack) > idx:
+            node, start_ns = stack.pop()
+            node.count += 1
+            node.inclusive_ns += time_ns - start_ns
+
+    ####################################################################
+    # clear
+    ####################################################################
+    def clear(self) -> None:
+        """Remove all recorded calls."""
+        with self._lock:
+            self._local = threading.local()
+            self._roots = []
+
+    ####################################################################
+    # get_call_paths
+    ####################################################################
+    def get_call_paths(self) -> list[CallPathStats]:
+        """Return the aggregated calls of each call path.
+
+        Returns:
+            The stats of each call path, combined for all threads and
+            sorted by path
+
+        """
+        func_names = self._func_names
+        totals: dict[tuple[str, ...], list[int]] = {}
+
+        def add_node(node: _CallNode, path: tuple[str, ...]) -> None:
+            path = path + (func_names[node.func_id],)
+            children = list(node.children.values())
+            child_ns = sum(child.inclusive_ns for child in children)
+            # a call that has not exited is not included, but the calls
+            # that it made are
+            if node.count:
+                total = totals.setdefault(path, [0, 0, 0])
+                total[0] += node.count
+                total[1] += node.inclusive_ns
+                total[2] += node.inclusive_ns - child_ns
+            for child in children:
+                add_node(child, path)
+
+        with self._lock:
+            roots = list(self._roots)
+        for root in roots:
+            for node in list(root.children.values()):
+                add_node(node, ())
+
+        return [
+            CallPathStats(
+                path=path,
+                num_calls=num_calls,
+                inclusive_ns=inclusive_ns,
+                exclusive_ns=excl_ns,
+            )
+            for path, (num_calls, inclusive_ns, excl_ns) in sorted(totals.items())
+        ]
+
+    ####################################################################
+    # get_hot_paths
+    ####################################################################
+    def get_hot_paths(
+        self, top_n: int = 10, inclusive: bool = False
+    ) -> list[CallPathStats]:
+        """Return the call paths with the most time.
+
+        Args:
+            top_n: the number of call paths to return
+            inclusive: if True, the paths are ranked by their inclusive
+                time, otherwise by their exclusive time
+
+        Returns:
+            The stats of the hottest call paths, hottest first
+
+        """
+        call_paths = self.get_call_paths()
+        if inclusive:
+            call_paths.sort(key=lambda stats: stats.inclusive_ns, reverse=True)
+        else:
+            call_paths.sort(key=lambda stats: stats.exclusive_ns, reverse=True)
+
+        return call_paths[:top_n]
+
+    ####################################################################
+    # write_hot_paths
+    ####################################################################
+    def write_hot_paths(
+        self,
+        stream: Union[TextIO, str, PathLike[str]],
+        top_n: int = 10,
+        inclusive: bool = False,
+    ) -> None:
+        """Write the call paths with the most time as a table.
+
+        Args:
+            stream: the stream or the name of the file to write to
+            top_n: the number of call paths to write
+            inclusive: if True, the paths are ranked by their inclusive
+                time, otherwise by their exclusive time
+
+        """
+        lines = [
+            f"{'exclusive_ns':>14} {'inclusive_ns':>14} {'num_calls':>9}  call path"
+        ]
+        for stats in self.get_hot_paths(top_n=top_n, inclusive=inclusive):
+            lines.append(
+                f"{stats.exclusive_ns:>14} {stats.inclusive_ns:>14} "
+                f"{stats.num_calls:>9}  {' -> '.join(stats.path)}"
+            )
+        self._write_lines(stream, lines)
+
+    ####################################################################
+    # write_folded_stacks
+    ####################################################################
+    def write_folded_stacks(self, stream: Union[TextIO, str, PathLike[str]]) -> None:
+        """Write the call paths in folded format.
+
+        Each line has the names of the functions of a call path,
+        outermost first, separated by semicolons, followed by a space
+        and the exclusive time in nanoseconds.
+
+        Args:
+            stream: the stream or the name of the file to write to
+
+        """
+        lines = [
+            f"{';'.join(name.replace(';', ':') for name in stats.path)} "
+            f"{stats.exclusive_ns}"
+            for stats in self.get_call_paths()
+            if stats.exclusive_ns > 0
+        ]
+        self._write_lines(stream, lines)
+
+    ####################################################################
+    # write_at_exit
+    ####################################################################
+    def write_at_exit(
+        self,
+        stream: Optional[Union[TextIO, str, PathLike[str]]] = None,
+        top_n: int = 10,
+        inclusive: bool = False,
+    ) -> None:
+        """Write the hottest call paths when the process ends.
+
+        Args:
+            stream: the stream or the name of the file to write to. The
+                default is sys.stderr.
+            top_n: the number of call paths to write
+            inclusive: if True, the paths are ranked by their inclusive
+                time, otherwise by their exclusive time
+
+        """
+        atexit.register(
+            self.write_hot_paths,
+            sys.stderr if stream is None else stream,
+            top_n=top_n,
+            inclusive=inclusive,
+        )
+
+    ####################################################################
+    # _write_lines
+    ####################################################################
+    @staticmethod
+    def _write_lines(
+        stream: Union[TextIO, str, PathLike[str]], lines: list[str]
+    ) -> None:
+        """Write lines to a stream or file.
+
+        Args:
+            stream: the stream or the name of the file to write to
+            lines: the lines to write
+
+        """
+        text = "".join(f"{line}\n" for line in lines)
+        if isinstance(stream, (str, PathLike)):
+            with open(stream, "w", encoding="utf-8") as file:
+                file.write(text)
+        else:
+            stream.write(text)
@@ -33,13 +33,23 @@ coded in a module, however, you will see the module name instead of
 ########################################################################
 # Standard Library
 ########################################################################
+import atexit
+import heapq
+import logging
+import os
 import sys
+import threading
+import time
 import types
+import weakref
+from collections import deque, OrderedDict
+from collections.abc import Iterable
+from dataclasses import dataclass
 from datetime import datetime
-from os import fspath
+from os import fspath, PathLike
 from pathlib import Path
 from types import FrameType
-from typing import Any, NamedTuple
+from typing import Any, NamedTuple, Optional, TextIO, Union
 
 ########################################################################
 # Third Party
@@ -47,12 +57,71 @@ from typing import Any, NamedTuple
 ########################################################################
 # Local
 ########################################################################
+from scottbrian_utils.log_queue import LogQueue
 
 # diag_msg_datetime_fmt = "%b %d %H:%M:%S.%f"
 diag_msg_datetime_fmt = "%H:%M:%S.%f"
 diag_msg_caller_depth = 1
 get_formatted_call_seq_depth = 3
 
+# Specifying this as the dt_format shows the number of nanoseconds since
+# the module was imported, taken from time.perf_counter_ns, instead of
+# the datetime.
+diag_msg_perf_counter_fmt = "perf_counter_ns"
+_perf_counter_base = time.perf_counter_ns()
+
+# For each dt_format that can be split around its %f directive, the
+# formatted text before and after the %f is cached for the most recent
+# second so that only the microseconds need to be formatted per call.
+_timestamp_cache: dict[str, tuple[int, str, Optional[str]]] = {}
+
+# The module, class, and function names for a frame depend only on its
+# code object, so they are cached here by code object and only the line
+# number is taken from the frame on each call. Only the most recently
+# used code objects are kept so that the cache does not hold on to the
+# code of every function that ever called diag_msg.
+diag_msg_code_info_cache_size = 4096
+_code_info_cache: OrderedDict[types.CodeType, tuple[str, str, str]] = OrderedDict()
+_code_info_cache_lock = threading.Lock()
+
+# The display name for a module is cached by co_filename so that the
+# Path object needed to get it is only built once per source file.
+_mod_name_cache: dict[str, str] = {}
+_mod_name_prefixes: tuple[str, ...] = ()
+
+
+# diag_msg can be disabled globally or for selected modules, either with
+# the following environment variables or at runtime with function
+# set_diag_msg_enabled
+diag_msg_enabled_env_var = "SCOTTBRIAN_UTILS_DIAG_MSG"
+diag_msg_disabled_modules_env_var = "SCOTTBRIAN_UTILS_DIAG_MSG_DISABLED_MODULES"
+
+_diag_msg_enabled: bool = os.environ.get(
+    diag_msg_enabled_env_var, "1"
+).strip().lower() not in ("0", "false", "no", "off")
+_diag_msg_disabled_modules: frozenset[str] = frozenset(
+    mod.strip()
+    for mod in os.environ.get(diag_msg_disabled_modules_env_var, "").split(",")
+    if mod.strip()
+)
+_diag_msg_lazy: bool = False
+
+
+@dataclass
+class RateLimitState:
+    """Rate limiting state for one diag_msg call site."""
+
+    calls: int = 0
+    tokens: float = 0.0
+    last_time: float = 0.0
+    suppressed: int = 0
+
+
+# rate limiting state for each call site that specifies max_per_sec or
+# every_nth, keyed by the code object and line number of the call
+_rate_limits: dict[tuple[types.CodeType, int], RateLimitState] = {}
+_rate_limits_lock = threading.Lock()
+
 
 class CallerInfo(NamedTuple):
     """NamedTuple for the caller info used in diag_msg."""
@@ -63,6 +132,26 @@ class CallerInfo(NamedTuple):
     line_num: int
 
 
+class DiagMsgEntry(NamedTuple):
+    """NamedTuple for a diag_msg captured in lazy mode."""
+
+    timestamp: float
+    perf_ns: int
+    call_seq: list[tuple[types.CodeType, int]]
+    dt_format: str
+    args: tuple[Any, ...]
+    kwargs: dict[str, Any]
+
+
+# entries captured in lazy mode that are waiting to be written, of
+# which only the most recent max_pending are kept, with a count of the
+# older entries that were dropped, both guarded by the pending lock
+diag_msg_max_pending = 10_000
+_pending_diag_msgs: deque[DiagMsgEntry] = deque(maxlen=diag_msg_max_pending)
+_pending_dropped: int = 0
+_pending_lock = threading.Lock()
+
+
 ########################################################################
 # diag_msg
 ########################################################################
@@ -70,6 +159,8 @@ def diag_msg(
     *args: Any,
     depth: int = diag_msg_caller_depth,
     dt_format: str = diag_msg_datetime_fmt,
+    max_per_sec: Optional[float] = None,
+    every_nth: int = 1,
     **kwargs: Any,
 ) -> None:
     """Print diagnostic message.
@@ -79,6 +170,9 @@ def diag_msg(
         depth:  specifies how many callers to include in the call
                   sequence
         dt_format: datetime format to use
+        max_per_sec: if specified, the most messages per second that
+            are printed from this call site
+        every_nth: only every nth call from this call site is printed
         kwargs: keyword args to pass along to the print statement
 
     :Example: print a diagnostic message from a method with a seq depth
@@ -105,14 +199,752 @@ def diag_msg(
     >>> Cls1().f1(24)
     Tue Feb-16 10:38:32 <input>::Cls1.f1:4 diagnostic info 24
 
+    Notes:
+        1) diag_msg returns without doing anything when it has been
+           disabled, either globally or for the module of the caller,
+           with set_diag_msg_enabled or with the environment variables
+           named by diag_msg_enabled_env_var and
+           diag_msg_disabled_modules_env_var.
+        2) In lazy mode (see set_diag_msg_lazy), diag_msg only captures
+           the time, the code objects and line numbers of the callers,
+           and the args. The message is formatted and printed later by
+           flush_diag_msgs, so the args are kept alive until then and
+           a mutable arg is shown as it is at the flush. Only the most
+           recent captured messages are kept.
+        3) Specifying diag_msg_perf_counter_fmt as the dt_format shows
+           the nanoseconds since the diag_msg module was imported
+           instead of the datetime.
+        4) When max_per_sec or every_nth is specified, the call site is
+           identified by the code object and line number of the caller.
+           A suppressed call returns without walking the stack. The
+           next message printed from the call site ends with the number
+           of messages suppressed since the previous one, and
+           report_diag_msg_suppressed prints the counts that have not
+           yet been reported.
+
     """
-    # we specify 2 frames back since we don't want our call in the
+    global _pending_dropped
+
+    if not _diag_msg_enabled:
+        return
+
+    if _diag_msg_disabled_modules and (
+        sys._getframe(1).f_globals.get("__name__") in _diag_msg_disabled_modules
+    ):
+        return
+
+    if max_per_sec is not None or every_nth > 1:
+        frame = sys._getframe(1)
+        suppressed = _check_rate_limit(
+            frame.f_code, frame.f_lineno, max_per_sec, every_nth
+        )
+        del frame
+        if suppressed < 0:
+            return
+        if suppressed:
+            args = (*args, f"({suppressed} suppressed)")
+
+    if _diag_msg_lazy:
+        # we specify 1 frame back since we don't want our call in the
+        # sequence
+        entry = DiagMsgEntry(
+            timestamp=time.time(),
+            perf_ns=(
+                time.perf_counter_ns() if dt_format == diag_msg_perf_counter_fmt else 0
+            ),
+            call_seq=_get_call_codes(1, depth),
+            dt_format=dt_format,
+            args=args,
+            kwargs=kwargs,
+        )
+        with _pending_lock:
+            # the oldest entry is dropped by the append when the deque
+            # is full
+            if len(_pending_diag_msgs) == _pending_diag_msgs.maxlen:
+                _pending_dropped += 1
+            _pending_diag_msgs.append(entry)
+        return
+
+    # we specify 1 frame back since we don't want our call in the
     # sequence
     caller_sequence = get_formatted_call_sequence(1, depth)
 
-    str_time = datetime.now().strftime(dt_format)
+    timestamp = time.time()
+    if dt_format == diag_msg_perf_counter_fmt:
+        str_time = str(time.perf_counter_ns() - _perf_counter_base)
+    else:
+        str_time = format_timestamp(timestamp, dt_format)
+
+    _write_diag_msg(timestamp, f"{str_time} {caller_sequence}", args, kwargs)
+
+
+########################################################################
+# format_timestamp
+########################################################################
+def format_timestamp(timestamp: float, dt_format: str = diag_msg_datetime_fmt) -> str:
+    """Return the timestamp formatted as a local datetime.
+
+    Args:
+        timestamp: the time in seconds since the epoch as returned by
+            time.time()
+        dt_format: datetime format to use
+
+    Returns:
+        The same string as datetime.fromtimestamp(timestamp).strftime(
+        dt_format)
+
+    :Example: format a timestamp
+
+    >>> from scottbrian_utils.diag_msg import format_timestamp
+    >>> import time
+    >>> print(format_timestamp(time.time(), '%H:%M:%S.%f'))
+    16:20:05.909260
+
+    Notes:
+        1) The text of the format before and after the %f directive is
+           cached for the most recent second of each dt_format, so for
+           all but the first call in a second only the microseconds are
+           formatted.
+        2) A dt_format with more than one %f or with a %% escape is
+           formatted in full on each call.
+
+    """
+    seconds = int(timestamp // 1)
+    # round the same way datetime.fromtimestamp does
+    micros = round((timestamp - seconds) * 1_000_000)
+    if micros >= 1_000_000:
+        seconds += 1
+        micros -= 1_000_000
+
+    cached = _timestamp_cache.get(dt_format)
+    if cached is None or cached[0] != seconds:
+        parts = dt_format.split("%f")
+        if len(parts) > 2 or "%%" in dt_format:
+            return datetime.fromtimestamp(timestamp).strftime(dt_format)
+        date_time = datetime.fromtimestamp(seconds)
+        cached = (
+            seconds,
+            date_time.strftime(parts[0]),
+            date_time.strftime(parts[1]) if len(parts) == 2 else None,
+        )
+        _timestamp_cache[dt_format] = cached
 
-    print(f"{str_time} {caller_sequence}", *args, **kwargs)
+    if cached[2] is None:
+        return cached[1]
+
+    return f"{cached[1]}{micros:06d}{cached[2]}"
+
+
+########################################################################
+# _check_rate_limit
+########################################################################
+def _check_rate_limit(
+    code: types.CodeType,
+    line_num: int,
+    max_per_sec: Optional[float],
+    every_nth: int,
+) -> int:
+    """Determine whether a diag_msg call is within its rate limits.
+
+    Args:
+        code: code object of the caller
+        line_num: line number of the call
+        max_per_sec: the most messages per second for the call site
+        every_nth: only every nth call from the call site is printed
+
+    Returns:
+        -1 if the call is to be suppressed, otherwise the number of
+        calls suppressed since the previous printed message
+
+    """
+    key = (code, line_num)
+    with _rate_limits_lock:
+        state = _rate_limits.get(key)
+        if state is None:
+            state = RateLimitState()
+            _rate_limits[key] = state
+
+        state.calls += 1
+        if every_nth > 1 and (state.calls - 1) % every_nth:
+            state.suppressed += 1
+            return -1
+
+        if max_per_sec is not None:
+            # token bucket that allows a burst of up to max_per_sec
+            # messages, refilled at max_per_sec tokens per second
+            now = time.monotonic()
+            capacity = max(1.0, max_per_sec)
+            if state.calls == 1:
+                state.tokens = capacity
+            else:
+                state.tokens = min(
+                    capacity, state.tokens + (now - state.last_time) * max_per_sec
+                )
+            state.last_time = now
+            if state.tokens < 1.0:
+                state.suppressed += 1
+                return -1
+            state.tokens -= 1.0
+
+        suppressed = state.suppressed
+        state.suppressed = 0
+
+    return suppressed
+
+
+########################################################################
+# report_diag_msg_suppressed
+########################################################################
+def report_diag_msg_suppressed() -> None:
+    """Print the number of rate limited messages not yet reported.
+
+    For each call site with messages suppressed since its last printed
+    message, a message with the count is printed and the count is
+    reset.
+
+    :Example: report the suppressed messages of a loop
+
+    >>> from scottbrian_utils.diag_msg import (diag_msg,
+    ...     report_diag_msg_suppressed)
+    >>> for idx in range(10):
+    ...     diag_msg('loop', idx, every_nth=4)
+    16:20:05.909260 <input>:2 loop 0
+    16:20:05.909260 <input>:2 loop 4 (3 suppressed)
+    16:20:05.909260 <input>:2 loop 8 (3 suppressed)
+    >>> report_diag_msg_suppressed()
+    16:20:05.909260 <input>:2 1 diag_msg calls suppressed
+
+    """
+    with _rate_limits_lock:
+        reports = [
+            (key, state.suppressed)
+            for key, state in _rate_limits.items()
+            if state.suppressed
+        ]
+        for key, _ in reports:
+            _rate_limits[key].suppressed = 0
+
+    for (code, line_num), suppressed in reports:
+        timestamp = time.time()
+        caller_sequence = _format_call_sequence([_get_caller_info(code, line_num)])
+        _write_diag_msg(
+            timestamp,
+            f"{format_timestamp(timestamp)} {caller_sequence}",
+            (f"{suppressed} diag_msg calls suppressed",),
+            {},
+        )
+
+
+########################################################################
+# reset_diag_msg_rate_limits
+########################################################################
+def reset_diag_msg_rate_limits() -> None:
+    """Discard the rate limiting state and counts of all call sites."""
+    with _rate_limits_lock:
+        _rate_limits.clear()
+
+
+########################################################################
+# _write_diag_msg
+########################################################################
+def _write_diag_msg(
+    timestamp: float, prefix: str, args: tuple[Any, ...], kwargs: dict[str, Any]
+) -> None:
+    """Write a diag_msg to the log queue or writer or print it.
+
+    Args:
+        timestamp: time of the diag_msg call
+        prefix: the formatted time and call sequence
+        args: the text to print as part of the diagnostic message
+        kwargs: keyword args to pass along to the print statement
+
+    """
+    log_queue = _diag_msg_log_queue
+    if log_queue is not None and "file" not in kwargs:
+        sep = kwargs.get("sep")
+        log_queue.log(
+            _diag_msg_logger,
+            _diag_msg_log_level,
+            (" " if sep is None else sep).join([prefix, *map(str, args)]),
+        )
+        return
+
+    writer = _diag_msg_writer
+    if writer is None or "file" in kwargs:
+        print(prefix, *args, **kwargs)
+        return
+
+    sep = kwargs.get("sep")
+    end = kwargs.get("end")
+    if not writer.add(
+        timestamp,
+        (" " if sep is None else sep).join([prefix, *map(str, args)])
+        + ("\n" if end is None else end),
+    ):
+        # the writer was stopped after it was fetched
+        print(prefix, *args, **kwargs)
+
+
+########################################################################
+# set_diag_msg_enabled
+########################################################################
+def set_diag_msg_enabled(enabled: bool, module: Optional[str] = None) -> None:
+    """Enable or disable diag_msg.
+
+    Args:
+        enabled: if True, enable diag_msg, otherwise disable it
+        module: name of the module (its __name__) for which diag_msg
+            is to be enabled or disabled. If None, diag_msg is enabled
+            or disabled globally.
+
+    Notes:
+        1) A disabled diag_msg call returns immediately without walking
+           the stack or formatting the time, so diag_msg calls can be
+           left in production code.
+        2) A module is disabled if it is disabled either by name or
+           globally.
+
+    :Example: disable diag_msg and enable it again
+
+    >>> from scottbrian_utils.diag_msg import (diag_msg,
+    ...     set_diag_msg_enabled)
+    >>> set_diag_msg_enabled(False)
+    >>> diag_msg('this message is not printed')
+    >>> set_diag_msg_enabled(True)
+
+    """
+    global _diag_msg_enabled, _diag_msg_disabled_modules
+
+    if module is None:
+        _diag_msg_enabled = enabled
+    elif enabled:
+        _diag_msg_disabled_modules = _diag_msg_disabled_modules - {module}
+    else:
+        _diag_msg_disabled_modules = _diag_msg_disabled_modules | {module}
+
+
+########################################################################
+# set_diag_msg_lazy
+########################################################################
+def set_diag_msg_lazy(lazy: bool, max_pending: int = diag_msg_max_pending) -> None:
+    """Set lazy mode for diag_msg.
+
+    Args:
+        lazy: if True, diag_msg captures its message and defers the
+            formatting and printing until flush_diag_msgs is called. If
+            False, any captured messages are flushed and diag_msg
+            formats and prints each message when it is called.
+        max_pending: the most captured messages that are kept. When
+            another message is captured, the oldest one is dropped.
+
+    Raises:
+        ValueError: max_pending is less than 1
+
+    Notes:
+        1) Captured messages are also flushed when the program exits.
+        2) The args are captured by reference and formatted at the
+           flush, so any changes made to mutable args before the flush
+           will appear in the message, and the args are not freed until
+           then. Pass str(arg) to show an arg as it is at the call.
+        3) The number of dropped messages is printed by the next
+           flush_diag_msgs ahead of the captured messages.
+
+    :Example: defer the formatting of diagnostic messages
+
+    >>> from scottbrian_utils.diag_msg import (diag_msg,
+    ...     flush_diag_msgs, set_diag_msg_lazy)
+    >>> set_diag_msg_lazy(True)
+    >>> diag_msg('deferred message')
+    >>> print('before flush')
+    before flush
+    >>> flush_diag_msgs()
+    16:20:05.909260 <input>:1 deferred message
+    >>> set_diag_msg_lazy(False)
+
+    """
+    global _diag_msg_lazy, _pending_diag_msgs, _pending_dropped
+
+    if max_pending < 1:
+        raise ValueError(f"diag_msg max_pending of {max_pending} is less than 1")
+
+    if max_pending != _pending_diag_msgs.maxlen:
+        flush_diag_msgs()
+        # the entries captured since the flush are kept in the new deque
+        with _pending_lock:
+            _pending_dropped += max(0, len(_pending_diag_msgs) - max_pending)
+            _pending_diag_msgs = deque(_pending_diag_msgs, maxlen=max_pending)
+
+    _diag_msg_lazy = lazy
+    if not lazy:
+        flush_diag_msgs()
+
+
+########################################################################
+# flush_diag_msgs
+########################################################################
+def flush_diag_msgs() -> None:
+    """Format and print the messages captured in lazy mode."""
+    global _pending_dropped
+
+    with _pending_lock:
+        dropped = _pending_dropped
+        _pending_dropped = 0
+
+    if dropped:
+        timestamp = time.time()
+        _write_diag_msg(
+            timestamp,
+            f"{format_timestamp(timestamp)} "
+            f"{get_formatted_call_sequence(latest=1, depth=1)}",
+            (f"{dropped} lazy diag_msg calls dropped",),
+            {},
+        )
+
+    while True:
+        with _pending_lock:
+            if not _pending_diag_msgs:
+                break  # another thread may have flushed the last entry
+            entry = _pending_diag_msgs.popleft()
+
+        caller_sequence = _format_call_sequence(
+            [_get_caller_info(code, line_num) for code, line_num in entry.call_seq]
+        )
+
+        if entry.dt_format == diag_msg_perf_counter_fmt:
+            str_time = str(entry.perf_ns - _perf_counter_base)
+        else:
+            str_time = format_timestamp(entry.timestamp, entry.dt_format)
+
+        _write_diag_msg(
+            entry.timestamp, f"{str_time} {caller_sequence}", entry.args, entry.kwargs
+        )
+
+
+########################################################################
+# DiagMsgWriter class
+########################################################################
+class DiagMsgWriter:
+    """Background writer for diag_msg output.
+
+    Each thread that issues a diag_msg appends the formatted message to
+    its own buffer, so threads do not contend with each other or with
+    the output stream. A background thread periodically drains the
+    buffers, merges the messages by timestamp, and writes them to the
+    stream in batches. The buffer of a thread that has ended is removed
+    once it is drained.
+
+    """
+
+    ####################################################################
+    # __init__
+    ####################################################################
+    def __init__(
+        self,
+        stream: Union[TextIO, str, PathLike[str], None] = None,
+        interval: float = 0.05,
+        holdback: float = 0.01,
+    ) -> None:
+        """Initialize the object.
+
+        Args:
+            stream: the stream or the name of the file (opened for
+                append) to write to. If None, sys.stdout at the time
+                the writer is started is used.
+            interval: number of seconds between drains of the buffers
+            holdback: number of seconds that a message is held in the
+                buffers before it is written. This allows a message
+                from a thread that was delayed between taking its
+                timestamp and adding the message to still be written
+                in timestamp order.
+
+        """
+        self.stream_spec = stream
+        self.stream: Optional[TextIO] = None
+        self.interval = interval
+        self.holdback = holdback
+
+        # each buffer is kept with a weak reference to its thread so
+        # that it can be removed after the thread ends
+        self._bufs_lock = threading.Lock()
+        self._bufs: list[
+            tuple[weakref.ref[threading.Thread], deque[tuple[float, str]]]
+        ] = []
+        self._tls = threading.local()
+
+        # the drain lock guards the held messages and the stream
+        self._drain_lock = threading.RLock()
+        self._held: list[tuple[float, int, str]] = []
+        self._seq = 0
+
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    ####################################################################
+    # start
+    ####################################################################
+    def start(self) -> None:
+        """Start the background thread."""
+        if self.stream_spec is None:
+            self.stream = sys.stdout
+        elif isinstance(self.stream_spec, (str, PathLike)):
+            self.stream = open(self.stream_spec, "a", encoding="utf-8")
+        else:
+            self.stream = self.stream_spec
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="DiagMsgWriter", daemon=True
+        )
+        self._thread.start()
+
+    ####################################################################
+    # stop
+    ####################################################################
+    def stop(self) -> None:
+        """Stop the background thread and write buffered messages."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        # a message added after this drain is taken back by add
+        with self._drain_lock:
+            self._drain(final=True)
+
+            # close only the file that we opened
+            if self.stream is not None and isinstance(
+                self.stream_spec, (str, PathLike)
+            ):
+                self.stream.close()
+            self.stream = None
+
+    ####################################################################
+    # add
+    ####################################################################
+    def add(self, timestamp: float, text: str) -> bool:
+        """Add a formatted message to the buffer of the current thread.
+
+        Args:
+            timestamp: time of the diag_msg call
+            text: the formatted message to write
+
+        Returns:
+            True if the message will be written by the writer, or False
+            if the writer was stopped, in which case the message is not
+            added and the caller must write it
+
+        """
+        if self._stop_event.is_set():
+            return False
+
+        try:
+            buf = self._tls.buf
+        except AttributeError:
+            buf = deque()
+            with self._bufs_lock:
+                self._bufs.append((weakref.ref(threading.current_thread()), buf))
+            self._tls.buf = buf
+
+        item = (timestamp, text)
+        buf.append(item)
+
+        if self._stop_event.is_set():
+            # the final drain of stop may have been done before the
+            # append, in which case the message is still in the buffer
+            with self._drain_lock:
+                if buf and buf[-1] is item:
+                    buf.pop()
+                    return False
+
+        return True
+
+    ####################################################################
+    # _run
+    ####################################################################
+    def _run(self) -> None:
+        """Drain the buffers until stopped."""
+        while not self._stop_event.wait(self.interval):
+            self._drain(final=False)
+
+    ####################################################################
+    # _drain
+    ####################################################################
+    def _drain(self, final: bool) -> None:
+        """Write the buffered messages in timestamp order.
+
+        Args:
+            final: if True, write all messages, otherwise hold back the
+                messages added within the holdback time
+
+        """
+        with self._bufs_lock:
+            bufs = self._bufs[:]
+
+        with self._drain_lock:
+            ended = []
+            for thread_ref, buf in bufs:
+                # a thread that ended before its buffer is drained adds
+                # nothing more, so the buffer can then be removed
+                thread = thread_ref()
+                if thread is None or not thread.is_alive():
+                    ended.append(buf)
+                for _ in range(len(buf)):
+                    timestamp, text = buf.popleft()
+                    # the sequence number keeps messages with the same
+                    # timestamp in the order they were added
+                    self._seq += 1
+                    heapq.heappush(self._held, (timestamp, self._seq, text))
+
+            if ended:
+                with self._bufs_lock:
+                    self._bufs = [
+                        (thread_ref, buf)
+                        for thread_ref, buf in self._bufs
+                        if not any(buf is ended_buf for ended_buf in ended)
+                    ]
+
+            cutoff = float("inf") if final else time.time() - self.holdback
+            batch = []
+            while self._held and self._held[0][0] <= cutoff:
+                batch.append(heapq.heappop(self._held)[2])
+
+            if batch and self.stream is not None:
+                self.stream.write("".join(batch))
+                self.stream.flush()
+
+
+_diag_msg_writer: Optional[DiagMsgWriter] = None
+
+
+########################################################################
+# start_diag_msg_writer
+########################################################################
+def start_diag_msg_writer(
+    stream: Union[TextIO, str, PathLike[str], None] = None,
+    interval: float = 0.05,
+    holdback: float = 0.01,
+) -> DiagMsgWriter:
+    """Start writing diag_msg output from a background thread.
+
+    Args:
+        stream: the stream or the name of the file (opened for append)
+            to write to. If None, sys.stdout is used.
+        interval: number of seconds between writes of the buffered
+            messages
+        holdback: number of seconds that a message is held before it is
+            written to allow messages from other threads with earlier
+            timestamps to be written first
+
+    Returns:
+        The started DiagMsgWriter
+
+    Notes:
+        1) Any writer already started is stopped first.
+        2) The writer is stopped, and its buffered messages are
+           written, when the program exits.
+        3) A diag_msg call that specifies the *file* keyword is still
+           printed directly to that file.
+
+    :Example: write diag_msg output from a background thread
+
+    >>> from scottbrian_utils.diag_msg import (diag_msg,
+    ...     start_diag_msg_writer, stop_diag_msg_writer)
+    >>> writer = start_diag_msg_writer()
+    >>> diag_msg('written by the background thread')
+    >>> stop_diag_msg_writer()
+    16:20:05.909260 <input>:1 written by the background thread
+
+    """
+    global _diag_msg_writer
+
+    stop_diag_msg_writer()
+
+    writer = DiagMsgWriter(stream=stream, interval=interval, holdback=holdback)
+    writer.start()
+    _diag_msg_writer = writer
+
+    return writer
+
+
+########################################################################
+# stop_diag_msg_writer
+########################################################################
+def stop_diag_msg_writer() -> None:
+    """Stop the background writer and write its buffered messages."""
+    global _diag_msg_writer
+
+    writer = _diag_msg_writer
+    if writer is not None:
+        _diag_msg_writer = None
+        writer.stop()
+
+
+_diag_msg_log_queue: Optional[LogQueue] = None
+_diag_msg_logger = logging.getLogger(__name__)
+_diag_msg_log_level = logging.DEBUG
+
+
+########################################################################
+# set_diag_msg_log_queue
+########################################################################
+def set_diag_msg_log_queue(
+    log_queue: Optional[LogQueue], level: int = logging.DEBUG
+) -> None:
+    """Send diag_msg output to a LogQueue instead of printing it.
+
+    Args:
+        log_queue: the LogQueue (scottbrian_utils.log_queue) that each
+            diag_msg is logged to as a record of the
+            scottbrian_utils.diag_msg logger, to be handled by the
+            listener thread of the LogQueue. If None, diag_msg prints
+            its output again.
+        level: the level of the log records
+
+    Notes:
+        1) The message of the log record is the time, call sequence,
+           and args of the diag_msg joined with the *sep* keyword, and
+           the *end* keyword is not used.
+        2) A diag_msg call that specifies the *file* keyword is still
+           printed directly to that file.
+        3) The log queue takes the place of the background writer
+           started with start_diag_msg_writer.
+
+    :Example: log diag_msg output through a LogQueue
+
+    >>> import io
+    >>> import logging
+    >>> from scottbrian_utils.diag_msg import (diag_msg,
+    ...     set_diag_msg_log_queue)
+    >>> from scottbrian_utils.log_queue import LogQueue
+    >>> log_output = io.StringIO()
+    >>> handler = logging.StreamHandler(log_output)
+    >>> log_queue = LogQueue(handlers=[handler])
+    >>> log_queue.start()
+    >>> set_diag_msg_log_queue(log_queue, level=logging.WARNING)
+    >>> diag_msg('logged by the listener thread')
+    >>> set_diag_msg_log_queue(None)
+    >>> log_queue.stop()
+    >>> print(log_output.getvalue(), end='')
+    16:20:05.909260 <input>:1 logged by the listener thread
+
+    """
+    global _diag_msg_log_queue, _diag_msg_log_level
+
+    _diag_msg_log_level = level
+    _diag_msg_log_queue = log_queue
+
+
+########################################################################
+# _diag_msg_at_exit
+########################################################################
+def _diag_msg_at_exit() -> None:
+    """Write the captured, suppressed, and buffered messages at exit."""
+    flush_diag_msgs()
+    report_diag_msg_suppressed()
+    stop_diag_msg_writer()
+
+
+atexit.register(_diag_msg_at_exit)
 
 
 ########################################################################
@@ -149,64 +981,158 @@ def get_caller_info(frame: FrameType) -> CallerInfo:
     caller_info.line_num=3
 
     """
-    code = frame.f_code
-    mod_name = fspath(Path(code.co_filename).name)
-    func_name = code.co_name
+    return _get_caller_info(frame.f_code, frame.f_lineno)
 
-    # print(f'{frame.f_code=}')
-    # print(f'{frame.f_code.co_filename=}')
-    # print(f'{Path(frame.f_code.co_filename).name=}')
-    # print(f'{fspath(Path(frame.f_code.co_filename).name)=}')
+
+########################################################################
+# _get_caller_info
+########################################################################
+def _get_caller_info(code: types.CodeType, line_num: int) -> CallerInfo:
+    """Return caller information for the given code and line number.
+
+    Args:
+        code: the code object of the caller
+        line_num: the line number within the module source
+
+    Returns:
+        The caller module name, class name (or null), function name (or
+        null), and the line number within the module source
+
+    """
+    try:
+        mod_name, cls_name, func_name = _code_info_cache[code]
+        _code_info_cache.move_to_end(code)
+    except KeyError:
+        # the code is not cached or was removed by another thread
+        code_info = get_code_info(code)
+        mod_name, cls_name, func_name = code_info
+        with _code_info_cache_lock:
+            _code_info_cache[code] = code_info
+            if len(_code_info_cache) > diag_msg_code_info_cache_size:
+                _code_info_cache.popitem(last=False)
+
+    return CallerInfo(
+        mod_name=mod_name,
+        cls_name=cls_name,
+        func_name=func_name,
+        line_num=line_num,
+    )
+
+
+########################################################################
+# get_code_info
+########################################################################
+def get_code_info(code: types.CodeType) -> tuple[str, str, str]:
+    """Return the fixed caller information for the given code object.
+
+    Args:
+        code: the code object from which to extract caller info
+
+    Returns:
+        The module name, class name (or null), and function name (or
+        null) for the code object. The class name is taken from the
+        code qualified name, where it is the name that precedes the
+        function name unless the function is local to another function.
+
+    """
+    mod_name = get_mod_name(code.co_filename)
+    func_name = code.co_name
 
     if func_name == "<module>":  # if we are a script
-        func_name = ""  # no func_name, no cls_name
+        return mod_name, "", ""  # no func_name, no cls_name
+
+    qual_name_list = code.co_qualname.split(".")
+    if len(qual_name_list) > 1 and qual_name_list[-2] != "<locals>":
+        return mod_name, qual_name_list[-2], func_name
+
+    return mod_name, "", func_name
+
+
+########################################################################
+# get_mod_name
+########################################################################
+def get_mod_name(file_name: str) -> str:
+    """Return the module name to display for the given source file.
+
+    Args:
+        file_name: the source file name of a code object (co_filename)
+
+    Returns:
+        The file name with the longest matching prefix set by
+        set_mod_name_prefixes removed, or the base name of the file if
+        no prefix matches
+
+    :Example: get the module name for a source file
+
+    >>> from scottbrian_utils.diag_msg import get_mod_name
+    >>> get_mod_name('/usr/lib/python3/site-packages/pkg/mod1.py')
+    'mod1.py'
+
+    """
+    try:
+        return _mod_name_cache[file_name]
+    except KeyError:
+        pass
+
+    # a prefix matches only up to a path separator, so that, e.g.,
+    # /opt/app does not match /opt/app2/mod1.py
+    for prefix in _mod_name_prefixes:
+        if (
+            file_name.startswith(prefix)
+            and len(file_name) > len(prefix) + 1
+            and file_name[len(prefix)] in "/\\"
+        ):
+            mod_name = file_name[len(prefix) + 1 :].lstrip("/\\")
+            break
     else:
-        for key, item in frame.f_globals.items():
-            if isinstance(item, type) and func_in_class(
-                func_name=func_name, class_obj=item, code=code
-            ):
-                return CallerInfo(
-                    mod_name=mod_name,
-                    cls_name=key,
-                    func_name=func_name,
-                    line_num=frame.f_lineno,
-                )
+        mod_name = fspath(Path(file_name).name)
 
-        # if here, not found yet - try looking at locals for self class
-        for item in frame.f_locals.values():
-            try:
-                if hasattr(item, "__dict__"):
-                    if item.__class__.__dict__[func_name].__code__ is code:
-                        class_name = item.__class__.__name__
-                        return CallerInfo(
-                            mod_name=mod_name,
-                            cls_name=class_name,
-                            func_name=func_name,
-                            line_num=frame.f_lineno,
-                        )
-            except AttributeError, KeyError:
-                pass
-
-        # if here, not found yet - try looking at locals in the previous
-        # frame
-        if frame.f_back:
-            for key, item in frame.f_back.f_locals.items():
-                if (
-                    isinstance(item, type)
-                    and (key != "cls")
-                    and func_in_class(func_name=func_name, class_obj=item, code=code)
-                ):
-                    return CallerInfo(
-                        mod_name=mod_name,
-                        cls_name=key,
-                        func_name=func_name,
-                        line_num=frame.f_lineno,
-                    )
+    return _mod_name_cache.setdefault(file_name, sys.intern(mod_name))
 
-    return CallerInfo(
-        mod_name=mod_name, cls_name="", func_name=func_name, line_num=frame.f_lineno
+
+########################################################################
+# set_mod_name_prefixes
+########################################################################
+def set_mod_name_prefixes(prefixes: Optional[Iterable[str]] = None) -> None:
+    """Set the path prefixes to strip from displayed module names.
+
+    Args:
+        prefixes: path prefixes, such as a site-packages directory, to
+            remove from the source file name to form the displayed
+            module name. The remainder of the path is displayed instead
+            of just the base name, which can help to tell apart modules
+            with the same base name. None restores the default of
+            displaying only the base name.
+
+    :Example: display module names relative to site-packages
+
+    >>> from scottbrian_utils.diag_msg import (get_mod_name,
+    ...     set_mod_name_prefixes)
+    >>> set_mod_name_prefixes(['/usr/lib/python3/site-packages'])
+    >>> get_mod_name('/usr/lib/python3/site-packages/pkg/mod1.py')
+    'pkg/mod1.py'
+    >>> set_mod_name_prefixes()
+
+    """
+    global _mod_name_prefixes
+
+    # the trailing separators are removed since get_mod_name matches a
+    # prefix only when a separator follows it, and the longest prefixes
+    # are first so that the most specific prefix is used
+    _mod_name_prefixes = tuple(
+        sorted(
+            (prefix.rstrip("/\\") for prefix in prefixes or ()),
+            key=len,
+            reverse=True,
+        )
     )
 
+    # the cached module names, and the caller info that includes them,
+    # depend on the prefixes
+    _mod_name_cache.clear()
+    with _code_info_cache_lock:
+        _code_info_cache.clear()
+
 
 ########################################################################
 # get_formatted_call_sequence
@@ -344,35 +1270,138 @@ def get_formatted_call_sequence(
     <input>:1 -> <input>::Cls1.f1:4
 
     """
-    caller_sequence = ""  # init to null
-    arrow = ""  # start with no arrow for first iteration
-    for caller_depth in range(latest + 1, latest + 1 + depth):
-        try:
-            # sys._getframe is faster than inspect.currentframe
-            frame = sys._getframe(caller_depth)
-        except ValueError:
-            break  # caller_depth beyond depth of frames
-        except Exception:  # anything else, such as _getframe missing
-            # we will return whatever we collected so far (maybe null)
-            break
+    return _format_call_sequence(_get_call_sequence(latest=latest + 1, depth=depth))
 
-        try:
-            # mod_name, cls_name, func_name,
-            # lineno = get_caller_info(frame)
-            caller_info = get_caller_info(frame)
-        finally:
-            del frame  # important to prevent storage leak
-
-        dot = "." if caller_info.cls_name else ""
-        colon = "::" if caller_info.func_name else ""
-
-        caller_sequence = (
-            f"{caller_info.mod_name}{colon}"
-            f"{caller_info.cls_name}{dot}"
-            f"{caller_info.func_name}:"
-            f"{caller_info.line_num}{arrow}"
-            f"{caller_sequence}"
-        )
-        arrow = " -> "  # set arrow for subsequent iterations
 
-    return caller_sequence
+########################################################################
+# _format_call_sequence
+########################################################################
+def _format_call_sequence(call_seq: list[CallerInfo]) -> str:
+    """Return a formatted string showing the callers.
+
+    Args:
+        call_seq: the CallerInfo tuples ordered from the earliest caller
+            to the most recent caller
+
+    Returns:
+        Formatted string as described by get_formatted_call_sequence
+
+    """
+    return " -> ".join(
+        [
+            f"{caller_info.mod_name}{'::' if caller_info.func_name else ''}"
+            f"{caller_info.cls_name}{'.' if caller_info.cls_name else ''}"
+            f"{caller_info.func_name}:{caller_info.line_num}"
+            for caller_info in call_seq
+        ]
+    )
+
+
+########################################################################
+# get_call_sequence
+########################################################################
+def get_call_sequence(
+    latest: int = 0, depth: int = get_formatted_call_seq_depth
+) -> list[CallerInfo]:
+    """Return the caller info for each of the callers.
+
+    Args:
+        latest: specifies the stack position of the most recent caller
+                  to be included in the call sequence
+        depth: specifies how many callers to include in the call
+                 sequence
+
+    Returns:
+        List of CallerInfo tuples ordered from the earliest caller to
+        the most recent caller. This is the same information that
+        get_formatted_call_sequence formats into a string.
+
+    :Example: get call sequence for two callers
+
+    >>> from scottbrian_utils.diag_msg import get_call_sequence
+    >>> def f1():
+    ...     # f1 now on stack
+    ...     # call f2
+    ...     f2()
+    >>> def f2():
+    ...     for caller_info in get_call_sequence(depth=2):
+    ...         print(caller_info.mod_name,
+    ...               caller_info.func_name,
+    ...               caller_info.line_num)
+    >>> f1()
+    <input> f1 4
+    <input> f2 2
+
+    """
+    return _get_call_sequence(latest=latest + 1, depth=depth)
+
+
+########################################################################
+# _get_call_sequence
+########################################################################
+def _get_call_sequence(latest: int, depth: int) -> list[CallerInfo]:
+    """Return the caller info for each of the callers.
+
+    Args:
+        latest: specifies the stack position, relative to the caller of
+                  this function, of the most recent caller to be
+                  included in the call sequence
+        depth: specifies how many callers to include in the call
+                 sequence
+
+    Returns:
+        List of CallerInfo tuples ordered from the earliest caller to
+        the most recent caller
+
+    """
+    return [
+        _get_caller_info(code, line_num)
+        for code, line_num in _get_call_codes(latest=latest + 1, depth=depth)
+    ]
+
+
+########################################################################
+# _get_call_codes
+########################################################################
+def _get_call_codes(latest: int, depth: int) -> list[tuple[types.CodeType, int]]:
+    """Return the code object and line number for each of the callers.
+
+    Args:
+        latest: specifies the stack position, relative to the caller of
+                  this function, of the most recent caller to be
+                  included in the call sequence
+        depth: specifies how many callers to include in the call
+                 sequence
+
+    Returns:
+        List of code object and line number pairs ordered from the
+        earliest caller to the most recent caller
+
+    """
+    if depth <= 0:
+        return []
+
+    try:
+        # sys._getframe is faster than inspect.currentframe
+        frame: Optional[FrameType] = sys._getframe(latest + 1)
+    except ValueError:
+        return []  # latest is beyond depth of frames
+    except Exception:  # anything else, such as _getframe missing
+        return []
+
+    # The stack is walked once from the most recent caller back through
+    # f_back, filling the buffer from the end so that it ends up in
+    # earliest to most recent order without having to reverse it. Only
+    # the code object and line number are kept since the frame itself
+    # would keep its locals alive and its line number will change.
+    call_codes: list[Any] = [None] * depth
+    idx = depth
+    try:
+        while frame is not None and idx:
+            idx -= 1
+            call_codes[idx] = (frame.f_code, frame.f_lineno)
+            frame = frame.f_back
+    finally:
+        del frame  # important to prevent storage leak
+
+    return call_codes[idx:]
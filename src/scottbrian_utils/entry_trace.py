@@ -8,7 +8,9 @@ The etrace decorator can be used on a function or method to add a
 debug log item upon entry and exit. The entry trace log item will
 include the filename, function or method name, the line number where it
 is defined, and the specified args and/or kwargs. The exit trace will
-include the return value.
+include the return value. For a coroutine or generator, the entry
+trace is issued when it starts running and the exit trace is issued
+when it completes.
 
 The decorator can be controlled via the following parameters:
 
@@ -20,6 +22,55 @@ The decorator can be controlled via the following parameters:
     3) omit_return_value: if True, do not trace the return value in the
        exit trace entry. The default is False.
     4) omit_caller: if True, the call sequence will not be traced.
+    5) time_call: if True, the exit trace includes the elapsed time of
+       the call in nanoseconds. The default is False.
+    6) sample_every: trace only one of every *sample_every* calls. The
+       default is 1.
+    7) first_calls: trace only the first *first_calls* calls. The
+       default is None.
+    8) slow_secs: trace only calls that take at least *slow_secs*
+       seconds. The default is None.
+    9) bounded_repr: True or a BoundedRepr instance to limit the size of
+       the traced argument and return values. The default is False.
+    10) logger_name: name of the logger to use. The default is the name
+        of the module that applies etrace.
+    11) recorder: a TraceRecorder (scottbrian_utils.trace_recorder) or a
+        CallTreeProfiler (scottbrian_utils.call_tree_profiler) to record
+        the entry and exit events into instead of logging them. The
+        default is None.
+    12) correlate: if True, the entry and exit log records of each call
+        have a call id, the call id of the enclosing traced call, the
+        thread id, and the call depth as extra attributes. The default
+        is False.
+    13) governor: an OverheadGovernor that throttles the trace of the
+        function to sampling while the time spent by etrace or the rate
+        of calls is too high, and restores the full trace when the load
+        drops. The default is None.
+    14) log_queue: a LogQueue (scottbrian_utils.log_queue) that the
+        entry and exit log records are placed on, to be handled by its
+        listener thread. The default is None.
+
+The etrace_all function applies etrace to every method of a class or to
+every function of a module, with include and exclude filters on the
+names.
+
+The etrace_timelines function turns the interleaved log records of
+etrace with correlate=True into a timeline of the calls of each thread.
+
+The EtraceMonitor class issues the same entry and exit trace for
+functions that are not decorated, using sys.monitoring. Tracing can be
+switched on and off for each function at any time, and a function has
+no overhead while its tracing is off.
+
+The OverheadGovernor class can be passed to etrace to keep the trace on
+for functions that are called too often for a full trace: the functions
+whose trace overhead or call rate goes over a limit are traced with
+sampling until the load drops.
+
+If the decorated function raises an exception, the exit trace names the
+exception type instead of the return value. The elapsed time and the
+exception type are also placed in the etrace_elapsed_ns and
+etrace_exc_type attributes of the exit log record.
 
 
 :Example 1: Decorate a function with no args nor kwargs.
@@ -149,13 +200,30 @@ Expected trace output for Example 6::
 ########################################################################
 # Standard Library
 ########################################################################
+import fnmatch
 import functools
 import inspect
+import itertools
+import linecache
 import logging
+import reprlib
 import sys
-from collections.abc import Iterable
+import threading
+import time
+import types
+from collections.abc import AsyncGenerator, Generator, Iterable
+import enum
 from enum import Enum, auto
-from typing import Any, Callable, cast, Optional, overload, TypeVar, Union
+from typing import (
+    Any,
+    Callable,
+    cast,
+    NamedTuple,
+    Optional,
+    overload,
+    TypeVar,
+    Union,
+)
 
 ########################################################################
 # Third Party
@@ -167,6 +235,996 @@ import wrapt
 ########################################################################
 from scottbrian_utils.diag_msg import get_formatted_call_sequence
 from scottbrian_utils.log_verifier import LogVer  # noqa F401
+from scottbrian_utils.call_tree_profiler import CallTreeProfiler
+from scottbrian_utils.log_queue import LogQueue
+from scottbrian_utils.trace_recorder import TraceRecorder
+
+########################################################################
+# constants
+########################################################################
+# default values of these types always format the same way, so their
+# trace text is computed once when the function is decorated
+immutable_default_types = (type(None), bool, int, float, complex, str, bytes)
+
+
+########################################################################
+# LogVerSpec and TargetKind
+########################################################################
+# these are defined once here instead of for each decorated function
+# since creating an Enum class is a large part of the decoration cost
+class LogVerSpec(Enum):
+    """Request for LogVer."""
+
+    CreateLogVer = auto()
+    UseProvidedLogVer = auto()
+    UseLogger = auto()
+
+
+class TargetKind(Enum):
+    """Kind of function being traced."""
+
+    Function = auto()
+    Coroutine = auto()
+    Generator = auto()
+    AsyncGenerator = auto()
+
+
+########################################################################
+# _format_arg
+########################################################################
+def _format_arg(item: Any) -> str:
+    """Return the trace text for an argument value.
+
+    Args:
+        item: the argument value
+
+    Returns:
+        The argument value in quotes if it is a string, otherwise the
+        argument value formatted with str
+
+    """
+    if isinstance(item, str) and item != "?":
+        return f"'{item}'"
+    return f"{item}"
+
+
+########################################################################
+# check_omit_parms
+########################################################################
+def check_omit_parms(
+    omit_parms: Iterable[str], parm_names: list[str], var_kw_name: Optional[str]
+) -> None:
+    """Check that the omit_parms names are parameters of a function.
+
+    Args:
+        omit_parms: the names of the parameters to be omitted
+        parm_names: the names of the parameters of the function other
+            than self or cls and the VAR_KEYWORD parameter
+        var_kw_name: the name of the VAR_KEYWORD parameter (e.g.,
+            kwargs), or None if the function has none
+
+    Raises:
+        ValueError: a name in omit_parms is not a parameter of the
+            function
+
+    """
+    # when there is a **kwargs, any other name could be the name of a
+    # keyword argument that it collects
+    for omit_parm_name in sorted(omit_parms):
+        if omit_parm_name not in parm_names and (
+            var_kw_name is None or omit_parm_name == var_kw_name
+        ):
+            raise ValueError(
+                f"{omit_parm_name} specified in omit_parms is not a known parameter"
+            )
+
+
+########################################################################
+# ParmLayout class
+########################################################################
+class ParmLayout:
+    """Layout of the parameters of a function in the args of a call.
+
+    The EntryFormatter of etrace and the CacheKeyBuilder of memoize both
+    match the args and kwargs of a call to the parameters of the
+    function, which depends on where the positional parameters end and
+    where *args (if any) is.
+
+    """
+
+    ####################################################################
+    # __init__
+    ####################################################################
+    def __init__(self, parms: list[inspect.Parameter], omit_parms: set[str]) -> None:
+        """Initialize the object.
+
+        Args:
+            parms: the parameters of the function, excluding self or
+                cls
+            omit_parms: names of the parameters whose values are to be
+                omitted
+
+        Raises:
+            ValueError: a name in omit_parms is not a parameter of the
+                function
+
+        """
+        self.omit_parms = omit_parms
+
+        # VAR_KEYWORD (e.g., **kwargs) is not a parameter in the layout
+        # - the kwargs it collects are placed after the other parameters
+        self.parms = [
+            parm for parm in parms if parm.kind != inspect.Parameter.VAR_KEYWORD
+        ]
+        self.parm_names = [parm.name for parm in self.parms]
+        self.var_kw_name = parms[-1].name if len(self.parms) != len(parms) else None
+        check_omit_parms(omit_parms, self.parm_names, self.var_kw_name)
+
+        # var_pos_idx is the index of *args, or -1 if there is none, and
+        # num_pos is the number of parameters that an argument passed
+        # by position can be for
+        self.var_pos_idx = -1
+        self.num_pos = 0
+        for idx, parm in enumerate(self.parms):
+            if parm.kind == inspect.Parameter.VAR_POSITIONAL:
+                self.var_pos_idx = idx
+            elif self.var_pos_idx < 0 and parm.kind in (
+                inspect.Parameter.POSITIONAL_ONLY,
+                inspect.Parameter.POSITIONAL_OR_KEYWORD,
+            ):
+                self.num_pos = idx + 1
+
+
+########################################################################
+# get_target_info
+########################################################################
+def get_target_info(
+    wrapped: Any,
+) -> tuple[Callable[..., Any], types.CodeType, str, bool]:
+    """Return the information that identifies a traced function.
+
+    Args:
+        wrapped: the function, staticmethod, or classmethod to be traced
+
+    Returns:
+        The function, its code object, the target text made of the file
+        name, qualified name, and line number, and whether the first
+        parameter (self or cls) is to be skipped in the trace
+
+    """
+    if type(wrapped).__name__ in ("staticmethod", "classmethod"):
+        target_func = wrapped.__func__
+    else:
+        target_func = wrapped
+
+    # the file name and line number come from the code object, which is
+    # much faster than reading the source with inspect
+    target_code = inspect.unwrap(target_func).__code__
+    target_file = target_code.co_filename.split("\\")[-1]
+    target_line_num: Union[int, str] = target_code.co_firstlineno
+    if target_code.co_filename.startswith("<") and not linecache.getlines(
+        target_code.co_filename
+    ):
+        # no source is available for code that was compiled from a
+        # string (e.g., by exec)
+        target_line_num = "?"
+
+    qual_name_list = wrapped.__qualname__.split(".")
+
+    skip_self_cls = False
+    if len(qual_name_list) == 1 or qual_name_list[-2] == "<locals>":
+        # set target_name to function name
+        target_name = qual_name_list[-1]
+    else:
+        # set target_name to class name and method name
+        target_name = f"{qual_name_list[-2]}.{qual_name_list[-1]}"
+        if type(wrapped).__name__ != "staticmethod":
+            skip_self_cls = True
+
+    target = f"{target_file}::{target_name}:{target_line_num}"
+
+    if type(wrapped).__name__ == "classmethod":
+        skip_self_cls = True
+
+    return target_func, target_code, target, skip_self_cls
+
+
+# the repr functions of the types whose repr is short no matter the
+# value, which BoundedRepr calls as is
+_SHORT_REPRS = frozenset(
+    {
+        object.__repr__,
+        bool.__repr__,
+        float.__repr__,
+        complex.__repr__,
+        type(None).__repr__,
+        type(Ellipsis).__repr__,
+        type.__repr__,
+        range.__repr__,
+        types.FunctionType.__repr__,
+        types.BuiltinFunctionType.__repr__,
+        types.MethodType.__repr__,
+        types.ModuleType.__repr__,
+        enum.Enum.__repr__,
+        enum.Flag.__repr__,
+    }
+)
+
+
+########################################################################
+# BoundedRepr class
+########################################################################
+class BoundedRepr(reprlib.Repr):
+    """Repr with bounds on the size of the argument and return values.
+
+    The repr of a value is built piece by piece with limits on the
+    number of items shown for each container, the nesting depth, and
+    the length of each piece, so the cost depends on the limits and not
+    on the size of the value. The result is then limited to a total
+    length. A value of a type that reprlib does not know is shown in
+    the default form of object.__repr__ (e.g., <pandas.core.frame.
+    DataFrame object at 0x...>) unless its repr is known to be short,
+    an override is given for its type, or *use_repr* is True.
+
+    """
+
+    ####################################################################
+    # __init__
+    ####################################################################
+    def __init__(
+        self,
+        max_length: int = 200,
+        max_items: int = 10,
+        max_depth: int = 3,
+        overrides: Optional[dict[type, Callable[[Any], str]]] = None,
+        use_repr: bool = False,
+    ) -> None:
+        """Initialize the object.
+
+        Args:
+            max_length: the most characters of a repr, including the
+                ellipses that replace the omitted characters
+            max_items: the most items shown for each container
+            max_depth: the most levels of nested containers shown
+            overrides: functions that return the repr of a value of
+                the given type (or a subclass of it) in place of the
+                bounded repr, e.g., {pd.DataFrame: lambda df:
+                f"DataFrame(shape={df.shape})"}
+            use_repr: if True, a value of a type that reprlib does not
+                know is converted with its own repr, which is then
+                limited to max_length characters
+
+        """
+        super().__init__()
+        self.max_length = max_length
+        self.max_items = max_items
+        self.max_depth = max_depth
+        self.overrides = overrides or {}
+        self.use_repr = use_repr
+
+        self.maxlevel = max_depth
+        self.maxtuple = max_items
+        self.maxlist = max_items
+        self.maxarray = max_items
+        self.maxdict = max_items
+        self.maxset = max_items
+        self.maxfrozenset = max_items
+        self.maxdeque = max_items
+        self.maxstring = max_length
+        self.maxlong = max_length
+        self.maxother = max_length
+
+    ####################################################################
+    # __repr__
+    ####################################################################
+    def __repr__(self) -> str:
+        """Return a repr of the class.
+
+        Returns:
+            repr of the class
+
+        """
+        return (
+            f"{type(self).__name__}(max_length={self.max_length}, "
+            f"max_items={self.max_items}, max_depth={self.max_depth})"
+        )
+
+    ####################################################################
+    # repr
+    ####################################################################
+    def repr(self, x: Any) -> str:
+        """Return the bounded repr of a value.
+
+        Args:
+            x: the value
+
+        Returns:
+            The repr of the value limited to max_length characters
+
+        """
+        return self._limit(super().repr(x), self.max_length)
+
+    ####################################################################
+    # repr1
+    ####################################################################
+    def repr1(self, x: Any, level: int) -> str:
+        """Return the bounded repr of a value at a nesting level.
+
+        Args:
+            x: the value
+            level: the number of nesting levels left to be shown
+
+        Returns:
+            The repr of the value from an override function if one
+            was specified for its type, otherwise the bounded repr
+
+        """
+        if self.overrides:
+            for cls in type(x).__mro__:
+                if cls in self.overrides:
+                    return self._limit(self.overrides[cls](x), self.maxother)
+
+        return super().repr1(x, level)
+
+    ####################################################################
+    # repr_bytes
+    ####################################################################
+    def repr_bytes(self, x: bytes, level: int) -> str:
+        """Return the bounded repr of a bytes value.
+
+        Args:
+            x: the value
+            level: the number of nesting levels left to be shown
+
+        Returns:
+            The repr of the value limited to maxstring characters
+
+        """
+        # only as many bytes as could be shown are converted
+        return self._limit(repr(x[: self.maxstring]), self.maxstring)
+
+    repr_bytearray = repr_bytes
+
+    ####################################################################
+    # repr_instance
+    ####################################################################
+    def repr_instance(self, x: Any, level: int) -> str:
+        """Return the bounded repr of a value of an unknown type.
+
+        Args:
+            x: the value
+            level: the number of nesting levels left to be shown
+
+        Returns:
+            The repr of the value if its repr is short or use_repr is
+            True, otherwise the default object repr of the value,
+            limited to maxother characters
+
+        """
+        if self.use_repr or type(x).__repr__ in _SHORT_REPRS:
+            return super().repr_instance(x, level)
+
+        # the repr of the value is not called since its cost and size
+        # are not known
+        return self._limit(object.__repr__(x), self.maxother)
+
+    ####################################################################
+    # _limit
+    ####################################################################
+    def _limit(self, text: str, max_length: int) -> str:
+        """Return text with its middle replaced by ellipses if too long.
+
+        Args:
+            text: the text to limit
+            max_length: the most characters of the result
+
+        Returns:
+            The text limited to max_length characters
+
+        """
+        if len(text) <= max_length:
+            return text
+        fill_len = len(self.fillvalue)
+        head_len = max(0, (max_length - fill_len) // 2)
+        tail_len = max(0, max_length - fill_len - head_len)
+        return f"{text[:head_len]}{self.fillvalue}{text[len(text) - tail_len :]}"
+
+
+########################################################################
+# EntryFormatter class
+########################################################################
+class EntryFormatter(ParmLayout):
+    """Formatter for the etrace entry message of a function.
+
+    The text of the entry message depends on the values of the
+    arguments, but where each value goes and the text around it
+    depend only on how many positional arguments and which keyword
+    arguments are passed. For each such call shape, a formatter function
+    is generated the first time the shape is seen. The generated
+    function builds the message with a single f-string, so each call
+    needs only one format operation.
+
+    A function that takes **kwargs can be called with any number of
+    keyword argument combinations, so only the first *max_formatters*
+    shapes get a generated formatter. The calls with other shapes are
+    formatted one value at a time, which gives the same message.
+
+    """
+
+    max_formatters = 32
+
+    ####################################################################
+    # __init__
+    ####################################################################
+    def __init__(
+        self,
+        target: str,
+        parms: list[inspect.Parameter],
+        omit_parms: set[str],
+        omit_caller: bool,
+        value_repr: Optional[Callable[[Any], str]] = None,
+    ) -> None:
+        """Initialize the object.
+
+        Args:
+            target: the file name, qualified name, and line number of
+                the traced function
+            parms: the parameters of the traced function, excluding
+                self or cls
+            omit_parms: names of the parameters whose values are to be
+                traced as ellipses
+            omit_caller: if True, the call sequence is not traced
+            value_repr: function that returns the trace text for an
+                argument value in place of the default formatting
+
+        Raises:
+            ValueError: a name in omit_parms is not a parameter of the
+                traced function
+
+        """
+        super().__init__(parms=parms, omit_parms=omit_parms)
+        self.target = target
+        self.omit_caller = omit_caller
+        self.value_repr = value_repr
+
+        # defaults that are not of an immutable type are formatted on
+        # each call since their values could change
+        late_parms = [
+            parm
+            for parm in self.parms
+            if parm.default is not inspect.Parameter.empty
+            and not isinstance(parm.default, immutable_default_types)
+        ]
+        self.late_defaults = tuple(parm.default for parm in late_parms)
+        self.late_default_idxs = {parm.name: idx for idx, parm in enumerate(late_parms)}
+
+        self.formatters: dict[
+            tuple[int, tuple[str, ...]],
+            Callable[[tuple[Any, ...], dict[str, Any], str], str],
+        ] = {}
+
+    ####################################################################
+    # format
+    ####################################################################
+    def format(
+        self, args: tuple[Any, ...], kwargs: dict[str, Any], caller_seq: str
+    ) -> str:
+        """Return the entry message for a call.
+
+        Args:
+            args: the positional arguments of the call
+            kwargs: the keyword arguments of the call
+            caller_seq: the formatted call sequence, ignored when
+                omit_caller was specified
+
+        Returns:
+            The entry message, which ends with caller_seq when
+            omit_caller was not specified
+
+        """
+        shape = (len(args), tuple(kwargs))
+        try:
+            formatter = self.formatters[shape]
+        except KeyError:
+            if len(self.formatters) >= self.max_formatters:
+                return self._format_generic(args, kwargs, caller_seq)
+            formatter = self.formatters.setdefault(shape, self._build_formatter(*shape))
+
+        return formatter(args, kwargs, caller_seq)
+
+    ####################################################################
+    # _get_traced
+    ####################################################################
+    def _get_traced(
+        self, num_args: int, kw_names: tuple[str, ...]
+    ) -> list[tuple[str, Optional[tuple[str, Union[int, slice, str]]]]]:
+        """Return the traced parameters for a call shape.
+
+        Args:
+            num_args: number of positional arguments of the call
+            kw_names: names of the keyword arguments of the call
+
+        Returns:
+            A list with the text of each traced parameter and, for a
+            value that is taken from the call, the name of the args,
+            kwargs, or late_defaults that it is loaded from and its
+            index or key
+
+        """
+        traced: list[tuple[str, Optional[tuple[str, Union[int, slice, str]]]]] = []
+
+        def add_value(name: str, source: str, key: Union[int, slice, str]) -> None:
+            if name in self.omit_parms:
+                traced.append((f"{name}='...'", None))
+            else:
+                traced.append((f"{name}=", (source, key)))
+
+        for idx, parm in enumerate(self.parms):
+            name = parm.name
+            if name in kw_names:
+                add_value(name, "kwargs", name)
+            elif idx == self.var_pos_idx:
+                if num_args > idx:
+                    add_value(name, "args", slice(idx, None))
+                elif name in self.omit_parms:
+                    traced.append((f"{name}='...'", None))
+                # otherwise *args with no values is not traced
+            elif idx < min(num_args, self.num_pos):
+                add_value(name, "args", idx)
+            elif name in self.omit_parms:
+                traced.append((f"{name}='...'", None))
+            elif parm.default is inspect.Parameter.empty:
+                traced.append((f"{name}=?", None))
+            elif name in self.late_default_idxs:
+                add_value(name, "late_defaults", self.late_default_idxs[name])
+            elif self.value_repr is not None:
+                traced.append((f"{name}={self.value_repr(parm.default)}", None))
+            else:
+                traced.append((f"{name}={_format_arg(parm.default)}", None))
+
+        for name in kw_names:
+            if name not in self.parm_names:
+                add_value(name, "kwargs", name)
+
+        return traced
+
+    ####################################################################
+    # _format_generic
+    ####################################################################
+    def _format_generic(
+        self, args: tuple[Any, ...], kwargs: dict[str, Any], caller_seq: str
+    ) -> str:
+        """Return the entry message for a call without a formatter.
+
+        Args:
+            args: the positional arguments of the call
+            kwargs: the keyword arguments of the call
+            caller_seq: the formatted call sequence, ignored when
+                omit_caller was specified
+
+        Returns:
+            The entry message
+
+        """
+        sources = {"args": args, "kwargs": kwargs, "late_defaults": self.late_defaults}
+        texts = []
+        for text, load in self._get_traced(len(args), tuple(kwargs)):
+            if load is None:
+                texts.append(text)
+            else:
+                value = sources[load[0]][load[1]]  # type: ignore[index]
+                if self.value_repr is not None:
+                    texts.append(f"{text}{self.value_repr(value)}")
+                else:
+                    texts.append(f"{text}{_format_arg(value)}")
+
+        entry_msg = f"{self.target} entry:"
+        if texts:
+            entry_msg = f"{entry_msg} {', '.join(texts)}"
+        if not self.omit_caller:
+            entry_msg = (
+                f"{entry_msg}{', caller: ' if texts else ' caller: '}{caller_seq}"
+            )
+
+        return entry_msg
+
+    ####################################################################
+    # _build_formatter
+    ####################################################################
+    def _build_formatter(
+        self, num_args: int, kw_names: tuple[str, ...]
+    ) -> Callable[[tuple[Any, ...], dict[str, Any], str], str]:
+        """Generate the formatter function for a call shape.
+
+        Args:
+            num_args: number of positional arguments of the call
+            kw_names: names of the keyword arguments of the call
+
+        Returns:
+            A function that takes the args, kwargs, and call sequence of
+            a call with this shape and returns the entry message using
+            a single f-string
+
+        """
+        # each traced parameter is either fixed text or a value that is
+        # loaded from the args, kwargs, or late_defaults of the call
+        traced = self._get_traced(num_args, kw_names)
+
+        # the generated code loads each traced value into a local
+        # variable and then builds the message with adjacent f-string
+        # literals, which the compiler joins into a single f-string
+        loads: list[str] = []
+        pieces: list[str] = []
+
+        def add_text(text: str) -> None:
+            pieces.append(f"f{text.replace('{', '{{').replace('}', '}}')!r}")
+
+        add_text(f"{self.target} entry:")
+        for idx, (text, load) in enumerate(traced):
+            add_text(f"{' ' if idx == 0 else ', '}{text}")
+            if load is not None:
+                var = f"v{len(loads)}"
+                source, key = load
+                if isinstance(key, slice):
+                    loads.append(f"    {var} = {source}[{key.start}:]")
+                else:
+                    loads.append(f"    {var} = {source}[{key!r}]")
+                if self.value_repr is not None:
+                    pieces.append(f'f"""{{value_repr({var})}}"""')
+                else:
+                    pieces.append(
+                        f'f"""{{f"\'{{{var}}}\'" if isinstance({var}, str) '
+                        f'and {var} != "?" else {var}}}"""'
+                    )
+
+        if not self.omit_caller:
+            add_text(", caller: " if traced else " caller: ")
+            pieces.append('f"""{caller_seq}"""')
+
+        source = "\n".join(
+            [
+                "def entry_formatter(args, kwargs, caller_seq):",
+                *loads,
+                "    return (",
+                *[f"        {piece}" for piece in pieces],
+                "    )",
+            ]
+        )
+        namespace: dict[str, Any] = {
+            "late_defaults": self.late_defaults,
+            "value_repr": self.value_repr,
+        }
+        exec(compile(source, f"<etrace {self.target}>", "exec"), namespace)
+
+        return cast(
+            Callable[[tuple[Any, ...], dict[str, Any], str], str],
+            namespace["entry_formatter"],
+        )
+
+
+########################################################################
+# call correlation
+########################################################################
+# the call ids are unique for all traced functions, and each thread
+# keeps a stack of the call ids of its traced calls that have not exited
+_call_ids = itertools.count(1)
+_thread_calls = threading.local()
+
+
+def _start_call() -> dict[str, Any]:
+    """Start a correlated call.
+
+    Returns:
+        The extra attributes of the entry log record
+
+    """
+    call_id = next(_call_ids)
+    try:
+        stack = _thread_calls.stack
+    except AttributeError:
+        stack = _thread_calls.stack = []
+
+    call_extra = {
+        "etrace_event": "entry",
+        "etrace_call_id": call_id,
+        "etrace_parent_id": stack[-1] if stack else None,
+        "etrace_thread_id": threading.get_ident(),
+        "etrace_depth": len(stack) + 1,
+    }
+    stack.append(call_id)
+
+    return call_extra
+
+
+def _end_call(call_extra: dict[str, Any]) -> dict[str, Any]:
+    """End a correlated call.
+
+    Args:
+        call_extra: the extra attributes of the entry log record
+
+    Returns:
+        The extra attributes for the exit log record
+
+    """
+    call_id = call_extra["etrace_call_id"]
+    stack = getattr(_thread_calls, "stack", [])
+    # the call is normally the last one on the stack, but a generator
+    # can complete after the call that started it has exited, or in
+    # another thread
+    for idx in range(len(stack) - 1, -1, -1):
+        if stack[idx] == call_id:
+            del stack[idx]
+            break
+
+    return {
+        **call_extra,
+        "etrace_event": "exit",
+        "etrace_thread_id": threading.get_ident(),
+    }
+
+
+########################################################################
+# GovernedTarget class
+########################################################################
+class GovernedTarget:
+    """Overhead measurements and throttle state of a traced function.
+
+    The counts are updated without a lock, so with several threads they
+    are approximate, which is good enough to decide on the throttle.
+
+    """
+
+    __slots__ = (
+        "governor",
+        "target",
+        "logger",
+        "throttled",
+        "notified",
+        "window_start_ns",
+        "num_calls",
+        "num_traced",
+        "run_ns",
+        "overhead_ns",
+    )
+
+    ####################################################################
+    # __init__
+    ####################################################################
+    def __init__(
+        self, governor: "OverheadGovernor", target: str, logger: logging.Logger
+    ) -> None:
+        """Initialize the object.
+
+        Args:
+            governor: the governor that has the limits
+            target: the name of the traced function as it appears in
+                the trace
+            logger: the logger of the trace
+
+        """
+        self.governor = governor
+        self.target = target
+        self.logger = logger
+        self.throttled = False
+        self.notified = False
+        self.window_start_ns = time.perf_counter_ns()
+        self.num_calls = 0
+        self.num_traced = 0
+        self.run_ns = 0
+        self.overhead_ns = 0
+
+    ####################################################################
+    # skip_call
+    ####################################################################
+    def skip_call(self, now_ns: int) -> bool:
+        """Count a call and return whether it is not to be traced.
+
+        Args:
+            now_ns: the perf_counter_ns value at the start of the call
+
+        Returns:
+            True if the function is throttled and the call is not one
+            of the sampled calls, otherwise False
+
+        """
+        self.num_calls += 1
+        if now_ns - self.window_start_ns >= self.governor.window_ns:
+            self._end_window(now_ns)
+
+        return self.throttled and self.num_calls % self.governor.sample_every != 0
+
+    ####################################################################
+    # add_traced_call
+    ####################################################################
+    def add_traced_call(self, run_ns: int, overhead_ns: int) -> None:
+        """Add the times of a traced call.
+
+        Args:
+            run_ns: the time spent in the traced function
+            overhead_ns: the time spent by etrace for the call
+
+        """
+        self.num_traced += 1
+        self.run_ns += run_ns
+        self.overhead_ns += overhead_ns
+
+    ####################################################################
+    # _end_window
+    ####################################################################
+    def _end_window(self, now_ns: int) -> None:
+        """Throttle or restore the trace based on the ended window.
+
+        Args:
+            now_ns: the perf_counter_ns value at the end of the window
+
+        """
+        governor = self.governor
+        call_rate = self.num_calls * 1_000_000_000 / (now_ns - self.window_start_ns)
+
+        # the overhead is the time spent by etrace over the time spent
+        # in all the calls of the window, with the run time of the calls
+        # that were not traced estimated from the traced calls, so that
+        # the overhead drops while the function is throttled
+        if self.run_ns:
+            overhead = (self.overhead_ns * self.num_traced) / (
+                self.run_ns * self.num_calls
+            )
+        else:
+            overhead = float("inf") if self.overhead_ns else 0.0
+
+        # the trace is restored only below half the limits so that a
+        # load near a limit does not switch the throttle on and off
+        limit_factor = 0.5 if self.throttled else 1.0
+        over_limit = (
+            governor.max_overhead is not None
+            and overhead > governor.max_overhead * limit_factor
+        ) or (
+            governor.max_call_rate is not None
+            and call_rate > governor.max_call_rate * limit_factor
+        )
+
+        if over_limit and not self.throttled:
+            self.throttled = True
+            if not self.notified:
+                self.notified = True
+                self.logger.info(
+                    f"{self.target} etrace overhead is {overhead:.1%} of the "
+                    f"function time at {call_rate:.0f} calls per second, so "
+                    f"only one of every {governor.sample_every} calls is "
+                    "traced until the load drops"
+                )
+        elif not over_limit and self.throttled:
+            self.throttled = False
+
+        self.window_start_ns = now_ns
+        self.num_calls = 0
+        self.num_traced = 0
+        self.run_ns = 0
+        self.overhead_ns = 0
+
+
+########################################################################
+# OverheadGovernor class
+########################################################################
+class OverheadGovernor:
+    """Throttle the trace of functions whose trace costs too much.
+
+    A governor passed to etrace measures, for each decorated function,
+    the time etrace spends building and logging the entry and exit
+    messages against the time spent in all the calls of the function,
+    along with the rate of calls. At the end of each window of
+    *window_secs*, a function whose overhead or call rate is over a
+    limit is throttled to trace only one of every *sample_every* calls,
+    and the first time that happens an INFO message is logged. Since
+    only the sampled calls add to the overhead while the function is
+    throttled, the overhead drops along with the load, and the full
+    trace is restored at the end of a window where the overhead and the
+    call rate are both below half their limits. One governor can be
+    shared by any number of functions, each of which is measured and
+    throttled on its own.
+
+    """
+
+    ####################################################################
+    # __init__
+    ####################################################################
+    def __init__(
+        self,
+        max_overhead: Optional[float] = 0.1,
+        max_call_rate: Optional[float] = None,
+        sample_every: int = 100,
+        window_secs: float = 1.0,
+    ) -> None:
+        """Initialize the object.
+
+        Args:
+            max_overhead: the most time spent by etrace as a share of
+                the time spent in the calls of the function (e.g., 0.1
+                for 10 percent), or None for no limit
+            max_call_rate: the most calls per second, or None for no
+                limit
+            sample_every: while a function is throttled, only one of
+                every *sample_every* calls is traced
+            window_secs: the number of seconds over which the overhead
+                and the call rate are measured
+
+        Raises:
+            ValueError: sample_every is less than 1, or window_secs is
+                not positive
+
+        """
+        if sample_every < 1:
+            raise ValueError(
+                f"OverheadGovernor sample_every of {sample_every} is less than 1"
+            )
+        if window_secs <= 0:
+            raise ValueError(
+                f"OverheadGovernor window_secs of {window_secs} is not positive"
+            )
+
+        self.max_overhead = max_overhead
+        self.max_call_rate = max_call_rate
+        self.sample_every = sample_every
+        self.window_secs = window_secs
+        self.window_ns = int(window_secs * 1_000_000_000)
+
+        self._targets: list[GovernedTarget] = []
+        self._lock = threading.Lock()
+
+    ####################################################################
+    # __repr__
+    ####################################################################
+    def __repr__(self) -> str:
+        """Return a repr of the class.
+
+        Returns:
+            repr of the class
+
+        """
+        return (
+            f"{type(self).__name__}(max_overhead={self.max_overhead}, "
+            f"max_call_rate={self.max_call_rate}, "
+            f"sample_every={self.sample_every}, "
+            f"window_secs={self.window_secs})"
+        )
+
+    ####################################################################
+    # register
+    ####################################################################
+    def register(self, target: str, logger: logging.Logger) -> GovernedTarget:
+        """Register a traced function.
+
+        Args:
+            target: the name of the function as it appears in the trace
+            logger: the logger of the trace
+
+        Returns:
+            The GovernedTarget that measures the function
+
+        """
+        governed_target = GovernedTarget(self, target, logger)
+        with self._lock:
+            self._targets.append(governed_target)
+        return governed_target
+
+    ####################################################################
+    # get_throttled
+    ####################################################################
+    def get_throttled(self) -> list[str]:
+        """Return the names of the functions that are throttled.
+
+        Returns:
+            The sorted names of the functions that are throttled
+
+        """
+        with self._lock:
+            targets = list(self._targets)
+        return sorted(
+            governed_target.target
+            for governed_target in targets
+            if governed_target.throttled
+        )
+
 
 ####################################################################
 # etrace decorator
@@ -182,6 +1240,16 @@ def etrace(
     omit_parms: Optional[Iterable[str]] = None,
     omit_return_value: bool = False,
     omit_caller: bool = False,
+    time_call: bool = False,
+    sample_every: int = 1,
+    first_calls: Optional[int] = None,
+    slow_secs: Optional[float] = None,
+    bounded_repr: Union[bool, BoundedRepr] = False,
+    logger_name: Optional[str] = None,
+    recorder: Optional[Union[TraceRecorder, CallTreeProfiler]] = None,
+    correlate: bool = False,
+    governor: Optional[OverheadGovernor] = None,
+    log_queue: Optional[LogQueue] = None,
     latest: int = 1,
     depth: int = 1,
     log_ver: Union[bool, LogVer] = False,
@@ -196,6 +1264,16 @@ def etrace(
     omit_parms: Optional[Iterable[str]] = None,
     omit_return_value: bool = False,
     omit_caller: bool = False,
+    time_call: bool = False,
+    sample_every: int = 1,
+    first_calls: Optional[int] = None,
+    slow_secs: Optional[float] = None,
+    bounded_repr: Union[bool, BoundedRepr] = False,
+    logger_name: Optional[str] = None,
+    recorder: Optional[Union[TraceRecorder, CallTreeProfiler]] = None,
+    correlate: bool = False,
+    governor: Optional[OverheadGovernor] = None,
+    log_queue: Optional[LogQueue] = None,
     latest: int = 1,
     depth: int = 1,
     log_ver: Union[bool, LogVer] = False,
@@ -210,6 +1288,16 @@ def etrace(
     omit_parms: Optional[Iterable[str]] = None,
     omit_return_value: bool = False,
     omit_caller: bool = False,
+    time_call: bool = False,
+    sample_every: int = 1,
+    first_calls: Optional[int] = None,
+    slow_secs: Optional[float] = None,
+    bounded_repr: Union[bool, BoundedRepr] = False,
+    logger_name: Optional[str] = None,
+    recorder: Optional[Union[TraceRecorder, CallTreeProfiler]] = None,
+    correlate: bool = False,
+    governor: Optional[OverheadGovernor] = None,
+    log_queue: Optional[LogQueue] = None,
     latest: int = 1,
     depth: int = 1,
     log_ver: Union[bool, LogVer] = False,
@@ -222,10 +1310,53 @@ def etrace(
             decorated function or method.
         omit_parms: list of parameter names whose argument values should
             appear in the trace as ellipses. This can help reduce the
-            size of the trace entry for large arguments.
+            size of the trace entry for large arguments. Unless the
+            decorated function has a VAR_KEYWORD parameter (e.g.,
+            **kwargs), each name must be one of its parameters.
         omit_return_value: if True, do not place the return value into
             the exit trace entry.
         omit_caller: if True, the call sequence will not be traced.
+        time_call: if True, the exit trace includes the elapsed time of
+            the call as measured with time.perf_counter_ns.
+        sample_every: specifies that only one of every *sample_every*
+            calls is to be traced, starting with the first call.
+        first_calls: specifies that only the first *first_calls* calls
+            are to be traced. When combined with *sample_every*, the
+            sampled calls among the first *first_calls* calls are
+            traced.
+        slow_secs: specifies that only calls that take at least
+            *slow_secs* seconds are to be traced. The entry trace of
+            such a call is issued along with its exit trace, and the
+            exit trace includes the elapsed time as if *time_call* were
+            True.
+        bounded_repr: specifies that the argument values and the return
+            value are to be traced with a BoundedRepr, which limits the
+            size of the trace text and the time spent building it for
+            large values. True specifies a BoundedRepr with the default
+            limits, and a BoundedRepr instance specifies its own limits
+            and per-type overrides. With a BoundedRepr, the argument
+            values are traced with their repr instead of their str.
+        logger_name: the name of the logger to use for the trace. The
+            default is the name of the module that applies etrace.
+        recorder: specifies a TraceRecorder or a CallTreeProfiler that
+            the entry and exit of each call are to be recorded into as
+            compact events in place of the entry and exit log messages.
+            Only *enable_trace*, *sample_every*, and *first_calls* apply
+            to the recorded events, and the options that control the
+            content of the log messages are ignored.
+        correlate: if True, the entry and exit log records of each call
+            are given the extra attributes listed in note 12, which can
+            be used by a logging.Formatter or logging.Filter and by
+            etrace_timelines to match the exit of each call to its
+            entry.
+        governor: specifies an OverheadGovernor that measures the time
+            spent by etrace for each call against the time spent in
+            the function, and throttles the trace to sampling while the
+            overhead or the rate of calls is over its limits (see note
+            13).
+        log_queue: specifies a LogQueue that the entry and exit log
+            records are placed on instead of being passed to the
+            handlers of the logger in the traced call (see note 14).
         latest: specifies the position in the call sequence that is to
             be designated as the caller named in the trace output. A
             value of 1, the default, specifies that the caller is one
@@ -268,6 +1399,11 @@ def etrace(
     Returns:
         funtools partial (when wrapped is None) or decorated function
 
+    Raises:
+        ValueError: a name specified in omit_parms is not a known
+            parameter of the decorated function, sample_every is less
+            than 1, or first_calls or slow_secs is negative
+
     Notes:
 
         1) In both the entry and exit trace, the line number following
@@ -282,6 +1418,85 @@ def etrace(
            will include the line number of the call.
         4) The exit trace will include the return value unless
            *omit_return_value* specifies True.
+        5) When the function is decorated, only its code object is
+           used to get the line number and to validate omit_parms. The
+           signature of the decorated function is examined when the
+           first call is traced. The text of the entry trace is then
+           built for each call with a format string that is prepared
+           once for each combination of the number of positional
+           arguments and the names of the keyword arguments (see
+           EntryFormatter).
+        6) When the logger is not enabled for DEBUG (and log_ver is not
+           specified), the decorated function is called directly
+           without building the entry and exit messages.
+        7) When the decorated function is a coroutine function, a
+           generator function, or an asynchronous generator function,
+           the entry trace is issued when the coroutine or generator
+           starts running (i.e., when it is first awaited or iterated)
+           and the exit trace is issued when it completes. The caller
+           in the entry trace is the one that created the coroutine or
+           generator.
+        8) If the decorated function raises an exception, the exit
+           trace is issued with the exception type in place of the
+           return value and the exception is then re-raised. For a
+           generator or coroutine that is closed or cancelled before it
+           completes, the exception type is GeneratorExit or
+           CancelledError.
+        9) The exit log record has the following extra attributes
+           that can be used by a logging.Formatter or logging.Filter:
+
+           a. etrace_elapsed_ns: the elapsed time in nanoseconds when
+              *time_call* is True or *slow_secs* is specified,
+              otherwise None
+           b. etrace_exc_type: the name of the exception type when the
+              decorated function raised an exception, otherwise None
+        10) The *sample_every* and *first_calls* decision is made for
+            each call before anything else is done for the trace. For
+            *slow_secs*, the argument values of a function are formatted
+            before each call, as they are passed, but the call sequence
+            is built and the entry trace is issued after the call only
+            if the call was slow. For a coroutine or generator, the
+            entry trace is built when it is created, as usual, but is
+            issued only if it was slow.
+        11) With a *recorder*, the events are recorded regardless of the
+            logging level, and the function is identified in the events
+            by the same file name, name, and line number that appear in
+            the log messages.
+        12) With *correlate*, each thread keeps a stack of its traced
+            calls that have not yet exited, and the entry and exit log
+            records have the following extra attributes:
+
+            a. etrace_event: "entry" or "exit"
+            b. etrace_call_id: a number that is unique for each traced
+               call of the process and is the same for its entry and
+               exit
+            c. etrace_parent_id: the call id of the most recent traced
+               call of the thread that has not exited at the entry, or
+               None
+            d. etrace_thread_id: the threading.get_ident of the thread
+               that issued the record
+            e. etrace_depth: the number of traced calls of the thread
+               that have not exited, including this one, at the entry
+
+            A generator or coroutine stays on the stack while it is
+            suspended, so it can be the parent of calls that are made
+            by its caller, and a call that is traced only if it is slow
+            is not the parent of the calls that it makes. The extra
+            attributes are not provided when *log_ver* is specified.
+        13) The *governor* applies only to a function that is not a
+            coroutine or generator function and is not traced with
+            *slow_secs* or a *recorder*. Its overhead is measured as the
+            time in etrace before and after the call of the function,
+            so the extra calls of time.perf_counter_ns are the only
+            cost of the measurement. The throttle is decided at the end
+            of each measurement window, after the *sample_every* and
+            *first_calls* decision, and the calls that are skipped
+            while the logger is not enabled for DEBUG are not counted.
+        14) With a *log_queue*, the entry and exit log records are made
+            without looking up the caller of the logger, so their
+            pathname, lineno, and funcName are not set, and the time
+            spent in the handlers is not part of the elapsed time of
+            the call or of the overhead measured by a *governor*.
 
     """
     if wrapped is None:
@@ -293,23 +1508,36 @@ def etrace(
                 omit_parms=omit_parms,
                 omit_return_value=omit_return_value,
                 omit_caller=omit_caller,
+                time_call=time_call,
+                sample_every=sample_every,
+                first_calls=first_calls,
+                slow_secs=slow_secs,
+                bounded_repr=bounded_repr,
+                logger_name=logger_name,
+                recorder=recorder,
+                correlate=correlate,
+                governor=governor,
+                log_queue=log_queue,
                 latest=latest,
                 depth=depth,
                 log_ver=log_ver,
             ),
         )
 
-    try:
-        logger = logging.getLogger(sys._getframemodulename(1))
-    except NameError, AttributeError:
-        logger = logging.getLogger(__name__)
-
-    class LogVerSpec(Enum):
-        """Request for LogVer."""
+    if sample_every < 1:
+        raise ValueError(f"etrace sample_every of {sample_every} is less than 1")
+    if first_calls is not None and first_calls < 0:
+        raise ValueError(f"etrace first_calls of {first_calls} is negative")
+    if slow_secs is not None and slow_secs < 0:
+        raise ValueError(f"etrace slow_secs of {slow_secs} is negative")
 
-        CreateLogVer = auto()
-        UseProvidedLogVer = auto()
-        UseLogger = auto()
+    if logger_name is not None:
+        logger = logging.getLogger(logger_name)
+    else:
+        try:
+            logger = logging.getLogger(sys._getframemodulename(1))
+        except NameError, AttributeError:
+            logger = logging.getLogger(__name__)
 
     if isinstance(log_ver, bool) and log_ver is True:
         log_ver_spec = LogVerSpec.CreateLogVer
@@ -318,68 +1546,112 @@ def etrace(
     else:
         log_ver_spec = LogVerSpec.UseLogger
 
-    omit_parms = set({omit_parms} if isinstance(omit_parms, str) else omit_parms or "")
-
-    if type(wrapped).__name__ in ("staticmethod", "classmethod"):
-        target_file = inspect.getsourcefile(wrapped.__wrapped__).split(  # type: ignore
-            "\\"
-        )[-1]
+    omit_parm_names = set(
+        {omit_parms} if isinstance(omit_parms, str) else omit_parms or ""
+    )
+
+    target_func, target_code, target, skip_self_cls = get_target_info(wrapped)
+
+    # omit_parms is checked now with the parameter names from the code
+    # object, while the signature is examined when the first call is
+    # traced
+    num_parms = target_code.co_argcount + target_code.co_kwonlyargcount
+    parm_names = list(target_code.co_varnames[:num_parms])
+    if target_code.co_flags & inspect.CO_VARARGS:
+        parm_names.append(target_code.co_varnames[num_parms])
+        num_parms += 1
+    if skip_self_cls:
+        parm_names = parm_names[1:]
+    check_omit_parms(
+        omit_parm_names,
+        parm_names,
+        (
+            target_code.co_varnames[num_parms]
+            if target_code.co_flags & inspect.CO_VARKEYWORDS
+            else None
+        ),
+    )
+
+    if isinstance(bounded_repr, BoundedRepr):
+        value_repr: Optional[Callable[[Any], str]] = bounded_repr.repr
+    elif bounded_repr is True:
+        value_repr = BoundedRepr().repr
     else:
-        target_file = inspect.getsourcefile(wrapped).split("\\")[-1]  # type: ignore
+        value_repr = None
 
-    qual_name_list = wrapped.__qualname__.split(".")
+    entry_formatter: Optional[EntryFormatter] = None
 
-    skip_self_cls = False
-    if len(qual_name_list) == 1 or qual_name_list[-2] == "<locals>":
-        # set target_name to function name
-        target_name = qual_name_list[-1]
-    else:
-        # set target_name to class name and method name
-        target_name = f"{qual_name_list[-2]}.{qual_name_list[-1]}"
-        if type(wrapped).__name__ != "staticmethod":
-            skip_self_cls = True
+    def get_entry_formatter() -> EntryFormatter:
+        """Return the entry formatter, creating it on the first call.
 
-    try:
-        target_line_num: Union[int, str] = inspect.getsourcelines(wrapped)[1]
-    except OSError:
-        target_line_num = "?"
-
-    target = f"{target_file}::{target_name}:{target_line_num}"
+        Returns:
+            The EntryFormatter for the decorated function
 
-    if type(wrapped).__name__ == "classmethod":
-        target_sig = inspect.signature(wrapped.__func__)  # type: ignore
-        skip_self_cls = True
+        """
+        nonlocal entry_formatter
+        if entry_formatter is None:
+            if type(wrapped).__name__ == "classmethod":
+                target_sig = inspect.signature(wrapped.__func__)  # type: ignore
+            else:
+                target_sig = inspect.signature(wrapped)
+
+            target_parms = list(target_sig.parameters.values())
+            if skip_self_cls:
+                target_parms = target_parms[1:]
+
+            # if two threads make the first traced call at the same
+            # time, both create an equivalent formatter
+            entry_formatter = EntryFormatter(
+                target=target,
+                parms=target_parms,
+                omit_parms=omit_parm_names,
+                omit_caller=omit_caller,
+                value_repr=value_repr,
+            )
+        return entry_formatter
+
+    if inspect.iscoroutinefunction(target_func):
+        target_kind = TargetKind.Coroutine
+    elif inspect.isasyncgenfunction(target_func):
+        target_kind = TargetKind.AsyncGenerator
+    elif inspect.isgeneratorfunction(target_func):
+        target_kind = TargetKind.Generator
     else:
-        target_sig = inspect.signature(wrapped)
-
-    target_sig_array: dict[str, Any] = {}
-    target_sig_names = []
-    target_sig_kind = []
-    var_pos_idx = -1
+        target_kind = TargetKind.Function
 
-    for pidx, parm in enumerate(target_sig.parameters):
-        if pidx == 0 and skip_self_cls:
-            continue
+    if omit_return_value:
+        exit_msg_prefix = f"{target} exit: return value omitted"
+    else:
+        exit_msg_prefix = f"{target} exit: return_value="
 
-        # VAR_KORD (e.g., **kwargs) is not needed in the
-        # target_sig_array - there are no defaults for kwargs, and the
-        # code below in trace_wrapper will simply add instead of
-        # updating the target_sig_array as it encounters any kwargs
-        if target_sig.parameters[parm].kind == inspect.Parameter.VAR_KEYWORD:
-            continue
+    # the calls are numbered only when they are sampled
+    sample_calls = sample_every > 1 or first_calls is not None
+    call_counter = itertools.count()
+    max_calls = float("inf") if first_calls is None else first_calls
 
-        parm_name = target_sig.parameters[parm].name
+    slow_ns = None if slow_secs is None else int(slow_secs * 1_000_000_000)
+    time_calls = time_call or slow_ns is not None
 
-        def_val = target_sig.parameters[parm].default
+    if recorder is not None:
+        # the recorder takes the place of the log messages
+        func_id = recorder.register(target)
+        slow_ns = None
+        time_calls = False
 
-        if def_val is inspect.Parameter.empty:
-            target_sig_array[parm_name] = "?"
-        else:
-            target_sig_array[parm_name] = def_val
-        target_sig_names.append(parm_name)
-        target_sig_kind.append(target_sig.parameters[parm].kind)
-        if target_sig.parameters[parm].kind == inspect.Parameter.VAR_POSITIONAL:
-            var_pos_idx = len(target_sig_kind) - 1
+    if log_queue is None:
+        log_debug: Callable[..., None] = logger.debug
+    else:
+        log_debug = functools.partial(log_queue.log, logger, logging.DEBUG)
+
+    if (
+        governor is not None
+        and recorder is None
+        and slow_ns is None
+        and target_kind == TargetKind.Function
+    ):
+        governed_target: Optional[GovernedTarget] = governor.register(target, logger)
+    else:
+        governed_target = None
 
     @wrapt.decorator(enabled=enable_trace)  # type: ignore
     def trace_wrapper(
@@ -389,93 +1661,1066 @@ def etrace(
         kwargs: dict[str, Any],
     ) -> Any:
         """Setup the trace."""
-        target_sig_array_copy = target_sig_array.copy()
-
-        # for VAR_POSITIONAL, we can have a signature of f(*args), or
-        # we can have, for example, f(a1, *args). So, we keep track of
-        # the index of the *args keyword and use it here to load the
-        # trace values appropriately. Note that we can't have
-        # f(*args, a1), so once we determine we are now at a
-        # VAR_POSITIONAL index we simply load the remainder of the
-        # positional args into a tuple and place that into the array,
-        # and then break out of the loop.
-
-        for idx, arg in enumerate(args):
-            if target_sig_kind[idx] == inspect.Parameter.VAR_POSITIONAL:
-                target_sig_array_copy[target_sig_names[idx]] = tuple(args[idx:])
-                break
-            target_sig_array_copy[target_sig_names[idx]] = arg
-
-        for key, item in kwargs.items():
-            target_sig_array_copy[key] = item
-
-        for omit_parm_name in omit_parms:
-            if omit_parm_name in target_sig_array_copy:
-                target_sig_array_copy[omit_parm_name] = "..."
-            else:
-                raise ValueError(
-                    f"{omit_parm_name} specified in omit_parms is not a known parameter"
-                )
-
-        if (
-            var_pos_idx >= 0
-            and target_sig_array_copy[target_sig_names[var_pos_idx]] == "?"
+        # Logger.isEnabledFor caches its answer per level, and logging
+        # clears that cache whenever the configuration changes (e.g.,
+        # setLevel, disable, or dictConfig), so this check is cheap
+        if log_ver_spec == LogVerSpec.UseLogger and not logger.isEnabledFor(
+            logging.DEBUG
         ):
-            del target_sig_array_copy[target_sig_names[var_pos_idx]]
-
-        spc1: str = " "
-        comma1: str = ""
-        log_sig_array = ""
-        for key, item in target_sig_array_copy.items():
-            if isinstance(item, str) and item != "?":
-                log_sig_array = f"{spc1}{log_sig_array}{comma1}{key}='{item}'"
-            else:
-                log_sig_array = f"{spc1}{log_sig_array}{comma1}{key}={item}"
-            spc1 = ""
-            comma1 = ", "
-
-        caller_str: str = ""
-        if not omit_caller:
-            if log_sig_array:
-                caller_str = ","
-            caller_str = (
-                f"{caller_str} caller: "
-                f"{get_formatted_call_sequence(latest=latest, depth=depth)}"
-            )
+            return wrapped(*args, **kwargs)
+
+        if sample_calls:
+            # next on itertools.count is atomic, so each call gets its
+            # own number without a lock
+            call_num = next(call_counter)
+            if call_num % sample_every or call_num >= max_calls:
+                return wrapped(*args, **kwargs)
 
-        entry_msg = f"{target} entry:{log_sig_array}{caller_str}"
+        if slow_ns is not None and target_kind == TargetKind.Function:
+            return trace_slow_call(wrapped, instance, args, kwargs)
+
+        if governed_target is not None:
+            return trace_governed_call(wrapped, instance, args, kwargs)
+
+        if omit_caller:
+            caller_seq = ""
+        else:
+            caller_seq = get_formatted_call_sequence(latest=latest, depth=depth)
+
+        entry_msg = (entry_formatter or get_entry_formatter()).format(
+            args, kwargs, caller_seq
+        )
 
         ################################################################
-        # set up for LogVer as requested and log the entry
+        # coroutines and generators are traced when they run
         ################################################################
+        if target_kind == TargetKind.Coroutine:
+            return trace_coroutine(wrapped, instance, args, kwargs, entry_msg)
+        if target_kind == TargetKind.AsyncGenerator:
+            return trace_async_generator(wrapped, instance, args, kwargs, entry_msg)
+        if target_kind == TargetKind.Generator:
+            return trace_generator(wrapped, instance, args, kwargs, entry_msg)
+
+        ################################################################
+        # log the entry, call wrapped function, and log the exit
+        ################################################################
+        call_extra = log_entry(instance, entry_msg)
+
+        start_ns = time.perf_counter_ns() if time_calls else 0
+        try:
+            return_value = wrapped(*args, **kwargs)
+        except BaseException as exc:
+            log_exit(instance, None, start_ns, exc, call_extra=call_extra)
+            raise
+
+        log_exit(instance, return_value, start_ns, call_extra=call_extra)
+
+        return return_value
+
+    ####################################################################
+    # log_entry
+    ####################################################################
+    def log_entry(instance: Optional[Any], entry_msg: str) -> Optional[dict[str, Any]]:
+        """Set up for LogVer as requested and log the entry.
+
+        Args:
+            instance: the instance of a decorated method
+            entry_msg: the entry message
+
+        Returns:
+            The extra attributes of the entry log record when correlate
+            is True, otherwise None
+
+        """
+        if recorder is not None:
+            recorder.record(func_id, True)
+            return None
+
         if log_ver_spec == LogVerSpec.UseLogger:
-            logger.debug(entry_msg)
-        elif log_ver_spec == LogVerSpec.CreateLogVer:
+            call_extra = _start_call() if correlate else None
+            log_debug(entry_msg, extra=call_extra)
+            return call_extra
+
+        if log_ver_spec == LogVerSpec.CreateLogVer:
             instance.log_ver = LogVer(log_name=logger.name)  # type: ignore
             instance.log_ver.test_msg(log_msg=entry_msg)  # type: ignore
         else:  # log_ver_spec == LogVerSpec.UseProvidedLogVer:
             log_ver.test_msg(log_msg=entry_msg)  # type: ignore
+        return None
 
-        ################################################################
-        # call wrapped function
-        ################################################################
-        return_value = wrapped(*args, **kwargs)
-
-        if omit_return_value:
-            exit_msg = f"{target} exit: return value omitted"
+    ####################################################################
+    # log_exit
+    ####################################################################
+    def log_exit(
+        instance: Optional[Any],
+        return_value: Any,
+        start_ns: int,
+        exc: Optional[BaseException] = None,
+        entry_msg: Optional[str] = None,
+        call_extra: Optional[dict[str, Any]] = None,
+    ) -> None:
+        """Log the exit.
+
+        Args:
+            instance: the instance of a decorated method
+            return_value: the value returned by the decorated function
+            start_ns: the perf_counter_ns value when the call started
+            exc: the exception raised by the decorated function
+            entry_msg: the entry message of a call that is traced only
+                if it is slow, in which case the entry is logged here
+                ahead of the exit
+            call_extra: the extra attributes of the entry log record
+
+        """
+        if recorder is not None:
+            recorder.record(func_id, False)
+            return
+
+        elapsed_ns = time.perf_counter_ns() - start_ns if time_calls else None
+
+        if entry_msg is not None:
+            if elapsed_ns < slow_ns:  # type: ignore
+                return
+            call_extra = log_entry(instance, entry_msg)
+
+        if exc is not None:
+            exc_type: Optional[str] = type(exc).__name__
+            exit_msg = f"{target} exit: exception={exc_type}"
         else:
-            exit_msg = f"{target} exit: {return_value=}"
+            exc_type = None
+            if omit_return_value:
+                exit_msg = exit_msg_prefix
+            elif value_repr is not None:
+                exit_msg = f"{exit_msg_prefix}{value_repr(return_value)}"
+            else:
+                exit_msg = f"{exit_msg_prefix}{return_value!r}"
+
+        if time_calls:
+            exit_msg = f"{exit_msg}, elapsed_ns={elapsed_ns}"
 
-        ################################################################
-        # log the exit
-        ################################################################
         if log_ver_spec == LogVerSpec.UseLogger:
-            logger.debug(exit_msg)
+            extra = {"etrace_elapsed_ns": elapsed_ns, "etrace_exc_type": exc_type}
+            if call_extra is not None:
+                extra.update(_end_call(call_extra))
+            log_debug(exit_msg, extra=extra)
         elif log_ver_spec == LogVerSpec.CreateLogVer:
             instance.log_ver.test_msg(log_msg=exit_msg)  # type: ignore
         else:  # log_ver_spec == LogVerSpec.UseProvidedLogVer:
             log_ver.test_msg(log_msg=exit_msg)  # type: ignore
 
+    ####################################################################
+    # trace_slow_call
+    ####################################################################
+    def trace_slow_call(
+        wrapped: F,
+        instance: Optional[Any],
+        args: tuple[Any, ...],
+        kwargs: dict[str, Any],
+    ) -> Any:
+        """Trace a call only if it is slow.
+
+        Args:
+            wrapped: the decorated function
+            instance: the instance of a decorated method
+            args: the positional arguments of the call
+            kwargs: the keyword arguments of the call
+
+        Returns:
+            The return value of the decorated function
+
+        """
+        # the argument values are formatted before the call since the
+        # call could change them, but the call sequence, which is the
+        # end of the entry message, is built only if the call is slow
+        args_msg = (entry_formatter or get_entry_formatter()).format(args, kwargs, "")
+
+        return_value = None
+        exc: Optional[BaseException] = None
+        start_ns = time.perf_counter_ns()
+        try:
+            return_value = wrapped(*args, **kwargs)
+            return return_value
+        except BaseException as err:
+            exc = err
+            raise
+        finally:
+            if time.perf_counter_ns() - start_ns >= slow_ns:  # type: ignore
+                # the caller is one more call back from here than it is
+                # from trace_wrapper
+                if omit_caller:
+                    caller_seq = ""
+                else:
+                    caller_seq = get_formatted_call_sequence(
+                        latest=latest + 1, depth=depth
+                    )
+                log_exit(
+                    instance, return_value, start_ns, exc, f"{args_msg}{caller_seq}"
+                )
+
+    ####################################################################
+    # trace_governed_call
+    ####################################################################
+    def trace_governed_call(
+        wrapped: F,
+        instance: Optional[Any],
+        args: tuple[Any, ...],
+        kwargs: dict[str, Any],
+    ) -> Any:
+        """Trace a call and measure the overhead of the trace.
+
+        Args:
+            wrapped: the decorated function
+            instance: the instance of a decorated method
+            args: the positional arguments of the call
+            kwargs: the keyword arguments of the call
+
+        Returns:
+            The return value of the decorated function
+
+        """
+        trace_start_ns = time.perf_counter_ns()
+        if governed_target.skip_call(trace_start_ns):  # type: ignore
+            return wrapped(*args, **kwargs)
+
+        # the caller is one more call back from here than it is from
+        # trace_wrapper
+        if omit_caller:
+            caller_seq = ""
+        else:
+            caller_seq = get_formatted_call_sequence(latest=latest + 1, depth=depth)
+
+        entry_msg = (entry_formatter or get_entry_formatter()).format(
+            args, kwargs, caller_seq
+        )
+        call_extra = log_entry(instance, entry_msg)
+
+        return_value = None
+        exc: Optional[BaseException] = None
+        start_ns = time.perf_counter_ns()
+        try:
+            return_value = wrapped(*args, **kwargs)
+            return return_value
+        except BaseException as err:
+            exc = err
+            raise
+        finally:
+            end_ns = time.perf_counter_ns()
+            log_exit(instance, return_value, start_ns, exc, call_extra=call_extra)
+            run_ns = end_ns - start_ns
+            governed_target.add_traced_call(  # type: ignore
+                run_ns, time.perf_counter_ns() - trace_start_ns - run_ns
+            )
+
+    ####################################################################
+    # trace_coroutine
+    ####################################################################
+    async def trace_coroutine(
+        wrapped: F,
+        instance: Optional[Any],
+        args: tuple[Any, ...],
+        kwargs: dict[str, Any],
+        entry_msg: str,
+    ) -> Any:
+        """Trace a coroutine when it is awaited.
+
+        Args:
+            wrapped: the decorated coroutine function
+            instance: the instance of a decorated method
+            args: the positional arguments of the call
+            kwargs: the keyword arguments of the call
+            entry_msg: the entry message
+
+        Returns:
+            The return value of the coroutine
+
+        """
+        if slow_ns is None:
+            call_extra = log_entry(instance, entry_msg)
+            slow_entry_msg = None
+        else:
+            call_extra = None
+            slow_entry_msg = entry_msg
+
+        start_ns = time.perf_counter_ns() if time_calls else 0
+        try:
+            return_value = await wrapped(*args, **kwargs)
+        except BaseException as exc:
+            log_exit(instance, None, start_ns, exc, slow_entry_msg, call_extra)
+            raise
+
+        log_exit(instance, return_value, start_ns, None, slow_entry_msg, call_extra)
+
+        return return_value
+
+    ####################################################################
+    # trace_generator
+    ####################################################################
+    def trace_generator(
+        wrapped: F,
+        instance: Optional[Any],
+        args: tuple[Any, ...],
+        kwargs: dict[str, Any],
+        entry_msg: str,
+    ) -> Generator[Any, Any, Any]:
+        """Trace a generator when it is iterated.
+
+        Args:
+            wrapped: the decorated generator function
+            instance: the instance of a decorated method
+            args: the positional arguments of the call
+            kwargs: the keyword arguments of the call
+            entry_msg: the entry message
+
+        Returns:
+            The return value of the generator
+
+        """
+        if slow_ns is None:
+            call_extra = log_entry(instance, entry_msg)
+            slow_entry_msg = None
+        else:
+            call_extra = None
+            slow_entry_msg = entry_msg
+
+        start_ns = time.perf_counter_ns() if time_calls else 0
+        try:
+            # yield from passes along send, throw, and close
+            return_value = yield from wrapped(*args, **kwargs)
+        except BaseException as exc:
+            log_exit(instance, None, start_ns, exc, slow_entry_msg, call_extra)
+            raise
+
+        log_exit(instance, return_value, start_ns, None, slow_entry_msg, call_extra)
+
         return return_value
 
+    ####################################################################
+    # trace_async_generator
+    ####################################################################
+    async def trace_async_generator(
+        wrapped: F,
+        instance: Optional[Any],
+        args: tuple[Any, ...],
+        kwargs: dict[str, Any],
+        entry_msg: str,
+    ) -> AsyncGenerator[Any, Any]:
+        """Trace an asynchronous generator when it is iterated.
+
+        Args:
+            wrapped: the decorated asynchronous generator function
+            instance: the instance of a decorated method
+            args: the positional arguments of the call
+            kwargs: the keyword arguments of the call
+            entry_msg: the entry message
+
+        """
+        if slow_ns is None:
+            call_extra = log_entry(instance, entry_msg)
+            slow_entry_msg = None
+        else:
+            call_extra = None
+            slow_entry_msg = entry_msg
+
+        start_ns = time.perf_counter_ns() if time_calls else 0
+        # there is no yield from for asynchronous generators, so asend,
+        # athrow, and aclose are passed along here
+        async_gen = wrapped(*args, **kwargs)
+        try:
+            item = await async_gen.__anext__()
+            while True:
+                try:
+                    sent = yield item
+                except GeneratorExit:
+                    await async_gen.aclose()
+                    raise
+                except BaseException as exc:
+                    item = await async_gen.athrow(exc)
+                else:
+                    item = await async_gen.asend(sent)
+        except StopAsyncIteration:
+            pass
+        except BaseException as exc:
+            log_exit(instance, None, start_ns, exc, slow_entry_msg, call_extra)
+            raise
+
+        # an asynchronous generator can not return a value
+        log_exit(instance, None, start_ns, None, slow_entry_msg, call_extra)
+
+    ####################################################################
+    # record_wrapper
+    ####################################################################
+    @wrapt.decorator(enabled=enable_trace)  # type: ignore
+    def record_wrapper(
+        wrapped: F,
+        instance: Optional[Any],
+        args: tuple[Any, ...],
+        kwargs: dict[str, Any],
+    ) -> Any:
+        """Record the entry and exit in the recorder."""
+        if sample_calls:
+            call_num = next(call_counter)
+            if call_num % sample_every or call_num >= max_calls:
+                return wrapped(*args, **kwargs)
+
+        if target_kind == TargetKind.Coroutine:
+            return trace_coroutine(wrapped, instance, args, kwargs, "")
+        if target_kind == TargetKind.AsyncGenerator:
+            return trace_async_generator(wrapped, instance, args, kwargs, "")
+        if target_kind == TargetKind.Generator:
+            return trace_generator(wrapped, instance, args, kwargs, "")
+
+        record(func_id, True)
+        try:
+            return wrapped(*args, **kwargs)
+        finally:
+            record(func_id, False)
+
+    if recorder is not None:
+        record = recorder.record
+        return cast(F, record_wrapper(wrapped))
+
     return cast(F, trace_wrapper(wrapped))
+
+
+####################################################################
+# etrace_all
+####################################################################
+def etrace_all(
+    target: Union[type, types.ModuleType],
+    include: Union[str, Iterable[str]] = "*",
+    exclude: Optional[Union[str, Iterable[str]]] = None,
+    **etrace_kwargs: Any,
+) -> list[str]:
+    """Apply etrace to the methods of a class or functions of a module.
+
+    Args:
+        target: the class whose methods or the module whose functions
+            are to be traced
+        include: glob pattern or patterns (as used by fnmatch) for the
+            names of the methods or functions to be traced
+        exclude: glob pattern or patterns for the names of the methods
+            or functions that are not to be traced even though they
+            match *include*
+        etrace_kwargs: the keyword arguments to pass to etrace
+
+    Returns:
+        The sorted names of the methods or functions that were traced
+
+    Notes:
+
+        1) For a class, the functions, static methods, and class methods
+           defined in the class itself are traced. Special methods
+           (e.g., __repr__) other than __init__ are not traced.
+        2) For a module, the functions defined in the module itself are
+           traced. Functions imported from other modules and classes are
+           not traced - use etrace_all on a class to trace its methods.
+        3) A method or function that is already traced is skipped.
+        4) Since etrace examines the signature of a function only when
+           its first call is traced, tracing a large module or class
+           does not slow down the start up.
+        5) Unless specified in *etrace_kwargs*, the logger is the one
+           named for the module of the class or the module itself.
+
+    :Example: trace the methods of a class whose names start with get
+
+    >>> from scottbrian_utils.entry_trace import etrace_all
+    >>> class Cls1:
+    ...     def get_one(self) -> int:
+    ...         return 1
+    ...     def put_one(self) -> None:
+    ...         pass
+    >>> etrace_all(Cls1, include="get_*")
+    ['get_one']
+
+    """
+    includes = [include] if isinstance(include, str) else list(include)
+    if exclude is None:
+        excludes = []
+    elif isinstance(exclude, str):
+        excludes = [exclude]
+    else:
+        excludes = list(exclude)
+
+    is_module = isinstance(target, types.ModuleType)
+    if is_module:
+        etrace_kwargs.setdefault("logger_name", target.__name__)
+    else:
+        etrace_kwargs.setdefault("logger_name", target.__module__)
+
+    traced_names = []
+    for name, member in list(vars(target).items()):
+        if not any(fnmatch.fnmatchcase(name, pattern) for pattern in includes):
+            continue
+        if any(fnmatch.fnmatchcase(name, pattern) for pattern in excludes):
+            continue
+
+        # a traced function is a wrapt FunctionWrapper that passes
+        # isinstance checks for the function it wraps, so it is checked
+        # first
+        if isinstance(member, wrapt.FunctionWrapper):
+            continue
+
+        if is_module:
+            if (
+                not isinstance(member, types.FunctionType)
+                or member.__module__ != target.__name__
+            ):
+                continue
+        else:
+            if not isinstance(member, (types.FunctionType, staticmethod, classmethod)):
+                continue
+            if name.startswith("__") and name.endswith("__") and name != "__init__":
+                continue
+
+        setattr(target, name, etrace(member, **etrace_kwargs))
+        traced_names.append(name)
+
+    return sorted(traced_names)
+
+
+########################################################################
+# TimelineCall
+########################################################################
+class TimelineCall(NamedTuple):
+    """A traced call in the timeline of a thread."""
+
+    call_id: int
+    parent_id: Optional[int]
+    depth: int
+    entry_time: float
+    entry_msg: str
+    exit_time: Optional[float]
+    exit_msg: Optional[str]
+    elapsed_ns: Optional[int]
+    exc_type: Optional[str]
+
+
+####################################################################
+# etrace_timelines
+####################################################################
+def etrace_timelines(
+    records: Iterable[logging.LogRecord],
+) -> dict[int, list[TimelineCall]]:
+    """Return the traced calls of each thread from the log records.
+
+    Args:
+        records: the log records in the order they were issued, such as
+            the records kept by a logging.handlers.MemoryHandler or the
+            caplog.records of pytest. Only the entry and exit records of
+            etrace with correlate=True are used, and the other records
+            are skipped.
+
+    Returns:
+        A dictionary with the calls of each thread, keyed by the thread
+        id and in the order of their entry. A call whose exit record
+        was not found has None for its exit fields.
+
+    Notes:
+
+        1) The records are processed in a single pass. The entry of
+           each call is placed in the timeline of its thread, and its
+           exit is matched to it with the call id.
+
+    :Example: get the timeline of the main thread
+
+    >>> import logging
+    >>> import logging.handlers
+    >>> import threading
+    >>> from scottbrian_utils.entry_trace import etrace
+    >>> from scottbrian_utils.entry_trace import etrace_timelines
+    >>> handler = logging.handlers.MemoryHandler(capacity=100)
+    >>> logger = logging.getLogger("timeline_example")
+    >>> logger.addHandler(handler)
+    >>> logger.setLevel(logging.DEBUG)
+    >>> opts = dict(correlate=True, logger_name=logger.name)
+    >>> @etrace(**opts)
+    ... def f2() -> int:
+    ...     return 2
+    >>> @etrace(**opts)
+    ... def f1() -> int:
+    ...     return f2()
+    >>> f1()
+    2
+    >>> timelines = etrace_timelines(handler.buffer)
+    >>> timeline = timelines[threading.get_ident()]
+    >>> for call in timeline:
+    ...     func_name = call.entry_msg.split("::")[1].split(":")[0]
+    ...     print(call.depth, func_name)
+    1 f1
+    2 f2
+
+    """
+    timelines: dict[int, list[TimelineCall]] = {}
+    open_calls: dict[int, tuple[list[TimelineCall], int]] = {}
+    for record in records:
+        fields = record.__dict__
+        event = fields.get("etrace_event")
+        if event == "entry":
+            timeline = timelines.setdefault(fields["etrace_thread_id"], [])
+            open_calls[fields["etrace_call_id"]] = (timeline, len(timeline))
+            timeline.append(
+                TimelineCall(
+                    call_id=fields["etrace_call_id"],
+                    parent_id=fields["etrace_parent_id"],
+                    depth=fields["etrace_depth"],
+                    entry_time=record.created,
+                    entry_msg=record.getMessage(),
+                    exit_time=None,
+                    exit_msg=None,
+                    elapsed_ns=None,
+                    exc_type=None,
+                )
+            )
+        elif event == "exit":
+            try:
+                timeline, idx = open_calls.pop(fields["etrace_call_id"])
+            except KeyError:
+                continue
+            timeline[idx] = timeline[idx]._replace(
+                exit_time=record.created,
+                exit_msg=record.getMessage(),
+                elapsed_ns=fields["etrace_elapsed_ns"],
+                exc_type=fields["etrace_exc_type"],
+            )
+
+    return timelines
+
+
+########################################################################
+# MonitorTarget
+########################################################################
+class MonitorTarget(NamedTuple):
+    """A function traced by EtraceMonitor."""
+
+    target: str
+    logger: logging.Logger
+    entry_formatter: EntryFormatter
+    arg_names: tuple[str, ...]
+    var_pos_name: Optional[str]
+    var_kw_name: Optional[str]
+    omit_caller: bool
+    exit_msg_prefix: str
+    omit_return_value: bool
+    value_repr: Optional[Callable[[Any], str]]
+    latest: int
+    depth: int
+
+
+########################################################################
+# EtraceMonitor class
+########################################################################
+class EtraceMonitor:
+    """Trace the entry and exit of functions with sys.monitoring.
+
+    The functions are not wrapped. Instead, the PY_START and PY_RETURN
+    events of sys.monitoring (PEP 669) are switched on for the code
+    object of each function while it is being traced, and the same
+    entry and exit log messages as those of etrace are issued from the
+    event callbacks. A function that is not being traced runs with no
+    overhead at all since the interpreter removes the instrumentation
+    when its events are switched off.
+
+    The exit of a function by an exception is seen with the PY_UNWIND
+    event, which can only be switched on for all code. It is switched on
+    only while a traced function is running, so the rest of the program
+    is not slowed when no traced function is running. Each switch makes
+    the interpreter check the instrumentation of the code it runs next,
+    which is paid once for each outermost call of a traced function.
+
+    """
+
+    ####################################################################
+    # __init__
+    ####################################################################
+    def __init__(self, tool_id: int = 4) -> None:
+        """Initialize the object.
+
+        Args:
+            tool_id: the sys.monitoring tool id (0 to 5) to use. It is
+                acquired when the first function is enabled and must not
+                be in use by another tool at that time.
+
+        """
+        self.tool_id = tool_id
+        self._targets: dict[types.CodeType, MonitorTarget] = {}
+        # the number of running frames of each traced code object, and
+        # of all of them, for which PY_UNWIND is switched on
+        self._active: dict[types.CodeType, int] = {}
+        self._num_active = 0
+        self._lock = threading.Lock()
+
+    ####################################################################
+    # __repr__
+    ####################################################################
+    def __repr__(self) -> str:
+        """Return a repr of the class.
+
+        Returns:
+            repr of the class
+
+        """
+        return f"{type(self).__name__}(tool_id={self.tool_id})"
+
+    ####################################################################
+    # enable
+    ####################################################################
+    def enable(
+        self,
+        func: Any,
+        *,
+        omit_parms: Optional[Iterable[str]] = None,
+        omit_return_value: bool = False,
+        omit_caller: bool = False,
+        bounded_repr: Union[bool, BoundedRepr] = False,
+        logger_name: Optional[str] = None,
+        latest: int = 1,
+        depth: int = 1,
+    ) -> None:
+        """Start tracing a function.
+
+        Args:
+            func: the function, method, staticmethod, or classmethod to
+                be traced
+            omit_parms: same as for etrace
+            omit_return_value: same as for etrace
+            omit_caller: same as for etrace
+            bounded_repr: same as for etrace
+            logger_name: the name of the logger to use for the trace.
+                The default is the name of the module of *func*.
+            latest: same as for etrace, except that no wrapper is on
+                the call stack so the value need not be adjusted for
+                stacked decorators
+            depth: same as for etrace
+
+        Raises:
+            ValueError: a name specified in omit_parms is not a known
+                parameter of the function, or the tool id is in use by
+                another tool
+
+        Notes:
+
+            1) A function that is already enabled is enabled again with
+               the new options.
+            2) A static method must be specified as the staticmethod
+               object from the class dictionary (e.g.,
+               vars(Cls1)["sm1"]) since otherwise it can not be told
+               apart from an instance method.
+
+        """
+        if inspect.ismethod(func):
+            func = func.__func__
+
+        target_func, target_code, target, skip_self_cls = get_target_info(func)
+
+        target_parms = list(inspect.signature(target_func).parameters.values())
+        if skip_self_cls:
+            target_parms = target_parms[1:]
+
+        if isinstance(bounded_repr, BoundedRepr):
+            value_repr: Optional[Callable[[Any], str]] = bounded_repr.repr
+        elif bounded_repr is True:
+            value_repr = BoundedRepr().repr
+        else:
+            value_repr = None
+
+        omit_parm_names = set(
+            {omit_parms} if isinstance(omit_parms, str) else omit_parms or ""
+        )
+
+        # the argument values are taken from the local variables of the
+        # frame when the function starts, and are all passed to the
+        # entry formatter as keyword arguments
+        var_pos_name = None
+        var_kw_name = None
+        arg_names = []
+        for parm in target_parms:
+            if parm.kind == inspect.Parameter.VAR_POSITIONAL:
+                var_pos_name = parm.name
+            elif parm.kind == inspect.Parameter.VAR_KEYWORD:
+                var_kw_name = parm.name
+            else:
+                arg_names.append(parm.name)
+
+        if omit_return_value:
+            exit_msg_prefix = f"{target} exit: return value omitted"
+        else:
+            exit_msg_prefix = f"{target} exit: return_value="
+
+        monitor_target = MonitorTarget(
+            target=target,
+            logger=logging.getLogger(logger_name or target_func.__module__),
+            entry_formatter=EntryFormatter(
+                target=target,
+                parms=target_parms,
+                omit_parms=omit_parm_names,
+                omit_caller=omit_caller,
+                value_repr=value_repr,
+            ),
+            arg_names=tuple(arg_names),
+            var_pos_name=var_pos_name,
+            var_kw_name=var_kw_name,
+            omit_caller=omit_caller,
+            exit_msg_prefix=exit_msg_prefix,
+            omit_return_value=omit_return_value,
+            value_repr=value_repr,
+            latest=latest,
+            depth=depth,
+        )
+
+        monitoring = sys.monitoring
+        with self._lock:
+            if not self._targets:
+                self._start_tool()
+            self._targets[target_code] = monitor_target
+            monitoring.set_local_events(
+                self.tool_id,
+                target_code,
+                monitoring.events.PY_START | monitoring.events.PY_RETURN,
+            )
+
+    ####################################################################
+    # disable
+    ####################################################################
+    def disable(self, func: Any) -> None:
+        """Stop tracing a function.
+
+        Args:
+            func: the function, method, staticmethod, or classmethod to
+                stop tracing. A function that is not enabled is ignored.
+
+        """
+        if inspect.ismethod(func) or type(func).__name__ in (
+            "staticmethod",
+            "classmethod",
+        ):
+            func = func.__func__
+        target_code = inspect.unwrap(func).__code__
+
+        with self._lock:
+            if self._targets.pop(target_code, None) is None:
+                return
+            sys.monitoring.set_local_events(self.tool_id, target_code, 0)
+            # the running frames of the function no longer end with an
+            # event that is seen
+            self._end_frames(target_code, self._active.get(target_code, 0))
+            if not self._targets:
+                self._stop_tool()
+
+    ####################################################################
+    # disable_all
+    ####################################################################
+    def disable_all(self) -> None:
+        """Stop tracing all functions and release the tool id."""
+        with self._lock:
+            for target_code in self._targets:
+                sys.monitoring.set_local_events(self.tool_id, target_code, 0)
+            if self._targets:
+                self._targets.clear()
+                self._active.clear()
+                self._num_active = 0
+                self._stop_tool()
+
+    ####################################################################
+    # is_enabled
+    ####################################################################
+    def is_enabled(self, func: Any) -> bool:
+        """Return whether a function is being traced.
+
+        Args:
+            func: the function, method, staticmethod, or classmethod
+
+        Returns:
+            True if the function is being traced, otherwise False
+
+        """
+        if inspect.ismethod(func) or type(func).__name__ in (
+            "staticmethod",
+            "classmethod",
+        ):
+            func = func.__func__
+        return inspect.unwrap(func).__code__ in self._targets
+
+    ####################################################################
+    # _start_tool
+    ####################################################################
+    def _start_tool(self) -> None:
+        """Acquire the tool id and register the callbacks."""
+        monitoring = sys.monitoring
+        monitoring.use_tool_id(self.tool_id, "etrace")
+        monitoring.register_callback(
+            self.tool_id, monitoring.events.PY_START, self._on_start
+        )
+        monitoring.register_callback(
+            self.tool_id, monitoring.events.PY_RETURN, self._on_return
+        )
+        monitoring.register_callback(
+            self.tool_id, monitoring.events.PY_UNWIND, self._on_unwind
+        )
+
+    ####################################################################
+    # _stop_tool
+    ####################################################################
+    def _stop_tool(self) -> None:
+        """Unregister the callbacks and release the tool id."""
+        monitoring = sys.monitoring
+        monitoring.set_events(self.tool_id, 0)
+        for event in (
+            monitoring.events.PY_START,
+            monitoring.events.PY_RETURN,
+            monitoring.events.PY_UNWIND,
+        ):
+            monitoring.register_callback(self.tool_id, event, None)
+        monitoring.free_tool_id(self.tool_id)
+
+    ####################################################################
+    # _start_frame
+    ####################################################################
+    def _start_frame(self, code: types.CodeType) -> bool:
+        """Count a running frame of a traced function.
+
+        Args:
+            code: the code object of the function
+
+        Returns:
+            True if the function is traced, otherwise False
+
+        """
+        with self._lock:
+            if code not in self._targets:
+                return False
+            self._active[code] = self._active.get(code, 0) + 1
+            self._num_active += 1
+            if self._num_active == 1:
+                # PY_UNWIND can only be switched on for all code
+                sys.monitoring.set_events(self.tool_id, sys.monitoring.events.PY_UNWIND)
+            return True
+
+    ####################################################################
+    # _end_frames
+    ####################################################################
+    def _end_frames(self, code: types.CodeType, num_frames: int) -> None:
+        """Stop counting running frames of a traced function.
+
+        The lock must be held by the caller.
+
+        Args:
+            code: the code object of the function
+            num_frames: the number of frames that ended
+
+        """
+        num_frames = min(num_frames, self._active.get(code, 0))
+        if not num_frames:
+            return
+        if self._active[code] == num_frames:
+            del self._active[code]
+        else:
+            self._active[code] -= num_frames
+        self._num_active -= num_frames
+        if not self._num_active:
+            sys.monitoring.set_events(self.tool_id, 0)
+
+    ####################################################################
+    # _on_start
+    ####################################################################
+    def _on_start(self, code: types.CodeType, instruction_offset: int) -> None:
+        """Log the entry of a traced function.
+
+        Args:
+            code: the code object of the function
+            instruction_offset: offset of the starting instruction
+
+        """
+        monitor_target = self._targets.get(code)
+        if monitor_target is None or not self._start_frame(code):
+            return
+        if not monitor_target.logger.isEnabledFor(logging.DEBUG):
+            return
+
+        # the frame of the traced function is the caller of the callback
+        f_locals = sys._getframe(1).f_locals
+        kwargs = {name: f_locals[name] for name in monitor_target.arg_names}
+        if monitor_target.var_pos_name and f_locals[monitor_target.var_pos_name]:
+            kwargs[monitor_target.var_pos_name] = f_locals[monitor_target.var_pos_name]
+        if monitor_target.var_kw_name:
+            kwargs.update(f_locals[monitor_target.var_kw_name])
+
+        if monitor_target.omit_caller:
+            caller_seq = ""
+        else:
+            # the callback and the traced function are the two most
+            # recent frames
+            caller_seq = get_formatted_call_sequence(
+                latest=monitor_target.latest + 1, depth=monitor_target.depth
+            )
+
+        monitor_target.logger.debug(
+            monitor_target.entry_formatter.format((), kwargs, caller_seq)
+        )
+
+    ####################################################################
+    # _on_return
+    ####################################################################
+    def _on_return(
+        self, code: types.CodeType, instruction_offset: int, return_value: Any
+    ) -> None:
+        """Log the exit of a traced function.
+
+        Args:
+            code: the code object of the function
+            instruction_offset: offset of the return instruction
+            return_value: the value returned by the function
+
+        """
+        with self._lock:
+            self._end_frames(code, 1)
+        # the function may have been disabled by another thread
+        monitor_target = self._targets.get(code)
+        if monitor_target is None:
+            return
+        if not monitor_target.logger.isEnabledFor(logging.DEBUG):
+            return
+
+        if monitor_target.omit_return_value:
+            exit_msg = monitor_target.exit_msg_prefix
+        elif monitor_target.value_repr is not None:
+            exit_msg = (
+                f"{monitor_target.exit_msg_prefix}"
+                f"{monitor_target.value_repr(return_value)}"
+            )
+        else:
+            exit_msg = f"{monitor_target.exit_msg_prefix}{return_value!r}"
+
+        monitor_target.logger.debug(
+            exit_msg, extra={"etrace_elapsed_ns": None, "etrace_exc_type": None}
+        )
+
+    ####################################################################
+    # _on_unwind
+    ####################################################################
+    def _on_unwind(
+        self, code: types.CodeType, instruction_offset: int, exc: BaseException
+    ) -> None:
+        """Log the exit of a traced function that raised an exception.
+
+        Args:
+            code: the code object of the function
+            instruction_offset: offset of the raising instruction
+            exc: the exception
+
+        """
+        # the event occurs for all code while a traced function runs
+        if code not in self._active:
+            return
+        with self._lock:
+            self._end_frames(code, 1)
+        monitor_target = self._targets.get(code)
+        if monitor_target is None:
+            return
+        if not monitor_target.logger.isEnabledFor(logging.DEBUG):
+            return
+
+        exc_type = type(exc).__name__
+        monitor_target.logger.debug(
+            f"{monitor_target.target} exit: exception={exc_type}",
+            extra={"etrace_elapsed_ns": None, "etrace_exc_type": exc_type},
+        )
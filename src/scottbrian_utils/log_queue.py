@@ -0,0 +1,438 @@
+"""Module log_queue.
+
+========
+LogQueue
+========
+
+The LogQueue class moves the I/O of logging out of the code that logs.
+A log record is placed on a queue, which is all that the logging thread
+pays for, and a listener thread that is managed by the LogQueue takes
+the records off the queue in batches and passes them to the handlers,
+flushing the handlers once for each batch. The records that are still
+on the queue are handled when the LogQueue is stopped, which is done
+when the program exits.
+
+The handlers are either those given to the LogQueue or, by default, the
+handlers of the logger of each record and of its ancestors, as logging
+would call them. The log method is the fast path used by etrace
+(scottbrian_utils.entry_trace), diag_msg (scottbrian_utils.diag_msg),
+and Msgs (scottbrian_utils.msgs) when they are given a LogQueue. The
+handler attribute is a QueueHandler that can be added to a logger in
+place of the handlers given to the LogQueue to send the records of the
+logger through the queue.
+
+:Example: log through a LogQueue
+
+>>> import io
+>>> import logging
+>>> from scottbrian_utils.log_queue import LogQueue
+>>> log_output = io.StringIO()
+>>> log_queue = LogQueue(handlers=[logging.StreamHandler(log_output)])
+>>> log_queue.start()
+>>> logger = logging.getLogger("example")
+>>> logger.setLevel(logging.INFO)
+>>> log_queue.log(logger, logging.INFO, "handled by the listener")
+>>> log_queue.stop()
+>>> print(log_output.getvalue(), end="")
+handled by the listener
+
+
+The log_queue module contains:
+
+    1) LogQueue class with methods:
+
+       a. flush
+       b. log
+       c. start
+       d. stop
+
+"""
+
+########################################################################
+# Standard Library
+########################################################################
+import atexit
+import logging
+import queue
+import threading
+import weakref
+from collections.abc import Iterable
+from logging.handlers import QueueHandler
+from typing import Any, Optional
+
+########################################################################
+# Third Party
+########################################################################
+
+########################################################################
+# Local
+########################################################################
+
+
+########################################################################
+# _LogQueueHandler class
+########################################################################
+class _LogQueueHandler(QueueHandler):
+    """QueueHandler that places its records on a LogQueue."""
+
+    def __init__(self, log_queue: "LogQueue") -> None:
+        """Initialize the object.
+
+        Args:
+            log_queue: the LogQueue of the handler
+
+        """
+        super().__init__(log_queue._queue)
+        self.log_queue = log_queue
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """Place a record on the LogQueue.
+
+        Args:
+            record: the prepared log record
+
+        """
+        self.log_queue._put(record)
+
+
+########################################################################
+# LogQueue class
+########################################################################
+class LogQueue:
+    """Queue of log records that are handled by a listener thread."""
+
+    ####################################################################
+    # __init__
+    ####################################################################
+    def __init__(
+        self,
+        handlers: Optional[Iterable[logging.Handler]] = None,
+        batch_size: int = 100,
+    ) -> None:
+        """Initialize the object.
+
+        Args:
+            handlers: the handlers that the records are passed to, each
+                for the records at or above its level. If None, each
+                record is passed to the handlers of its logger and of
+                the ancestors of its logger up to the first logger that
+                does not propagate, other than the handler of this
+                LogQueue.
+            batch_size: the most records handled before the handlers
+                are flushed
+
+        Raises:
+            ValueError: batch_size is less than 1
+
+        """
+        if batch_size < 1:
+            raise ValueError(f"LogQueue batch_size of {batch_size} is less than 1")
+
+        self.handlers = None if handlers is None else list(handlers)
+        self.batch_size = batch_size
+
+        self._queue: queue.SimpleQueue[Any] = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        # the lock is held only to start and stop the listener, and the
+        # drain lock to handle the items left on the queue after a stop
+        self._lock = threading.Lock()
+        self._drain_lock = threading.Lock()
+
+        self.handler: QueueHandler = _LogQueueHandler(self)
+
+    ####################################################################
+    # __repr__
+    ####################################################################
+    def __repr__(self) -> str:
+        """Return a repr of the class.
+
+        Returns:
+            repr of the class
+
+        """
+        return f"{type(self).__name__}(batch_size={self.batch_size})"
+
+    ####################################################################
+    # start
+    ####################################################################
+    def start(self) -> None:
+        """Start the listener thread.
+
+        The LogQueue is stopped when the program exits, so the records
+        on the queue are handled before then.
+
+        """
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="LogQueueListener", daemon=True
+            )
+            self._thread.start()
+            _started_log_queues.add(self)
+
+    ####################################################################
+    # stop
+    ####################################################################
+    def stop(self) -> None:
+        """Stop the listener thread and handle the queued records.
+
+        The records logged after the LogQueue is stopped are handled
+        in the thread that logs them.
+
+        """
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._thread = None
+            self._queue.put(None)
+            _started_log_queues.discard(self)
+
+        # the records and flush events placed on the queue after the
+        # item that stops the listener are handled by the drain
+        thread.join()
+        self._drain()
+
+    ####################################################################
+    # flush
+    ####################################################################
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the records on the queue to be handled.
+
+        Args:
+            timeout: the most seconds to wait, or None for no limit
+
+        Returns:
+            True if the records that were on the queue when flush was
+            called have been handled, otherwise False
+
+        """
+        thread = self._thread
+        if thread is None:
+            return True
+
+        done = threading.Event()
+        self._queue.put(done)
+        self._check_stopped(thread)
+
+        return done.wait(timeout)
+
+    ####################################################################
+    # log
+    ####################################################################
+    def log(
+        self,
+        logger: logging.Logger,
+        level: int,
+        msg: str,
+        extra: Optional[dict[str, Any]] = None,
+    ) -> None:
+        """Log a message through the queue.
+
+        The record is made without finding the caller of log, so its
+        pathname, filename, lineno, and funcName are not set, and msg is
+        the complete message rather than a format string with args. As
+        for the methods of the logger, the record is dropped when the
+        logger is disabled, not enabled for the level, or filtered out
+        by the filters of the logger.
+
+        Args:
+            logger: the logger of the record
+            level: the level of the record
+            msg: the message
+            extra: the extra attributes of the record
+
+        """
+        if logger.disabled or not logger.isEnabledFor(level):
+            return
+
+        record = logger.makeRecord(
+            logger.name, level, "(unknown file)", 0, msg, (), None, extra=extra
+        )
+
+        # as for Logger.handle, the filters of the logger can drop the
+        # record or, in Python 3.12 and later, return a record to use
+        # in its place
+        filtered = logger.filter(record)
+        if not filtered:
+            return
+        if isinstance(filtered, logging.LogRecord):
+            record = filtered
+
+        self._put(record)
+
+    ####################################################################
+    # _put
+    ####################################################################
+    def _put(self, record: logging.LogRecord) -> None:
+        """Place a record on the queue or handle it if stopped.
+
+        Args:
+            record: the log record
+
+        """
+        thread = self._thread
+        if thread is None:
+            self._handle_batch([record])
+            return
+
+        # SimpleQueue.put is thread safe, so the record is placed on the
+        # queue without the lock
+        self._queue.put(record)
+        self._check_stopped(thread)
+
+    ####################################################################
+    # _check_stopped
+    ####################################################################
+    def _check_stopped(self, thread: threading.Thread) -> None:
+        """Drain the queue if the listener was stopped during a put.
+
+        An item that was placed on the queue after the item that stops
+        the listener is not handled by the listener. If stop was called
+        before the item was placed, stop or this drain handles it, and
+        otherwise the item is ahead of the item that stops the listener.
+
+        Args:
+            thread: the listener thread when the item was placed
+
+        """
+        if self._thread is not thread:
+            thread.join()
+            self._drain()
+
+    ####################################################################
+    # _drain
+    ####################################################################
+    def _drain(self) -> None:
+        """Handle the items left on the queue after a stop."""
+        with self._drain_lock:
+            batch = []
+            try:
+                while True:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            if batch:
+                self._handle_batch(batch)
+
+    ####################################################################
+    # _run
+    ####################################################################
+    def _run(self) -> None:
+        """Handle the queued records until stopped."""
+        while self._handle_batch(self._get_batch()):
+            pass
+
+    ####################################################################
+    # _get_batch
+    ####################################################################
+    def _get_batch(self) -> list[Any]:
+        """Wait for the next batch of items on the queue.
+
+        Returns:
+            Up to batch_size items
+
+        """
+        batch = [self._queue.get()]
+        try:
+            while len(batch) < self.batch_size:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+
+        return batch
+
+    ####################################################################
+    # _handle_batch
+    ####################################################################
+    def _handle_batch(self, batch: list[Any]) -> bool:
+        """Handle a batch of records and flush the handlers.
+
+        Args:
+            batch: the records, along with the events of flush calls
+                and None to stop
+
+        Returns:
+            False if the batch has the item that stops the listener,
+            otherwise True
+
+        """
+        keep_running = True
+        used: dict[int, logging.Handler] = {}
+        for item in batch:
+            if isinstance(item, logging.LogRecord):
+                for handler in self._get_handlers(item):
+                    if item.levelno >= handler.level:
+                        handler.handle(item)
+                        used[id(handler)] = handler
+            elif item is None:
+                keep_running = False
+            else:
+                self._flush_handlers(used)
+                item.set()
+
+        self._flush_handlers(used)
+
+        return keep_running
+
+    ####################################################################
+    # _get_handlers
+    ####################################################################
+    def _get_handlers(self, record: logging.LogRecord) -> list[logging.Handler]:
+        """Return the handlers for a record.
+
+        Args:
+            record: the log record
+
+        Returns:
+            The handlers that the record is to be passed to
+
+        """
+        if self.handlers is not None:
+            return self.handlers
+
+        handlers: list[logging.Handler] = []
+        logger: Optional[logging.Logger] = logging.getLogger(record.name)
+        while logger is not None:
+            handlers.extend(
+                handler for handler in logger.handlers if handler is not self.handler
+            )
+            if not logger.propagate:
+                break
+            logger = logger.parent
+
+        return handlers
+
+    ####################################################################
+    # _flush_handlers
+    ####################################################################
+    @staticmethod
+    def _flush_handlers(used: dict[int, logging.Handler]) -> None:
+        """Flush the handlers that were used.
+
+        Args:
+            used: the handlers that were used, which is cleared
+
+        """
+        for handler in used.values():
+            handler.flush()
+        used.clear()
+
+
+# the started LogQueues are stopped at exit so that their records are
+# handled
+_started_log_queues: "weakref.WeakSet[LogQueue]" = weakref.WeakSet()
+
+
+########################################################################
+# _log_queues_at_exit
+########################################################################
+def _log_queues_at_exit() -> None:
+    """Stop the started LogQueues at exit."""
+    for log_queue in list(_started_log_queues):
+        log_queue.stop()
+
+
+atexit.register(_log_queues_at_exit)
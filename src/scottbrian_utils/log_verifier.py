@@ -234,18 +234,39 @@ The log_verifier module contains:
        d. get_match_results
        e. print_match_results
        f. verify_match_results
+       g. add_snapshot_mask
+       h. save_snapshot
+       i. verify_snapshot
 
 """
 
 ########################################################################
 # Standard Library
 ########################################################################
+import hashlib
+import heapq
+import itertools
+import json
 import logging
 import re
+import threading
 import warnings
+from collections import Counter
+from collections.abc import Iterable
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Callable, Literal, Optional, Type, TYPE_CHECKING, Union
+from os import PathLike
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Literal,
+    NoReturn,
+    Optional,
+    Type,
+    TYPE_CHECKING,
+    Union,
+)
 
 ########################################################################
 # Third Party
@@ -273,6 +294,17 @@ pd.set_option("display.width", 300)
 ########################################################################
 IntFloat = Union[int, float]
 OptIntFloat = Optional[IntFloat]
+PatternItem = tuple[str, int, str, bool]
+SnapshotGroup = tuple[str, int, str]
+WhichRecords = Optional[list[Literal["setup", "call", "teardown"]]]
+
+########################################################################
+# snapshot masks
+########################################################################
+# default masks applied to log messages before they are grouped for a
+# snapshot so that volatile fields do not cause a mismatch
+SNAPSHOT_MASK_TIME = (r"\d{2}:\d{2}:\d{2}(\.\d+)?", "<time>")
+SNAPSHOT_MASK_LINE_NUM = (r"(\.py(::[\w.<>]+)?|<input>):\d+", r"\1:<line>")
 
 
 ########################################################################
@@ -314,12 +346,111 @@ class UnmatchedPatterns(LogVerError):
     pass
 
 
+class PatternsReadOnly(LogVerError):
+    """LogVer.patterns was changed other than by append or extend."""
+
+    pass
+
+
 class UnmatchedLogMessages(LogVerError):
     """Unmatched log messages were found during verify."""
 
     pass
 
 
+class SnapshotMismatch(LogVerError):
+    """Log records do not match the golden snapshot."""
+
+    pass
+
+
+########################################################################
+# PatternList class
+########################################################################
+class PatternList(list[PatternItem]):
+    """List of patterns returned by LogVer.patterns.
+
+    The list is a merged view of the patterns added by each thread and
+    is kept by LogVer until the next pattern is added, so it can not be
+    changed. Appending to it, as was done when LogVer.patterns was a
+    plain list, is deprecated and adds the pattern to the LogVer instead
+    of to the list. Any other change raises PatternsReadOnly.
+
+    """
+
+    def __init__(self, log_ver: "LogVer", items: list[PatternItem]) -> None:
+        """Initialize the object.
+
+        Args:
+            log_ver: the LogVer the patterns belong to
+            items: the patterns
+
+        """
+        super().__init__(items)
+        self._log_ver = log_ver
+
+    def append(self, item: PatternItem) -> None:
+        """Add a pattern to the LogVer.
+
+        Args:
+            item: the log_name, level, pattern, and fullmatch to add
+
+        .. deprecated:: 7.2.0
+           Use method :func:`LogVer.add_pattern()` instead.
+
+        """
+        self.extend([item])
+
+    def extend(self, items: Iterable[PatternItem]) -> None:
+        """Add patterns to the LogVer.
+
+        Args:
+            items: the log_name, level, pattern, and fullmatch of each
+                pattern to add
+
+        .. deprecated:: 7.2.0
+           Use method :func:`LogVer.add_pattern()` instead.
+
+        """
+        warnings.warn(
+            message="Adding to LogVer.patterns is deprecated as of version 7.2.0 "
+            "and will be removed in a future release. Use LogVer.add_pattern() "
+            "instead",
+            category=DeprecationWarning,
+            stacklevel=3,
+        )
+        for item in items:
+            self._log_ver._add_pattern_item(item)
+
+    def _read_only(self, *args: Any, **kwargs: Any) -> NoReturn:
+        """Raise PatternsReadOnly for a change to the list.
+
+        Args:
+            args: the positional arguments of the change
+            kwargs: the keyword arguments of the change
+
+        Raises:
+            PatternsReadOnly: LogVer.patterns can only be added to with
+                LogVer.add_pattern.
+
+        """
+        raise PatternsReadOnly(
+            "LogVer.patterns can not be changed. Use LogVer.add_pattern() to add "
+            "a pattern."
+        )
+
+    insert = _read_only
+    pop = _read_only
+    remove = _read_only
+    clear = _read_only
+    sort = _read_only
+    reverse = _read_only
+    __setitem__ = _read_only
+    __delitem__ = _read_only
+    __iadd__ = _read_only
+    __imul__ = _read_only
+
+
 @dataclass
 class MatchResults:
     """Match results returned by get_match_results method."""
@@ -394,14 +525,24 @@ class LogVer:
             )
 
         self.call_seqs: dict[str, str] = {}
-        self.patterns: list[
-            tuple[
-                str,
-                int,
-                str,
-                bool,
-            ]
-        ] = []
+        self.snapshot_masks: list[tuple[re.Pattern[str], str]] = [
+            (re.compile(SNAPSHOT_MASK_TIME[0]), SNAPSHOT_MASK_TIME[1]),
+            (re.compile(SNAPSHOT_MASK_LINE_NUM[0]), SNAPSHOT_MASK_LINE_NUM[1]),
+        ]
+
+        # Patterns are added to a buffer owned by the calling thread so
+        # that concurrent add_pattern calls (e.g., from etrace on
+        # several threads) never append to a shared list. The lock is
+        # only taken the first time a thread adds a pattern (to
+        # register its buffer) and when the buffers are merged. Each
+        # pattern is given the next number of the sequence, which
+        # orders the merged patterns, and the merged patterns are kept
+        # until the next pattern is added.
+        self._pattern_lock = threading.Lock()
+        self._pattern_tls = threading.local()
+        self._pattern_bufs: list[list[tuple[int, PatternItem]]] = []
+        self._pattern_seq = itertools.count()
+        self._merged_patterns = PatternList(self, [])
 
     ####################################################################
     # __repr__
@@ -430,6 +571,51 @@ class LogVer:
 
         return f"{classname}({parms})"
 
+    ####################################################################
+    # patterns
+    ####################################################################
+    @property
+    def patterns(self) -> PatternList:
+        """Return the patterns added so far from all threads.
+
+        Returns:
+            The PatternList of patterns merged from the per-thread
+            buffers. The patterns are in the order of the sequence
+            numbers they were given when added, so a pattern comes
+            after every pattern whose add_pattern call returned before
+            its own add_pattern call was made, on any thread. The same
+            PatternList is returned until the next pattern is added.
+
+        """
+        with self._pattern_lock:
+            bufs = [buf[:] for buf in self._pattern_bufs]
+            if sum(len(buf) for buf in bufs) != len(self._merged_patterns):
+                self._merged_patterns = PatternList(
+                    self, [item for _, item in heapq.merge(*bufs)]
+                )
+
+            return self._merged_patterns
+
+    ####################################################################
+    # _get_pattern_buf
+    ####################################################################
+    def _get_pattern_buf(self) -> list[tuple[int, PatternItem]]:
+        """Return the pattern buffer for the current thread.
+
+        Returns:
+            The list owned by the current thread to which patterns are
+            appended
+
+        """
+        try:
+            return self._pattern_tls.buf  # type: ignore[no-any-return]
+        except AttributeError:
+            buf: list[tuple[int, PatternItem]] = []
+            with self._pattern_lock:
+                self._pattern_bufs.append(buf)
+            self._pattern_tls.buf = buf
+            return buf
+
     ####################################################################
     # add_call_seq
     ####################################################################
@@ -580,24 +766,28 @@ class LogVer:
         else:
             log_name_to_use = self.log_name
 
-        if fullmatch:
-            self.patterns.append(
-                (
-                    log_name_to_use,
-                    level,
-                    pattern,
-                    True,
-                )
-            )
-        else:
-            self.patterns.append(
-                (
-                    log_name_to_use,
-                    level,
-                    pattern,
-                    False,
-                )
+        self._add_pattern_item(
+            (
+                log_name_to_use,
+                level,
+                pattern,
+                bool(fullmatch),
             )
+        )
+
+    ####################################################################
+    # _add_pattern_item
+    ####################################################################
+    def _add_pattern_item(self, item: PatternItem) -> None:
+        """Add a pattern to the buffer of the current thread.
+
+        Args:
+            item: the log_name, level, pattern, and fullmatch to add
+
+        """
+        # next on an itertools.count is atomic, so each pattern gets a
+        # unique sequence number without a lock
+        self._get_pattern_buf().append((next(self._pattern_seq), item))
 
     ####################################################################
     # msg
@@ -682,7 +872,7 @@ class LogVer:
     def get_match_results(
         self,
         caplog: pytest.LogCaptureFixture,
-        which_records: Optional[list[Literal["setup", "call", "teardown"]]] = None,
+        which_records: WhichRecords = None,
     ) -> MatchResults:
         """Match the patterns to log records.
 
@@ -700,16 +890,7 @@ class LogVer:
         """
         self.start_DT = datetime.now()
 
-        rec_list = []
-
-        if which_records is None:
-            which_records = ["call"]
-        for which_record in which_records:
-            records_list = [
-                (rec_row.name, rec_row.levelno, rec_row.message)
-                for rec_row in caplog.get_records(which_record)
-            ]
-            rec_list.extend(records_list)
+        rec_list = self._get_log_records(caplog, which_records)
 
         msg_df = pd.DataFrame(
             rec_list,
@@ -858,6 +1039,37 @@ class LogVer:
             log_msg_grp=msg_grp,
         )
 
+    ####################################################################
+    # _get_log_records
+    ####################################################################
+    @staticmethod
+    def _get_log_records(
+        caplog: pytest.LogCaptureFixture, which_records: WhichRecords = None
+    ) -> list[tuple[str, int, str]]:
+        """Return the captured log records.
+
+        Args:
+            caplog: pytest fixture that captures log messages
+            which_records: list to request log records for any
+                combination of setup, call, and teardown
+
+        Returns:
+            list of tuples of log name, level, and log message
+
+        """
+        rec_list = []
+
+        if which_records is None:
+            which_records = ["call"]
+        for which_record in which_records:
+            records_list = [
+                (rec_row.name, rec_row.levelno, rec_row.message)
+                for rec_row in caplog.get_records(which_record)
+            ]
+            rec_list.extend(records_list)
+
+        return rec_list
+
     ####################################################################
     # search_df for matches
     ####################################################################
@@ -1297,3 +1509,210 @@ class LogVer:
                 f"There {is_are} {match_results.num_unmatched_log_msgs} {log_msg_s} "
                 f"that did not get matched by any patterns."
             )
+
+    ####################################################################
+    # add_snapshot_mask
+    ####################################################################
+    def add_snapshot_mask(self, pattern: str, replacement: str = "<masked>") -> None:
+        """Add a mask for volatile fields in snapshot log messages.
+
+        Args:
+            pattern: regex pattern that finds the volatile field in the
+                log message
+            replacement: replacement string to use for the volatile
+                field, which may include regex group references
+
+        Notes:
+
+            1) Masks are applied in the order they are added, after the
+               default masks for timestamps (SNAPSHOT_MASK_TIME) and
+               source line numbers (SNAPSHOT_MASK_LINE_NUM).
+
+        """
+        self.snapshot_masks.append((re.compile(pattern), replacement))
+
+    ####################################################################
+    # get_snapshot_groups
+    ####################################################################
+    def get_snapshot_groups(
+        self,
+        caplog: pytest.LogCaptureFixture,
+        which_records: WhichRecords = None,
+    ) -> dict[SnapshotGroup, int]:
+        """Return the masked log records grouped with their counts.
+
+        Args:
+            caplog: pytest fixture that captures log messages
+            which_records: list to request log records for any
+                combination of setup, call, and teardown
+
+        Returns:
+            dictionary of record counts keyed by log name, level, and
+            masked log message, ordered by key
+
+        """
+        groups: Counter[SnapshotGroup] = Counter()
+        for log_name, level, log_msg in self._get_log_records(caplog, which_records):
+            for mask_pattern, replacement in self.snapshot_masks:
+                log_msg = mask_pattern.sub(replacement, log_msg)
+            groups[(log_name, level, log_msg)] += 1
+
+        return dict(sorted(groups.items()))
+
+    ####################################################################
+    # _get_snapshot_lines
+    ####################################################################
+    @staticmethod
+    def _get_snapshot_lines(
+        groups: dict[SnapshotGroup, int],
+    ) -> tuple[str, list[str]]:
+        """Return the digest and the serialized snapshot groups.
+
+        Args:
+            groups: record counts keyed by log name, level, and log
+                message
+
+        Returns:
+            the hex digest of the snapshot and one compact json line
+            per group
+
+        """
+        lines = [
+            json.dumps([log_name, level, log_msg, records], separators=(",", ":"))
+            for (log_name, level, log_msg), records in groups.items()
+        ]
+        digest = hashlib.sha256("\n".join(lines).encode()).hexdigest()
+
+        return digest, lines
+
+    ####################################################################
+    # save_snapshot
+    ####################################################################
+    def save_snapshot(
+        self,
+        caplog: pytest.LogCaptureFixture,
+        snapshot_path: Union[str, PathLike[str]],
+        which_records: WhichRecords = None,
+    ) -> None:
+        """Save the grouped log records as a golden snapshot.
+
+        Args:
+            caplog: pytest fixture that captures log messages
+            snapshot_path: path of the snapshot file to write
+            which_records: list to request log records for any
+                combination of setup, call, and teardown
+
+        Notes:
+
+            1) The first line of the snapshot file is the sha256 digest
+               of the groups. Each following line is a compact json
+               array of log name, level, masked log message, and number
+               of records.
+
+        """
+        digest, lines = self._get_snapshot_lines(
+            self.get_snapshot_groups(caplog, which_records)
+        )
+        self._write_snapshot(Path(snapshot_path), digest, lines)
+
+    ####################################################################
+    # _write_snapshot
+    ####################################################################
+    @staticmethod
+    def _write_snapshot(snapshot_path: Path, digest: str, lines: list[str]) -> None:
+        """Write the snapshot file.
+
+        Args:
+            snapshot_path: path of the snapshot file to write
+            digest: hex digest of the snapshot groups
+            lines: one compact json line per snapshot group
+
+        """
+        snapshot_path.write_text("\n".join([digest, *lines]) + "\n", encoding="utf-8")
+
+    ####################################################################
+    # verify_snapshot
+    ####################################################################
+    def verify_snapshot(
+        self,
+        caplog: pytest.LogCaptureFixture,
+        snapshot_path: Union[str, PathLike[str]],
+        which_records: WhichRecords = None,
+    ) -> None:
+        """Verify the grouped log records against a golden snapshot.
+
+        Args:
+            caplog: pytest fixture that captures log messages
+            snapshot_path: path of the snapshot file to compare with
+            which_records: list to request log records for any
+                combination of setup, call, and teardown
+
+        Raises:
+            SnapshotMismatch: The log records do not match the golden
+                snapshot.
+
+        Notes:
+
+            1) If the snapshot file does not exist, it is created from
+               the current log records and the verify succeeds.
+            2) The digests are compared first. Only when they differ is
+               the snapshot read in full and a per-group difference
+               printed.
+
+        Example: record a golden snapshot once and verify later runs
+
+        .. code-block:: python
+
+            def test_example(caplog: pytest.LogCaptureFixture) -> None:
+                t_logger = logging.getLogger("example_7")
+                log_ver = LogVer("example_7")
+                t_logger.debug("request 42 took 12:01:02.123")
+                log_ver.verify_snapshot(caplog, "example_7.golden")
+
+        """
+        snapshot_path = Path(snapshot_path)
+        groups = self.get_snapshot_groups(caplog, which_records)
+        digest, lines = self._get_snapshot_lines(groups)
+
+        if not snapshot_path.exists():
+            self._write_snapshot(snapshot_path, digest, lines)
+            return
+
+        with snapshot_path.open(encoding="utf-8") as snapshot_file:
+            golden_digest = snapshot_file.readline().strip()
+            if golden_digest == digest:
+                return
+
+            golden_groups: dict[SnapshotGroup, int] = {}
+            for line in snapshot_file:
+                if line.strip():
+                    log_name, level, log_msg, records = json.loads(line)
+                    golden_groups[(log_name, level, log_msg)] = records
+
+        diff_rows = [
+            (*key, golden_groups.get(key, 0), groups.get(key, 0))
+            for key in sorted(golden_groups.keys() | groups.keys())
+            if golden_groups.get(key, 0) != groups.get(key, 0)
+        ]
+
+        if not diff_rows:
+            # the digest only differs because of the file contents
+            # (e.g., edited by hand) and not because of the groups
+            return
+
+        print_flower_box_msg("snapshot differences:")
+        self.print_df(
+            df_to_print=pd.DataFrame(
+                diff_rows,
+                columns=("log_name", "level", "log_msg", "golden", "current"),
+            ),
+            col_names=["log_name", "level", "log_msg", "golden", "current"],
+            left_justify_col_names=["log_name", "log_msg"],
+        )
+
+        num_diffs = len(diff_rows)
+        raise SnapshotMismatch(
+            f"There {'is' if num_diffs == 1 else 'are'} {num_diffs} log record "
+            f"group{'' if num_diffs == 1 else 's'} that did not match the golden "
+            f"snapshot in {snapshot_path}."
+        )
@@ -0,0 +1,760 @@
+"""Module memoize.
+
+=======
+memoize
+=======
+
+The memoize decorator caches the return values of a function by the
+values of its arguments. The cache key is built from the parameters of
+the function the same way that etrace (scottbrian_utils.entry_trace)
+builds its entry trace: each argument is matched to its parameter
+whether it is passed by position or by keyword, the default values are
+filled in for the parameters that are not passed, and the parameters
+named in *omit_parms* are left out. Calls that differ only in how their
+arguments are passed thus share a cache entry. Argument values that are
+lists, dicts, or sets are converted to hashable equivalents for the key,
+and a call with any other unhashable argument value is not cached.
+
+The cache keeps up to *max_size* entries, with the least recently used
+entry removed to make room for a new one, and each entry can be given a
+time to live. When several threads make the same call at the same time,
+the function is called once and the other threads wait for its result.
+The counts of each decorated function are returned by its cache_info
+function, and its cache_clear function removes all of its entries.
+
+:Example: cache the return value of a function
+
+>>> from scottbrian_utils.memoize import memoize
+>>> @memoize(max_size=2, omit_parms=["verbose"])
+... def f1(a1: int, a2: int = 2, verbose: bool = False) -> int:
+...     return a1 * a2
+>>> f1(3)
+6
+>>> f1(a1=3, a2=2, verbose=True)
+6
+>>> print(f1.cache_info())
+CacheStats(hits=1, misses=1, waits=0, uncached=0, evictions=0, size=1)
+
+
+The memoize module contains:
+
+    1) CacheStats NamedTuple
+    2) CacheKeyBuilder class with method:
+
+       a. get_key
+
+    3) memoize decorator
+
+"""
+
+########################################################################
+# Standard Library
+########################################################################
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Hashable, Iterable
+from typing import (
+    Any,
+    Callable,
+    cast,
+    NamedTuple,
+    Optional,
+    overload,
+    TypeVar,
+)
+
+########################################################################
+# Third Party
+########################################################################
+import wrapt
+
+########################################################################
+# Local
+########################################################################
+from scottbrian_utils.entry_trace import get_target_info, ParmLayout
+
+
+########################################################################
+# CacheStats
+########################################################################
+class CacheStats(NamedTuple):
+    """The counts of a memoized function."""
+
+    hits: int
+    misses: int
+    waits: int
+    uncached: int
+    evictions: int
+    size: int
+
+
+########################################################################
+# _freeze
+########################################################################
+def _freeze(value: Any) -> Any:
+    """Return a hashable equivalent of a value.
+
+    Args:
+        value: the value
+
+    Returns:
+        The value with its lists, dicts, and sets, including those
+        nested in tuples, replaced by tuples and frozensets that are
+        tagged with the type they replace, so that, e.g., a list and a
+        tuple with the same items do not make the same key
+
+    """
+    if isinstance(value, tuple):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, list):
+        return list, tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return dict, frozenset((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, set):
+        return set, frozenset(value)
+    return value
+
+
+########################################################################
+# CacheKeyBuilder class
+########################################################################
+class CacheKeyBuilder(ParmLayout):
+    """Builder of the cache keys of a function.
+
+    As with the EntryFormatter of etrace, the positions of the parameter
+    values in the args and kwargs of a call depend only on how many
+    positional arguments and which keyword arguments are passed. For
+    each such call shape, a key function is generated the first time the
+    shape is seen, which returns a tuple with the instance (for a
+    method) followed by the value of each parameter in the order of the
+    signature.
+
+    A function that takes **kwargs can be called with any number of
+    keyword argument combinations, so only the first *max_key_funcs*
+    shapes get a generated key function. The keys of calls with other
+    shapes are built one value at a time, which gives the same key.
+
+    """
+
+    max_key_funcs = 32
+
+    ####################################################################
+    # __init__
+    ####################################################################
+    def __init__(self, parms: list[inspect.Parameter], omit_parms: set[str]) -> None:
+        """Initialize the object.
+
+        Args:
+            parms: the parameters of the function, excluding self or
+                cls
+            omit_parms: names of the parameters whose values are not
+                part of the key
+
+        Raises:
+            ValueError: a name in omit_parms is not a parameter of the
+                function
+
+        """
+        super().__init__(parms=parms, omit_parms=omit_parms)
+
+        # a positional-only parameter can not be passed by keyword, so a
+        # keyword argument with its name is collected by **kwargs
+        self.kw_parm_names = {
+            parm.name
+            for parm in self.parms
+            if parm.kind != inspect.Parameter.POSITIONAL_ONLY
+        }
+
+        self.defaults = tuple(parm.default for parm in self.parms)
+
+        self.key_funcs: dict[
+            tuple[int, tuple[str, ...]],
+            Optional[Callable[[Any, tuple[Any, ...], dict[str, Any]], tuple[Any, ...]]],
+        ] = {}
+
+    ####################################################################
+    # get_key
+    ####################################################################
+    def get_key(
+        self, instance: Any, args: tuple[Any, ...], kwargs: dict[str, Any]
+    ) -> Optional[Hashable]:
+        """Return the cache key for a call.
+
+        Args:
+            instance: the instance of a method, the class of a class
+                method, or None
+            args: the positional arguments of the call
+            kwargs: the keyword arguments of the call
+
+        Returns:
+            The cache key, or None if the arguments do not fit the
+            signature or an argument value is unhashable
+
+        """
+        shape = (len(args), tuple(kwargs))
+        try:
+            key_func = self.key_funcs[shape]
+        except KeyError:
+            if len(self.key_funcs) >= self.max_key_funcs:
+                key_func = self._get_generic_key_func(*shape)
+            else:
+                key_func = self.key_funcs.setdefault(
+                    shape, self._build_key_func(*shape)
+                )
+
+        if key_func is None:
+            return None
+
+        key = key_func(instance, args, kwargs)
+        try:
+            hash(key)
+        except TypeError:
+            key = _freeze(key)
+            try:
+                hash(key)
+            except TypeError:
+                return None
+
+        return key
+
+    ####################################################################
+    # _get_loads
+    ####################################################################
+    def _get_loads(
+        self, num_args: int, kw_names: tuple[str, ...]
+    ) -> Optional[list[tuple[str, Any]]]:
+        """Return where the key values are for a call shape.
+
+        Args:
+            num_args: number of positional arguments of the call
+            kw_names: names of the keyword arguments of the call
+
+        Returns:
+            A list with, for each value of the key after the instance,
+            the name of the args, kwargs, or defaults that it is loaded
+            from and its index or key, or "extras" and the names of the
+            keyword arguments collected by **kwargs. None is returned
+            if a call with this shape raises TypeError, in which case
+            the call is made without the cache so that it does.
+
+        """
+        if num_args > self.num_pos and self.var_pos_idx < 0:
+            return None
+
+        loads: list[tuple[str, Any]] = []
+        for idx, parm in enumerate(self.parms):
+            name = parm.name
+            passed_by_kw = name in kw_names and name in self.kw_parm_names
+            if passed_by_kw and idx < min(num_args, self.num_pos):
+                return None
+            if name in self.omit_parms:
+                continue
+            if passed_by_kw:
+                loads.append(("kwargs", name))
+            elif idx == self.var_pos_idx:
+                loads.append(("args", slice(idx, None)))
+            elif idx < min(num_args, self.num_pos):
+                loads.append(("args", idx))
+            elif parm.default is not inspect.Parameter.empty:
+                loads.append(("defaults", idx))
+            else:
+                return None
+
+        # the keyword arguments collected by **kwargs are placed in the
+        # key in name order, since the order they are passed in does
+        # not matter
+        extra_names = sorted(
+            name for name in kw_names if name not in self.kw_parm_names
+        )
+        if extra_names:
+            if self.var_kw_name is None:
+                return None
+            loads.append(
+                (
+                    "extras",
+                    tuple(name for name in extra_names if name not in self.omit_parms),
+                )
+            )
+
+        return loads
+
+    ####################################################################
+    # _build_key_func
+    ####################################################################
+    def _build_key_func(
+        self, num_args: int, kw_names: tuple[str, ...]
+    ) -> Optional[Callable[[Any, tuple[Any, ...], dict[str, Any]], tuple[Any, ...]]]:
+        """Generate the key function for a call shape.
+
+        Args:
+            num_args: number of positional arguments of the call
+            kw_names: names of the keyword arguments of the call
+
+        Returns:
+            A function that takes the instance, args, and kwargs of a
+            call with this shape and returns the key tuple, or None if
+            a call with this shape raises TypeError
+
+        """
+        loads = self._get_loads(num_args, kw_names)
+        if loads is None:
+            return None
+
+        exprs = ["instance"]
+        for source, item in loads:
+            if source == "extras":
+                extras = "".join(f"({name!r}, kwargs[{name!r}]), " for name in item)
+                exprs.append(f"({extras})")
+            elif isinstance(item, slice):
+                exprs.append(f"{source}[{item.start}:]")
+            else:
+                exprs.append(f"{source}[{item!r}]")
+
+        source_code = "\n".join(
+            [
+                "def cache_key(instance, args, kwargs):",
+                f"    return ({', '.join(exprs)},)",
+            ]
+        )
+        namespace: dict[str, Any] = {"defaults": self.defaults}
+        exec(compile(source_code, "<memoize cache_key>", "exec"), namespace)
+
+        return cast(
+            Callable[[Any, tuple[Any, ...], dict[str, Any]], tuple[Any, ...]],
+            namespace["cache_key"],
+        )
+
+    ####################################################################
+    # _get_generic_key_func
+    ####################################################################
+    def _get_generic_key_func(
+        self, num_args: int, kw_names: tuple[str, ...]
+    ) -> Optional[Callable[[Any, tuple[Any, ...], dict[str, Any]], tuple[Any, ...]]]:
+        """Return a key function for a call shape without generating it.
+
+        Args:
+            num_args: number of positional arguments of the call
+            kw_names: names of the keyword arguments of the call
+
+        Returns:
+            A function that takes the instance, args, and kwargs of a
+            call with this shape and returns the same key tuple as the
+            generated function, or None if a call with this shape
+            raises TypeError
+
+        """
+        loads = self._get_loads(num_args, kw_names)
+        if loads is None:
+            return None
+
+        def cache_key(
+            instance: Any, args: tuple[Any, ...], kwargs: dict[str, Any]
+        ) -> tuple[Any, ...]:
+            sources: dict[str, Any] = {
+                "args": args,
+                "kwargs": kwargs,
+                "defaults": self.defaults,
+            }
+            key = [instance]
+            for source, item in loads:
+                if source == "extras":
+                    key.append(tuple((name, kwargs[name]) for name in item))
+                else:
+                    key.append(sources[source][item])
+            return tuple(key)
+
+        return cache_key
+
+
+########################################################################
+# _Flight class
+########################################################################
+class _Flight:
+    """A call that the same calls of other threads wait for."""
+
+    __slots__ = ("thread_id", "done", "value", "exc")
+
+    def __init__(self) -> None:
+        """Initialize the object."""
+        self.thread_id = threading.get_ident()
+        self.done = threading.Event()
+        self.value: Any = None
+        self.exc: Optional[BaseException] = None
+
+
+########################################################################
+# _MemoCache class
+########################################################################
+class _MemoCache:
+    """The cache of a memoized function."""
+
+    ####################################################################
+    # __init__
+    ####################################################################
+    def __init__(self, max_size: Optional[int], ttl_ns: Optional[int]) -> None:
+        """Initialize the object.
+
+        Args:
+            max_size: the most entries kept, or None for no limit
+            ttl_ns: the nanoseconds that an entry is used for, or None
+                for no limit
+
+        """
+        self.max_size = max_size
+        self.ttl_ns = ttl_ns
+        self._lock = threading.Lock()
+        # each entry has the value and the monotonic_ns time when it
+        # expires, and the least recently used entry is first
+        self._entries: OrderedDict[Hashable, tuple[Any, Optional[int]]] = OrderedDict()
+        self._flights: dict[Hashable, _Flight] = {}
+        self._reset_counts()
+
+    ####################################################################
+    # _reset_counts
+    ####################################################################
+    def _reset_counts(self) -> None:
+        """Reset the counts."""
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.uncached = 0
+        self.evictions = 0
+
+    ####################################################################
+    # call
+    ####################################################################
+    def call(
+        self,
+        key: Optional[Hashable],
+        func: Callable[..., Any],
+        args: tuple[Any, ...],
+        kwargs: dict[str, Any],
+    ) -> Any:
+        """Return the cached value or the value from calling func.
+
+        Args:
+            key: the cache key, or None if the call is not to be cached
+            func: the memoized function
+            args: the positional arguments of the call
+            kwargs: the keyword arguments of the call
+
+        Returns:
+            The return value of the call
+
+        Raises:
+            BaseException: the exception raised by the call that this
+                call waited for
+
+        """
+        if key is None:
+            with self._lock:
+                self.uncached += 1
+            return func(*args, **kwargs)
+
+        with self._lock:
+            try:
+                value, expire_ns = self._entries[key]
+            except KeyError:
+                pass
+            else:
+                if expire_ns is None or time.monotonic_ns() < expire_ns:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                self.misses += 1
+                new_flight = True
+            elif flight.thread_id == threading.get_ident():
+                # a recursive call with the same key would wait for
+                # itself, so it is made without the cache
+                self.uncached += 1
+                new_flight = False
+            else:
+                self.waits += 1
+                new_flight = False
+
+        if not new_flight:
+            if flight.thread_id == threading.get_ident():
+                return func(*args, **kwargs)
+            flight.done.wait()
+            if flight.exc is not None:
+                raise flight.exc
+            return flight.value
+
+        try:
+            flight.value = func(*args, **kwargs)
+        except BaseException as exc:
+            # the exception is passed to the waiting calls but is not
+            # cached
+            flight.exc = exc
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                if flight.exc is None:
+                    self._add_entry(key, flight.value)
+            flight.done.set()
+
+        return flight.value
+
+    ####################################################################
+    # _add_entry
+    ####################################################################
+    def _add_entry(self, key: Hashable, value: Any) -> None:
+        """Add an entry while holding the lock.
+
+        Args:
+            key: the cache key
+            value: the value to cache
+
+        """
+        if self.ttl_ns is None:
+            expire_ns = None
+        else:
+            expire_ns = time.monotonic_ns() + self.ttl_ns
+        self._entries[key] = (value, expire_ns)
+        self._entries.move_to_end(key)
+        if self.max_size is not None:
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    ####################################################################
+    # get_stats
+    ####################################################################
+    def get_stats(self) -> CacheStats:
+        """Return the counts of the cache.
+
+        Returns:
+            The counts since the function was decorated or the cache
+            was last cleared
+
+        """
+        with self._lock:
+            return CacheStats(
+                hits=self.hits,
+                misses=self.misses,
+                waits=self.waits,
+                uncached=self.uncached,
+                evictions=self.evictions,
+                size=len(self._entries),
+            )
+
+    ####################################################################
+    # clear
+    ####################################################################
+    def clear(self) -> None:
+        """Remove all entries and reset the counts."""
+        with self._lock:
+            self._entries.clear()
+            self._reset_counts()
+
+
+########################################################################
+# _BoundMemoizedFunction class
+########################################################################
+class _BoundMemoizedFunction(wrapt.BoundFunctionWrapper[..., Any]):
+    """A memoized method bound to its instance or class."""
+
+    def cache_info(self) -> CacheStats:
+        """Return the counts of the cache.
+
+        Returns:
+            The CacheStats of the cache of the method
+
+        """
+        return cast(CacheStats, self._self_parent.cache_info())
+
+    def cache_clear(self) -> None:
+        """Remove all entries of the cache and reset the counts."""
+        self._self_parent.cache_clear()
+
+
+########################################################################
+# _MemoizedFunction class
+########################################################################
+class _MemoizedFunction(wrapt.FunctionWrapper[..., Any]):
+    """The wrapper of a memoized function.
+
+    The cache_info and cache_clear functions are methods of the wrapper
+    rather than attributes set on the wrapped function, so that each
+    memoize of a function that is decorated more than once has its own.
+
+    """
+
+    __bound_function_wrapper__ = _BoundMemoizedFunction
+
+    def __init__(
+        self, wrapped: Any, wrapper: Callable[..., Any], cache: _MemoCache
+    ) -> None:
+        """Initialize the object.
+
+        Args:
+            wrapped: the function, staticmethod, or classmethod
+            wrapper: the function called with the wrapped function,
+                instance, args, and kwargs of each call
+            cache: the cache of the memoized function
+
+        """
+        super().__init__(wrapped, wrapper)
+        # attributes of a wrapt proxy that start with _self_ are kept
+        # in the proxy rather than set on the wrapped function
+        self._self_cache = cache
+
+    def cache_info(self) -> CacheStats:
+        """Return the counts of the cache.
+
+        Returns:
+            The CacheStats of the cache of the function
+
+        """
+        return self._self_cache.get_stats()
+
+    def cache_clear(self) -> None:
+        """Remove all entries of the cache and reset the counts."""
+        self._self_cache.clear()
+
+
+########################################################################
+# memoize decorator
+########################################################################
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+@overload
+def memoize(
+    wrapped: F,
+    *,
+    max_size: Optional[int] = 128,
+    ttl_secs: Optional[float] = None,
+    omit_parms: Optional[Iterable[str]] = None,
+) -> F:
+    pass
+
+
+@overload
+def memoize(
+    *,
+    max_size: Optional[int] = 128,
+    ttl_secs: Optional[float] = None,
+    omit_parms: Optional[Iterable[str]] = None,
+) -> Callable[[F], F]:
+    pass
+
+
+def memoize(
+    wrapped: Optional[F] = None,
+    *,
+    max_size: Optional[int] = 128,
+    ttl_secs: Optional[float] = None,
+    omit_parms: Optional[Iterable[str]] = None,
+) -> F:
+    """Decorator to cache the return values of a function.
+
+    The decorated function has a cache_info function that returns the
+    CacheStats of the cache and a cache_clear function that removes all
+    entries and resets the counts, as for functools.lru_cache. The
+    counts are:
+
+        1) hits: the calls that returned a cached value
+        2) misses: the calls that called the function for a new entry
+        3) waits: the calls that waited for the same call in another
+           thread and returned its result
+        4) uncached: the calls that called the function without the
+           cache because of an unhashable argument value, arguments that
+           do not fit the signature, or a recursive call with the same
+           arguments
+        5) evictions: the entries removed to keep to *max_size*
+        6) size: the number of entries, which includes entries whose
+           time to live has passed until they are used or removed
+
+    For a method, the instance (or the class of a class method) is part
+    of the key, so the cache keeps a reference to it for as long as the
+    entry is kept. An exception raised by the function is not cached.
+
+    Args:
+        wrapped: function to be decorated
+        max_size: the most entries kept in the cache, after which the
+            least recently used entry is removed for each new entry.
+            None specifies that there is no limit.
+        ttl_secs: the number of seconds that an entry is used for after
+            it is added to the cache. None specifies that there is no
+            limit.
+        omit_parms: list of parameter names whose argument values are
+            not part of the cache key, with the same meaning as for
+            etrace. This is useful for arguments that do not affect the
+            return value (e.g., a logger or a verbose flag).
+
+    Returns:
+        funtools partial (when wrapped is None) or decorated function
+
+    Raises:
+        TypeError: the decorated function is a coroutine function, a
+            generator function, or an asynchronous generator function
+        ValueError: a name specified in omit_parms is not a known
+            parameter of the decorated function, max_size is less than
+            1, or ttl_secs is not positive
+
+    """
+    if wrapped is None:
+        return cast(
+            F,
+            functools.partial(
+                memoize,
+                max_size=max_size,
+                ttl_secs=ttl_secs,
+                omit_parms=omit_parms,
+            ),
+        )
+
+    if max_size is not None and max_size < 1:
+        raise ValueError(f"memoize max_size of {max_size} is less than 1")
+    if ttl_secs is not None and ttl_secs <= 0:
+        raise ValueError(f"memoize ttl_secs of {ttl_secs} is not positive")
+
+    target_func, _, target, skip_self_cls = get_target_info(wrapped)
+
+    if (
+        inspect.iscoroutinefunction(target_func)
+        or inspect.isasyncgenfunction(target_func)
+        or inspect.isgeneratorfunction(target_func)
+    ):
+        raise TypeError(
+            f"memoize can not cache {target} since it is a coroutine or "
+            "generator function"
+        )
+
+    parms = list(inspect.signature(target_func).parameters.values())
+    if skip_self_cls:
+        parms = parms[1:]
+
+    key_builder = CacheKeyBuilder(
+        parms=parms,
+        omit_parms=set(
+            {omit_parms} if isinstance(omit_parms, str) else omit_parms or ""
+        ),
+    )
+    get_key = key_builder.get_key
+
+    cache = _MemoCache(
+        max_size=max_size,
+        ttl_ns=None if ttl_secs is None else int(ttl_secs * 1_000_000_000),
+    )
+
+    def cache_wrapper(
+        wrapped: F,
+        instance: Optional[Any],
+        args: tuple[Any, ...],
+        kwargs: dict[str, Any],
+    ) -> Any:
+        """Return the cached value or call the function."""
+        return cache.call(get_key(instance, args, kwargs), wrapped, args, kwargs)
+
+    return cast(F, _MemoizedFunction(wrapped, cache_wrapper, cache))
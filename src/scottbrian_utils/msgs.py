@@ -96,6 +96,7 @@ from typing import Any, Final, Optional, Union
 # Local
 ########################################################################
 from scottbrian_utils.diag_msg import get_formatted_call_sequence
+from scottbrian_utils.log_queue import LogQueue
 from scottbrian_utils.timer import Timer
 
 ########################################################################
@@ -141,13 +142,21 @@ class Msgs:
     ####################################################################
     # __init__
     ####################################################################
-    def __init__(self) -> None:
-        """Initialize the object."""
+    def __init__(self, log_queue: Optional[LogQueue] = None) -> None:
+        """Initialize the object.
+
+        Args:
+            log_queue: a LogQueue (scottbrian_utils.log_queue) that the
+                log messages are placed on to be handled by its listener
+                thread. If None, the messages are logged directly.
+
+        """
         self.msg_array: dict[str, Any] = {}
         self.msg_lock: threading.Lock = threading.Lock()
 
         # add a logger
         self.logger = logging.getLogger(__name__)
+        self.log_queue = log_queue
 
     ####################################################################
     # queue_msg
@@ -215,5 +224,8 @@ class Msgs:
                     f"timed out on get_msg for recipient: {recipient} "
                     f"{caller_info}"
                 )
-                self.logger.debug(err_msg)
+                if self.log_queue is None:
+                    self.logger.debug(err_msg)
+                else:
+                    self.log_queue.log(self.logger, logging.DEBUG, err_msg)
                 raise GetMsgTimedOut(err_msg)
@@ -0,0 +1,315 @@
+"""Module stack_profiler.
+
+=============
+StackProfiler
+=============
+
+The StackProfiler class is a sampling profiler that can be used to find
+the hot paths of a long running test case or application without any
+third party packages. A background thread periodically takes the stack
+of every other thread from sys._current_frames and counts how many
+times each distinct stack is seen. The frames are labeled the same way
+as the call sequence of diag_msg (mod_name::cls_name.func_name:lineno),
+and the results are provided as folded stacks, one line per distinct
+stack with its sample count, which is the input format of the common
+flamegraph tools.
+
+:Example: find where a function spends its time
+
+>>> import time
+>>> from scottbrian_utils.stack_profiler import StackProfiler
+>>> def busy() -> None:
+...     stop_time = time.time() + 0.2
+...     while time.time() < stop_time:
+...         pass
+>>> with StackProfiler(interval=0.001) as profiler:
+...     busy()
+>>> stacks = profiler.get_folded_stacks()
+>>> print(any('::busy:' in stack for stack in stacks))
+True
+
+
+The stack_profiler module contains:
+
+    1) StackProfiler class with methods:
+
+       a. get_folded_stacks
+       b. start
+       c. stop
+       d. write_folded_stacks
+
+"""
+
+########################################################################
+# Standard Library
+########################################################################
+import sys
+import threading
+import types
+from os import PathLike
+from typing import Any, Optional, TextIO, Union
+
+########################################################################
+# Third Party
+########################################################################
+
+########################################################################
+# Local
+########################################################################
+from scottbrian_utils.diag_msg import get_code_info
+
+########################################################################
+# type aliases
+########################################################################
+# a sampled stack is the code object and line number of each frame
+# ordered from the outermost frame to the innermost frame
+SampledStack = tuple[tuple[types.CodeType, int], ...]
+
+
+########################################################################
+# StackProfiler class
+########################################################################
+class StackProfiler:
+    """Sampling profiler that produces folded stacks."""
+
+    ####################################################################
+    # __init__
+    ####################################################################
+    def __init__(
+        self,
+        interval: float = 0.005,
+        max_depth: int = 200,
+        line_nums: bool = True,
+        per_thread: bool = True,
+    ) -> None:
+        """Initialize the object.
+
+        Args:
+            interval: number of seconds between samples
+            max_depth: the most frames, counting from the innermost
+                frame, that are included in a sampled stack
+            line_nums: if True, the label of each frame includes the
+                line number, otherwise the samples for all lines of a
+                function are combined under one label
+            per_thread: if True, each folded stack starts with the name
+                of the thread it was sampled from, otherwise the
+                samples of all threads are combined
+
+        """
+        self.interval = interval
+        self.max_depth = max_depth
+        self.line_nums = line_nums
+        self.per_thread = per_thread
+
+        self.num_samples = 0
+        self._counts: dict[tuple[int, SampledStack], int] = {}
+        self._thread_names: dict[int, str] = {}
+        self._labels: dict[tuple[types.CodeType, int], str] = {}
+
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    ####################################################################
+    # __repr__
+    ####################################################################
+    def __repr__(self) -> str:
+        """Return a repr of the class.
+
+        Returns:
+            repr of the class
+
+        """
+        return (
+            f"{type(self).__name__}(interval={self.interval}, "
+            f"max_depth={self.max_depth}, line_nums={self.line_nums}, "
+            f"per_thread={self.per_thread})"
+        )
+
+    ####################################################################
+    # __enter__
+    ####################################################################
+    def __enter__(self) -> "StackProfiler":
+        """Start the profiler for the context manager.
+
+        Returns:
+            the started StackProfiler
+
+        """
+        self.start()
+        return self
+
+    ####################################################################
+    # __exit__
+    ####################################################################
+    def __exit__(self, *args: Any) -> None:
+        """Stop the profiler for the context manager.
+
+        Args:
+            args: the exception info, if any
+
+        """
+        self.stop()
+
+    ####################################################################
+    # start
+    ####################################################################
+    def start(self) -> None:
+        """Start the sampling thread."""
+        if self._thread is not None:
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="StackProfiler", daemon=True
+        )
+        self._thread.start()
+
+    ####################################################################
+    # stop
+    ####################################################################
+    def stop(self) -> None:
+        """Stop the sampling thread."""
+        if self._thread is None:
+            return
+
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+
+    ####################################################################
+    # _run
+    ####################################################################
+    def _run(self) -> None:
+        """Take samples until stopped."""
+        own_ident = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            self._take_sample(own_ident)
+
+    ####################################################################
+    # _take_sample
+    ####################################################################
+    def _take_sample(self, own_ident: int) -> None:
+        """Count the current stack of each thread.
+
+        Args:
+            own_ident: ident of the sampling thread, which is skipped
+
+        """
+        frames = sys._current_frames()
+        try:
+            for ident, frame in frames.items():
+                if ident == own_ident:
+                    continue
+
+                if ident not in self._thread_names:
+                    self._thread_names.update(
+                        (thread.ident, thread.name)
+                        for thread in threading.enumerate()
+                        if thread.ident is not None
+                    )
+
+                key = (ident, self._get_stack(frame))
+                self._counts[key] = self._counts.get(key, 0) + 1
+        finally:
+            # do not keep the frames of the other threads alive
+            del frames, frame
+
+        self.num_samples += 1
+
+    ####################################################################
+    # _get_stack
+    ####################################################################
+    def _get_stack(self, frame: Optional[types.FrameType]) -> SampledStack:
+        """Return the code objects and line numbers of a stack.
+
+        Args:
+            frame: the innermost frame of the stack
+
+        Returns:
+            The code object and line number of each frame, ordered from
+            the outermost frame to the innermost frame
+
+        """
+        codes: list[tuple[types.CodeType, int]] = []
+        while frame is not None and len(codes) < self.max_depth:
+            codes.append((frame.f_code, frame.f_lineno))
+            frame = frame.f_back
+        codes.reverse()
+
+        return tuple(codes)
+
+    ####################################################################
+    # _get_label
+    ####################################################################
+    def _get_label(self, code: types.CodeType, line_num: int) -> str:
+        """Return the label for a frame.
+
+        Args:
+            code: code object of the frame
+            line_num: line number of the frame
+
+        Returns:
+            The frame label in the diag_msg call sequence format
+
+        """
+        if not self.line_nums:
+            line_num = code.co_firstlineno
+
+        try:
+            return self._labels[(code, line_num)]
+        except KeyError:
+            pass
+
+        mod_name, cls_name, func_name = get_code_info(code)
+        label = (
+            f"{mod_name}{'::' if func_name else ''}"
+            f"{cls_name}{'.' if cls_name else ''}"
+            f"{func_name}"
+        )
+        if self.line_nums:
+            label = f"{label}:{line_num}"
+
+        # semicolons separate the frames of a folded stack
+        label = label.replace(";", ":")
+        self._labels[(code, line_num)] = label
+        return label
+
+    ####################################################################
+    # get_folded_stacks
+    ####################################################################
+    def get_folded_stacks(self) -> list[str]:
+        """Return the sampled stacks in folded format.
+
+        Returns:
+            A list with one entry for each distinct stack consisting of
+            the frame labels, outermost first, separated by semicolons,
+            followed by a space and the number of samples of the stack
+
+        """
+        folded: dict[str, int] = {}
+        for (ident, stack), count in list(self._counts.items()):
+            labels = [self._get_label(code, line_num) for code, line_num in stack]
+            if self.per_thread:
+                thread_name = self._thread_names.get(ident, str(ident))
+                labels.insert(0, thread_name.replace(";", ":"))
+            key = ";".join(labels)
+            folded[key] = folded.get(key, 0) + count
+
+        return [f"{key} {count}" for key, count in sorted(folded.items())]
+
+    ####################################################################
+    # write_folded_stacks
+    ####################################################################
+    def write_folded_stacks(self, stream: Union[TextIO, str, PathLike[str]]) -> None:
+        """Write the sampled stacks in folded format.
+
+        Args:
+            stream: the stream or the name of the file to write to
+
+        """
+        text = "".join(f"{line}\n" for line in self.get_folded_stacks())
+        if isinstance(stream, (str, PathLike)):
+            with open(stream, "w", encoding="utf-8") as file:
+                file.write(text)
+        else:
+            stream.write(text)
@@ -0,0 +1,264 @@
+"""Module trace_recorder.
+
+=============
+TraceRecorder
+=============
+
+The TraceRecorder class is an in-memory recorder of function entry and
+exit events for high frequency tracing where logging each call would
+be too slow. Each event is a fixed size record of the time, the thread
+id, the function id, and whether it is an entry or an exit, written into
+preallocated arrays that are used as a ring buffer, so only the most
+recent events are kept. The recorded events can be written on demand as
+Chrome trace event JSON, which can be viewed with chrome://tracing or
+https://ui.perfetto.dev.
+
+The etrace decorator (scottbrian_utils.entry_trace) records into a
+TraceRecorder when one is specified with its recorder argument.
+
+:Example: record the calls of a function
+
+>>> from scottbrian_utils.entry_trace import etrace
+>>> from scottbrian_utils.trace_recorder import TraceRecorder
+>>> recorder = TraceRecorder(capacity=1024)
+>>> @etrace(recorder=recorder)
+... def f1(a1: int) -> int:
+...     return a1 * 2
+>>> for idx in range(3):
+...     _ = f1(idx)
+>>> events = recorder.get_events()
+>>> print(len(events), events[0].is_entry, events[1].is_entry)
+6 True False
+
+
+The trace_recorder module contains:
+
+    1) TraceEvent NamedTuple
+    2) TraceRecorder class with methods:
+
+       a. clear
+       b. get_chrome_trace
+       c. get_events
+       d. record
+       e. register
+       f. write_chrome_trace
+
+"""
+
+########################################################################
+# Standard Library
+########################################################################
+import itertools
+import json
+import os
+import threading
+import time
+from array import array
+from os import PathLike
+from typing import Any, NamedTuple, TextIO, Union
+
+########################################################################
+# Third Party
+########################################################################
+
+########################################################################
+# Local
+########################################################################
+
+
+########################################################################
+# TraceEvent
+########################################################################
+class TraceEvent(NamedTuple):
+    """A recorded entry or exit event."""
+
+    time_ns: int
+    thread_id: int
+    func_name: str
+    is_entry: bool
+
+
+########################################################################
+# TraceRecorder class
+########################################################################
+class TraceRecorder:
+    """Ring buffer recorder of function entry and exit events."""
+
+    ####################################################################
+    # __init__
+    ####################################################################
+    def __init__(self, capacity: int = 65536) -> None:
+        """Initialize the object.
+
+        Args:
+            capacity: the number of events kept, after which each new
+                event replaces the oldest event
+
+        Raises:
+            ValueError: capacity is less than 1
+
+        """
+        if capacity < 1:
+            raise ValueError(f"TraceRecorder capacity of {capacity} is less than 1")
+
+        self.capacity = capacity
+
+        # the fields of each event are kept in parallel arrays that are
+        # allocated once, so recording an event does not allocate
+        self._times = array("q", bytes(8 * capacity))
+        self._thread_ids = array("Q", bytes(8 * capacity))
+        self._events = array("q", bytes(8 * capacity))
+
+        # next on itertools.count is atomic, so each event gets its own
+        # slot without a lock
+        self._seq = itertools.count()
+
+        self._func_names: list[str] = []
+        self._register_lock = threading.Lock()
+
+    ####################################################################
+    # __repr__
+    ####################################################################
+    def __repr__(self) -> str:
+        """Return a repr of the class.
+
+        Returns:
+            repr of the class
+
+        """
+        return f"{type(self).__name__}(capacity={self.capacity})"
+
+    ####################################################################
+    # register
+    ####################################################################
+    def register(self, func_name: str) -> int:
+        """Register a function and return its function id.
+
+        Args:
+            func_name: the name of the function as it is to appear in
+                the events
+
+        Returns:
+            The function id to pass to record
+
+        """
+        with self._register_lock:
+            self._func_names.append(func_name)
+            return len(self._func_names) - 1
+
+    ####################################################################
+    # record
+    ####################################################################
+    def record(self, func_id: int, is_entry: bool) -> None:
+        """Record an entry or exit event.
+
+        Args:
+            func_id: the function id returned by register
+            is_entry: True for an entry event, False for an exit event
+
+        """
+        idx = next(self._seq) % self.capacity
+        self._thread_ids[idx] = threading.get_ident()
+        self._events[idx] = func_id << 1 | is_entry
+        # the time is written last since a zero time marks an empty slot
+        self._times[idx] = time.perf_counter_ns()
+
+    ####################################################################
+    # clear
+    ####################################################################
+    def clear(self) -> None:
+        """Remove all recorded events."""
+        for idx in range(self.capacity):
+            self._times[idx] = 0
+
+    ####################################################################
+    # get_events
+    ####################################################################
+    def get_events(self) -> list[TraceEvent]:
+        """Return the recorded events.
+
+        Returns:
+            The events that are still in the ring buffer ordered by
+            their time, oldest first. Events that are being recorded
+            while get_events runs might be missing or incomplete.
+
+        """
+        func_names = self._func_names
+        events = [
+            TraceEvent(
+                time_ns=time_ns,
+                thread_id=self._thread_ids[idx],
+                func_name=func_names[self._events[idx] >> 1],
+                is_entry=bool(self._events[idx] & 1),
+            )
+            for idx, time_ns in enumerate(self._times)
+            if time_ns
+        ]
+        events.sort(key=lambda event: event.time_ns)
+
+        return events
+
+    ####################################################################
+    # get_chrome_trace
+    ####################################################################
+    def get_chrome_trace(self) -> dict[str, Any]:
+        """Return the recorded events in Chrome trace event format.
+
+        Returns:
+            A dictionary with a traceEvents list that has a B (begin)
+            event for each entry, an E (end) event for each exit, and a
+            thread_name metadata event for each thread that is still
+            running
+
+        """
+        pid = os.getpid()
+        thread_names = {
+            thread.ident: thread.name
+            for thread in threading.enumerate()
+            if thread.ident is not None
+        }
+
+        trace_events: list[dict[str, Any]] = []
+        thread_ids = set()
+        for event in self.get_events():
+            thread_ids.add(event.thread_id)
+            trace_events.append(
+                {
+                    "name": event.func_name,
+                    "ph": "B" if event.is_entry else "E",
+                    "ts": event.time_ns / 1000,
+                    "pid": pid,
+                    "tid": event.thread_id,
+                }
+            )
+
+        for thread_id in sorted(thread_ids):
+            if thread_id in thread_names:
+                trace_events.append(
+                    {
+                        "name": "thread_name",
+                        "ph": "M",
+                        "pid": pid,
+                        "tid": thread_id,
+                        "args": {"name": thread_names[thread_id]},
+                    }
+                )
+
+        return {"traceEvents": trace_events, "displayTimeUnit": "ns"}
+
+    ####################################################################
+    # write_chrome_trace
+    ####################################################################
+    def write_chrome_trace(self, stream: Union[TextIO, str, PathLike[str]]) -> None:
+        """Write the recorded events as Chrome trace event JSON.
+
+        Args:
+            stream: the stream or the name of the file to write to
+
+        """
+        text = json.dumps(self.get_chrome_trace())
+        if isinstance(stream, (str, PathLike)):
+            with open(stream, "w", encoding="utf-8") as file:
+                file.write(text)
+        else:
+            stream.write(text)
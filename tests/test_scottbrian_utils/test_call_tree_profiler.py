@@ -0,0 +1,256 @@
+"""test_call_tree_profiler.py module."""
+
+########################################################################
+# Standard Library
+########################################################################
+import io
+import logging
+import os
+import threading
+from collections.abc import Generator
+from pathlib import Path
+
+########################################################################
+# Third Party
+########################################################################
+import pytest
+
+########################################################################
+# Local
+########################################################################
+from scottbrian_utils.call_tree_profiler import CallPathStats, CallTreeProfiler
+from scottbrian_utils.entry_trace import etrace
+from scottbrian_utils.trace_recorder import TraceEvent, TraceRecorder
+from scottbrian_utils.testlib_verifier import verify_lib
+
+########################################################################
+# Set up logging
+########################################################################
+logger = logging.getLogger(__name__)
+logger.debug("about to start the tests")
+
+
+########################################################################
+# get_events
+########################################################################
+def get_events(thread_id: int, spec: str) -> list[TraceEvent]:
+    """Return the events described by a spec.
+
+    Args:
+        thread_id: the thread id of the events
+        spec: space separated events of the form +name@time for an
+            entry and -name@time for an exit
+
+    Returns:
+        The events
+
+    """
+    events = []
+    for item in spec.split():
+        name, time_ns = item[1:].split("@")
+        events.append(
+            TraceEvent(
+                time_ns=int(time_ns),
+                thread_id=thread_id,
+                func_name=name,
+                is_entry=item[0] == "+",
+            )
+        )
+    return events
+
+
+########################################################################
+# TestCallTreeProfilerCorrectSource
+########################################################################
+class TestCallTreeProfilerCorrectSource:
+    """Verify that we are testing with correctly built code."""
+
+    ####################################################################
+    # test_call_tree_profiler_correct_source
+    ####################################################################
+    def test_call_tree_profiler_correct_source(self) -> None:
+        """Test call_tree_profiler correct source."""
+        if "TOX_ENV_NAME" in os.environ:
+            verify_lib(obj_to_check=CallTreeProfiler)
+
+
+########################################################################
+# TestCallTreeProfiler class
+########################################################################
+class TestCallTreeProfiler:
+    """Test CallTreeProfiler."""
+
+    ####################################################################
+    # test_call_tree_profiler_repr
+    ####################################################################
+    def test_call_tree_profiler_repr(self) -> None:
+        """Test CallTreeProfiler repr."""
+        assert repr(CallTreeProfiler()) == "CallTreeProfiler()"
+
+    ####################################################################
+    # test_call_tree_profiler_add_events
+    ####################################################################
+    def test_call_tree_profiler_add_events(self) -> None:
+        """Test the call paths from added events."""
+        profiler = CallTreeProfiler()
+        profiler.add_events(
+            get_events(1, "-f0@5 +f1@10 +f2@20 -f2@50 +f2@60 -f2@70 -f1@100")
+            + get_events(2, "+f1@0 +f3@10 +f2@20 -f2@25 -f3@40 -f1@45 +f4@50")
+        )
+        # thread 1 again with a recursive call and a generator that was
+        # entered in a function that exits before the generator, which
+        # ends the generator call along with the function
+        profiler.add_events(
+            get_events(1, "+f1@0 +f1@10 -f1@30 +g1@35 -f1@40 +f2@50 -g1@60")
+        )
+
+        def stats(path: str, *values: int) -> CallPathStats:
+            return CallPathStats(tuple(path.split()), *values)
+
+        assert profiler.get_call_paths() == [
+            stats("f1", 3, 175, 80),
+            stats("f1 f1", 1, 20, 20),
+            stats("f1 f2", 2, 40, 40),
+            stats("f1 f3", 1, 30, 25),
+            stats("f1 f3 f2", 1, 5, 5),
+            stats("f1 g1", 1, 5, 5),
+        ]
+
+        assert [stats.path for stats in profiler.get_hot_paths(top_n=3)] == [
+            ("f1",),
+            ("f1", "f2"),
+            ("f1", "f3"),
+        ]
+        assert [
+            stats.path for stats in profiler.get_hot_paths(top_n=2, inclusive=True)
+        ] == [("f1",), ("f1", "f2")]
+
+        profiler.clear()
+        assert profiler.get_call_paths() == []
+
+    ####################################################################
+    # test_call_tree_profiler_write
+    ####################################################################
+    def test_call_tree_profiler_write(self, tmp_path: Path) -> None:
+        """Test writing the hot paths and folded stacks.
+
+        Args:
+            tmp_path: pytest fixture for a temporary directory
+
+        """
+        profiler = CallTreeProfiler()
+        profiler.add_events(get_events(1, "+f;1@0 +f2@10 -f2@110 -f;1@120"))
+
+        stream = io.StringIO()
+        profiler.write_hot_paths(stream, top_n=5)
+        assert stream.getvalue() == (
+            "  exclusive_ns   inclusive_ns num_calls  call path\n"
+            "           100            100         1  f;1 -> f2\n"
+            "            20            120         1  f;1\n"
+        )
+
+        file_name = tmp_path / "calls.folded"
+        profiler.write_folded_stacks(file_name)
+        assert file_name.read_text() == "f:1 20\nf:1;f2 100\n"
+
+    ####################################################################
+    # test_call_tree_profiler_write_at_exit
+    ####################################################################
+    def test_call_tree_profiler_write_at_exit(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test writing the hot paths at exit.
+
+        Args:
+            monkeypatch: pytest fixture to capture atexit.register
+
+        """
+        registered = []
+
+        def register(func: object, *args: object, **kwargs: object) -> None:
+            registered.append((func, args, kwargs))
+
+        profiler = CallTreeProfiler()
+        profiler.add_events(get_events(1, "+f1@0 -f1@10"))
+        stream = io.StringIO()
+        with monkeypatch.context() as mp:
+            mp.setattr("atexit.register", register)
+            profiler.write_at_exit(stream, top_n=3)
+
+        func, args, kwargs = registered[0]
+        func(*args, **kwargs)  # type: ignore
+        assert stream.getvalue().splitlines()[1].endswith(" 1  f1")
+
+
+########################################################################
+# TestCallTreeProfilerEtrace class
+########################################################################
+class TestCallTreeProfilerEtrace:
+    """Test etrace with a CallTreeProfiler."""
+
+    ####################################################################
+    # test_call_tree_profiler_etrace
+    ####################################################################
+    def test_call_tree_profiler_etrace(self) -> None:
+        """Test the call tree of functions traced by etrace."""
+        profiler = CallTreeProfiler()
+
+        @etrace(recorder=profiler)
+        def f2(a1: int) -> int:
+            return a1 + 1
+
+        @etrace(recorder=profiler)
+        def gen1() -> Generator[int, None, None]:
+            yield f2(1)
+
+        @etrace(recorder=profiler)
+        def f1(num_calls: int) -> None:
+            for idx in range(num_calls):
+                f2(idx)
+            list(gen1())
+
+        threads = [threading.Thread(target=f1, args=(10,)) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        f1(5)
+
+        counts = {
+            tuple(name.split("::")[1].split(":")[0] for name in stats.path): (
+                stats.num_calls
+            )
+            for stats in profiler.get_call_paths()
+        }
+        assert counts == {
+            ("f1",): 4,
+            ("f1", "f2"): 35,
+            ("f1", "gen1"): 4,
+            ("f1", "gen1", "f2"): 4,
+        }
+        for stats in profiler.get_call_paths():
+            assert stats.inclusive_ns >= stats.exclusive_ns >= 0
+
+    ####################################################################
+    # test_call_tree_profiler_recorder_events
+    ####################################################################
+    def test_call_tree_profiler_recorder_events(self) -> None:
+        """Test the call tree from the events of a TraceRecorder."""
+        recorder = TraceRecorder()
+
+        @etrace(recorder=recorder)
+        def f2() -> None:
+            pass
+
+        @etrace(recorder=recorder)
+        def f1() -> None:
+            f2()
+            f2()
+
+        f1()
+        profiler = CallTreeProfiler()
+        profiler.add_events(recorder.get_events())
+
+        assert [
+            (len(stats.path), stats.num_calls) for stats in profiler.get_call_paths()
+        ] == [(1, 1), (2, 2)]
@@ -0,0 +1,860 @@
+"""test_diag_msg_features.py module.
+
+The tests in test_diag_msg.py hard code the line numbers of their calls,
+so the tests of the diag_msg features added since are kept here.
+
+"""
+
+########################################################################
+# Standard Library
+########################################################################
+import io
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+# noinspection PyProtectedMember
+from sys import _getframe
+from timeit import repeat, timeit
+from typing import Any
+
+########################################################################
+# Third Party
+########################################################################
+import pytest
+
+########################################################################
+# Local
+########################################################################
+from scottbrian_utils import diag_msg as diag_msg_mod
+from scottbrian_utils.diag_msg import (
+    CallerInfo,
+    diag_msg,
+    diag_msg_datetime_fmt,
+    diag_msg_perf_counter_fmt,
+    DiagMsgWriter,
+    flush_diag_msgs,
+    format_timestamp,
+    get_call_sequence,
+    get_caller_info,
+    get_code_info,
+    get_formatted_call_sequence,
+    get_mod_name,
+    report_diag_msg_suppressed,
+    reset_diag_msg_rate_limits,
+    set_diag_msg_enabled,
+    set_diag_msg_lazy,
+    set_mod_name_prefixes,
+    start_diag_msg_writer,
+    stop_diag_msg_writer,
+)
+from scottbrian_utils.testlib_verifier import verify_lib
+
+
+########################################################################
+# TestDiagMsgFeaturesCorrectSource
+########################################################################
+class TestDiagMsgFeaturesCorrectSource:
+    """Verify that we are testing with correctly built code."""
+
+    ####################################################################
+    # test_diag_msg_features_correct_source
+    ####################################################################
+    def test_diag_msg_features_correct_source(self) -> None:
+        """Test diag_msg features correct source."""
+        if "TOX_ENV_NAME" in os.environ:
+            verify_lib(obj_to_check=get_mod_name)
+
+
+########################################################################
+# TestGetCallerInfoCache class
+########################################################################
+class TestGetCallerInfoCache:
+    """Test get_caller_info resolution from the code object."""
+
+    ####################################################################
+    # test_get_caller_info_cache
+    ####################################################################
+    def test_get_caller_info_cache(self) -> None:
+        """Test get_caller_info takes only the line number per call."""
+        frame = _getframe(0)
+        try:
+            caller_info1 = get_caller_info(frame)
+            caller_info2 = get_caller_info(frame)
+        finally:
+            del frame
+
+        assert caller_info1[0:3] == (
+            "test_diag_msg_features.py",
+            "TestGetCallerInfoCache",
+            "test_get_caller_info_cache",
+        )
+        assert caller_info2[0:3] == caller_info1[0:3]
+        assert caller_info2.line_num == caller_info1.line_num + 1
+
+    ####################################################################
+    # test_get_caller_info_cache_size
+    ####################################################################
+    def test_get_caller_info_cache_size(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test only the most recently used code objects are cached.
+
+        Args:
+            monkeypatch: pytest fixture to set the cache size
+
+        """
+        monkeypatch.setattr(diag_msg_mod, "diag_msg_code_info_cache_size", 2)
+        set_mod_name_prefixes()
+
+        def f1() -> CallerInfo:
+            return get_caller_info(_getframe(0))
+
+        def f2() -> CallerInfo:
+            return get_caller_info(_getframe(0))
+
+        def f3() -> CallerInfo:
+            return get_caller_info(_getframe(0))
+
+        assert f1().func_name == "f1"
+        assert f2().func_name == "f2"
+        assert list(diag_msg_mod._code_info_cache) == [f1.__code__, f2.__code__]
+
+        # f1 is used again, so f2 is the least recently used
+        assert f1().func_name == "f1"
+        assert f3().func_name == "f3"
+        assert list(diag_msg_mod._code_info_cache) == [f1.__code__, f3.__code__]
+        assert f2().func_name == "f2"
+        assert list(diag_msg_mod._code_info_cache) == [f3.__code__, f2.__code__]
+
+    ####################################################################
+    # test_get_caller_info_qualname
+    ####################################################################
+    def test_get_caller_info_qualname(self) -> None:
+        """Test get_caller_info class names from the qualified name."""
+
+        class LocalCls:
+            class InnerCls:
+                def f1(self) -> CallerInfo:
+                    return get_caller_info(_getframe(0))
+
+            @staticmethod
+            def f2() -> CallerInfo:
+                def f3() -> CallerInfo:
+                    return get_caller_info(_getframe(0))
+
+                return f3()
+
+        def f4() -> CallerInfo:
+            return get_caller_info(_getframe(0))
+
+        assert LocalCls.InnerCls().f1()[0:3] == (
+            "test_diag_msg_features.py",
+            "InnerCls",
+            "f1",
+        )
+        assert LocalCls.f2()[0:3] == ("test_diag_msg_features.py", "", "f3")
+        assert f4()[0:3] == ("test_diag_msg_features.py", "", "f4")
+
+        assert get_code_info(LocalCls.f2.__code__) == (
+            "test_diag_msg_features.py",
+            "LocalCls",
+            "f2",
+        )
+        module_code = compile("pass", "script.py", "exec")
+        assert get_code_info(module_code) == ("script.py", "", "")
+
+
+########################################################################
+# TestGetCallSequence class
+########################################################################
+class TestGetCallSequence:
+    """Test get_call_sequence."""
+
+    ####################################################################
+    # test_get_call_sequence
+    ####################################################################
+    @pytest.mark.parametrize("latest_arg", [0, 1, 2, 1000])
+    @pytest.mark.parametrize("depth_arg", [-1, 0, 1, 2, 3, 1000])
+    def test_get_call_sequence(self, latest_arg: int, depth_arg: int) -> None:
+        """Test get_call_sequence agrees with the formatted sequence.
+
+        Args:
+            latest_arg: specifies how far back into the stack to go for
+                the most recent entry
+            depth_arg: specifies how many entries to get
+
+        """
+        latest, depth = latest_arg, depth_arg
+
+        def f1() -> tuple[list[CallerInfo], str]:
+            return f2()
+
+        def f2() -> tuple[list[CallerInfo], str]:
+            # both calls are on the same line to get the same line_num
+            return get_call_sequence(latest, depth), get_formatted_call_sequence(
+                latest, depth
+            )
+
+        call_seq, formatted_call_seq = f1()
+
+        assert formatted_call_seq == " -> ".join(
+            f"{caller_info.mod_name}{'::' if caller_info.func_name else ''}"
+            f"{caller_info.cls_name}{'.' if caller_info.cls_name else ''}"
+            f"{caller_info.func_name}:{caller_info.line_num}"
+            for caller_info in call_seq
+        )
+
+        if depth_arg <= 0 or latest_arg == 1000:
+            assert call_seq == []
+        else:
+            assert 0 < len(call_seq) <= depth_arg
+            exp_func_names = ["test_get_call_sequence", "f1", "f2"][: 3 - latest_arg]
+            exp_func_names = exp_func_names[-depth_arg:]
+            assert [caller_info.func_name for caller_info in call_seq][
+                -len(exp_func_names) :
+            ] == exp_func_names
+
+
+########################################################################
+# TestGetModName class
+########################################################################
+class TestGetModName:
+    """Test get_mod_name."""
+
+    ####################################################################
+    # test_get_mod_name
+    ####################################################################
+    def test_get_mod_name(self) -> None:
+        """Test get_mod_name with and without prefixes."""
+        file_name = _getframe(0).f_code.co_filename
+        try:
+            assert get_mod_name(file_name) == "test_diag_msg_features.py"
+            assert get_mod_name(file_name) is get_mod_name(file_name)
+
+            prefix = os.path.dirname(os.path.dirname(file_name))
+            set_mod_name_prefixes([prefix, os.path.dirname(prefix)])
+            exp_mod_name = os.path.join(
+                "test_scottbrian_utils", "test_diag_msg_features.py"
+            )
+            assert get_mod_name(file_name) == exp_mod_name
+            assert get_caller_info(_getframe(0)).mod_name == exp_mod_name
+            assert get_formatted_call_sequence(depth=1).startswith(
+                f"{exp_mod_name}::TestGetModName.test_get_mod_name:"
+            )
+
+            # a prefix that does not match uses the base name
+            set_mod_name_prefixes(["/no/such/prefix"])
+            assert get_mod_name(file_name) == "test_diag_msg_features.py"
+        finally:
+            set_mod_name_prefixes()
+
+        assert get_caller_info(_getframe(0)).mod_name == "test_diag_msg_features.py"
+
+    ####################################################################
+    # test_get_mod_name_separator
+    ####################################################################
+    @pytest.mark.parametrize(
+        "prefixes_arg, file_name_arg, exp_mod_name",
+        [
+            # a sibling directory whose name starts with the prefix
+            (["/opt/app"], "/opt/app2/x.py", "x.py"),
+            (["/opt/app"], "/opt/app/x.py", "x.py"),
+            (["/opt/app", "/opt"], "/opt/app2/x.py", "app2/x.py"),
+            # a prefix that is part of a directory name
+            (
+                ["/usr/lib/python3"],
+                "/usr/lib/python3.13/site-packages/pkg/mod1.py",
+                "mod1.py",
+            ),
+            (
+                ["/usr/lib/python3.13/site-packages/"],
+                "/usr/lib/python3.13/site-packages/pkg/mod1.py",
+                "pkg/mod1.py",
+            ),
+            (["C:\\app\\"], "C:\\app\\pkg\\mod1.py", "pkg\\mod1.py"),
+            # a prefix that is the whole file name
+            (["/opt/app/x.py"], "/opt/app/x.py", "x.py"),
+        ],
+    )
+    def test_get_mod_name_separator(
+        self, prefixes_arg: list[str], file_name_arg: str, exp_mod_name: str
+    ) -> None:
+        """Test a prefix is removed only up to a path separator.
+
+        Args:
+            prefixes_arg: the prefixes to set
+            file_name_arg: the source file name
+            exp_mod_name: the expected module name
+
+        """
+        try:
+            set_mod_name_prefixes(prefixes_arg)
+            assert get_mod_name(file_name_arg) == exp_mod_name
+        finally:
+            set_mod_name_prefixes()
+
+    ####################################################################
+    # test_get_mod_name_benchmark
+    ####################################################################
+    def test_get_mod_name_benchmark(self) -> None:
+        """Benchmark the per-frame cost of resolving the module name."""
+        file_name = _getframe(0).f_code.co_filename
+        num_calls = 100_000
+
+        def uncached() -> None:
+            for _ in range(num_calls):
+                os.fspath(Path(file_name).name)
+
+        def cached() -> None:
+            for _ in range(num_calls):
+                get_mod_name(file_name)
+
+        uncached_secs = timeit(uncached, number=1)
+        cached_secs = timeit(cached, number=1)
+
+        print(
+            f"\nper-frame module name cost: "
+            f"Path: {uncached_secs / num_calls * 1e9:.1f} ns, "
+            f"cached: {cached_secs / num_calls * 1e9:.1f} ns"
+        )
+
+        assert cached_secs < uncached_secs
+
+
+########################################################################
+# TestDiagMsgModes class
+########################################################################
+class TestDiagMsgModes:
+    """Test diag_msg enable switches and lazy mode."""
+
+    ####################################################################
+    # test_diag_msg_enabled
+    ####################################################################
+    def test_diag_msg_enabled(self, capsys: pytest.CaptureFixture[str]) -> None:
+        """Test diag_msg disabled globally and by module.
+
+        Args:
+            capsys: pytest fixture to capture print output
+
+        """
+        try:
+            set_diag_msg_enabled(False)
+            diag_msg("not printed when disabled globally")
+            assert capsys.readouterr().out == ""
+
+            set_diag_msg_enabled(True)
+            set_diag_msg_enabled(False, module=__name__)
+            diag_msg("not printed when disabled for module")
+            assert capsys.readouterr().out == ""
+
+            set_diag_msg_enabled(False, module="some.other.module")
+            set_diag_msg_enabled(True, module=__name__)
+            diag_msg("printed when enabled")
+            assert capsys.readouterr().out.endswith(" printed when enabled\n")
+        finally:
+            set_diag_msg_enabled(True)
+            set_diag_msg_enabled(True, module="some.other.module")
+
+    ####################################################################
+    # test_diag_msg_lazy
+    ####################################################################
+    def test_diag_msg_lazy(self, capsys: pytest.CaptureFixture[str]) -> None:
+        """Test diag_msg lazy mode.
+
+        Args:
+            capsys: pytest fixture to capture print output
+
+        """
+        msg_list = ["a"]
+        try:
+            set_diag_msg_lazy(True)
+            line_num = _getframe(0).f_lineno + 1
+            diag_msg("lazy msg", msg_list, depth=1, dt_format="%H:%M")
+            diag_msg("second lazy msg", end="!\n")
+            assert capsys.readouterr().out == ""
+
+            msg_list.append("b")
+            flush_diag_msgs()
+        finally:
+            set_diag_msg_lazy(False)
+
+        captured_lines = capsys.readouterr().out.splitlines()
+        assert len(captured_lines) == 2
+        assert captured_lines[0].endswith(
+            "test_diag_msg_features.py::TestDiagMsgModes.test_diag_msg_lazy:"
+            f"{line_num} lazy msg ['a', 'b']"
+        )
+        assert len(captured_lines[0].split()[0]) == len("HH:MM")
+        assert captured_lines[1].endswith(
+            "test_diag_msg_features.py::TestDiagMsgModes.test_diag_msg_lazy:"
+            f"{line_num + 1} second lazy msg!"
+        )
+
+        # turning lazy mode off flushes any captured messages
+        set_diag_msg_lazy(True)
+        diag_msg("flushed when lazy mode is turned off")
+        set_diag_msg_lazy(False)
+        assert capsys.readouterr().out.endswith(
+            " flushed when lazy mode is turned off\n"
+        )
+
+    ####################################################################
+    # test_diag_msg_lazy_max_pending
+    ####################################################################
+    def test_diag_msg_lazy_max_pending(
+        self, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        """Test only the most recent lazy messages are kept.
+
+        Args:
+            capsys: pytest fixture to capture print output
+
+        """
+        with pytest.raises(ValueError, match="max_pending of 0 is less than 1"):
+            set_diag_msg_lazy(True, max_pending=0)
+
+        try:
+            set_diag_msg_lazy(True, max_pending=3)
+            for idx in range(10):
+                diag_msg("lazy msg", idx)
+            assert capsys.readouterr().out == ""
+            flush_diag_msgs()
+        finally:
+            set_diag_msg_lazy(False)
+
+        captured_lines = capsys.readouterr().out.splitlines()
+        assert len(captured_lines) == 4
+        assert captured_lines[0].endswith(" 7 lazy diag_msg calls dropped")
+        for idx, line in enumerate(captured_lines[1:], start=7):
+            assert line.endswith(f" lazy msg {idx}")
+
+    ####################################################################
+    # test_diag_msg_lazy_dropped_threads
+    ####################################################################
+    @pytest.mark.parametrize("num_threads_arg", [2, 8])
+    def test_diag_msg_lazy_dropped_threads(
+        self, num_threads_arg: int, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        """Test the dropped count of lazy messages from several threads.
+
+        Args:
+            num_threads_arg: number of threads issuing messages
+            capsys: pytest fixture to capture print output
+
+        """
+        barrier = threading.Barrier(num_threads_arg)
+
+        def f1() -> None:
+            barrier.wait()
+            for idx in range(500):
+                diag_msg("lazy msg", idx)
+
+        try:
+            set_diag_msg_lazy(True, max_pending=50)
+            threads = [threading.Thread(target=f1) for _ in range(num_threads_arg)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            flush_diag_msgs()
+        finally:
+            set_diag_msg_lazy(False)
+
+        # every message is either written or counted as dropped
+        captured_lines = capsys.readouterr().out.splitlines()
+        assert len(captured_lines) == 51
+        num_dropped = num_threads_arg * 500 - 50
+        assert captured_lines[0].endswith(f" {num_dropped} lazy diag_msg calls dropped")
+
+
+########################################################################
+# TestDiagMsgWriter class
+########################################################################
+class TestDiagMsgWriter:
+    """Test the diag_msg background writer."""
+
+    ####################################################################
+    # test_diag_msg_writer_stream
+    ####################################################################
+    def test_diag_msg_writer_stream(self) -> None:
+        """Test diag_msg written to a stream by the writer."""
+        stream = io.StringIO()
+        try:
+            start_diag_msg_writer(stream=stream, interval=0.01)
+            line_num = _getframe(0).f_lineno + 1
+            diag_msg("written", "by writer", sep="-", end="!\n")
+            diag_msg("to stdout", file=sys.stdout)
+        finally:
+            stop_diag_msg_writer()
+
+        assert stream.getvalue().endswith(
+            "test_diag_msg_features.py::TestDiagMsgWriter.test_diag_msg_writer_stream:"
+            f"{line_num}-written-by writer!\n"
+        )
+        assert "to stdout" not in stream.getvalue()
+
+    ####################################################################
+    # test_diag_msg_writer_file
+    ####################################################################
+    def test_diag_msg_writer_file(self, tmp_path: Any) -> None:
+        """Test diag_msg written to a file by the background writer.
+
+        Args:
+            tmp_path: pytest fixture for a temporary directory
+
+        """
+        file_name = tmp_path / "diag_msg.txt"
+        try:
+            start_diag_msg_writer(stream=file_name)
+            diag_msg("first")
+            set_diag_msg_lazy(True)
+            diag_msg("second")
+        finally:
+            set_diag_msg_lazy(False)
+            stop_diag_msg_writer()
+
+        lines = file_name.read_text().splitlines()
+        assert len(lines) == 2
+        assert lines[0].endswith(" first")
+        assert lines[1].endswith(" second")
+
+    ####################################################################
+    # test_diag_msg_writer_order
+    ####################################################################
+    @pytest.mark.parametrize("num_threads_arg", [1, 2, 8])
+    def test_diag_msg_writer_order(self, num_threads_arg: int) -> None:
+        """Test messages from several threads are written in order.
+
+        Args:
+            num_threads_arg: number of threads issuing messages
+
+        """
+        stream = io.StringIO()
+        writer = DiagMsgWriter(stream=stream, interval=0.001, holdback=0.5)
+        writer.start()
+
+        def add_msgs(idx: int) -> None:
+            for num in range(200):
+                timestamp = time.time()
+                writer.add(timestamp, f"{timestamp} {idx} {num}\n")
+
+        threads = [
+            threading.Thread(target=add_msgs, args=(idx,))
+            for idx in range(num_threads_arg)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        writer.stop()
+
+        lines = stream.getvalue().splitlines()
+        assert len(lines) == num_threads_arg * 200
+        timestamps = [float(line.split()[0]) for line in lines]
+        assert timestamps == sorted(timestamps)
+        for idx in range(num_threads_arg):
+            nums = [
+                int(line.split()[2]) for line in lines if line.split()[1] == str(idx)
+            ]
+            assert nums == list(range(200))
+
+    ####################################################################
+    # test_diag_msg_writer_thread_ended
+    ####################################################################
+    def test_diag_msg_writer_thread_ended(self) -> None:
+        """Test the buffers of ended threads are removed."""
+        stream = io.StringIO()
+        writer = DiagMsgWriter(stream=stream, interval=0.001, holdback=0)
+        writer.start()
+
+        threads = [
+            threading.Thread(target=writer.add, args=(time.time(), f"{idx}\n"))
+            for idx in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for _ in range(1000):
+            if not writer._bufs:
+                break
+            time.sleep(0.01)
+        assert writer._bufs == []
+        writer.stop()
+
+        assert sorted(stream.getvalue().splitlines()) == [f"{idx}" for idx in range(5)]
+
+    ####################################################################
+    # test_diag_msg_writer_stop_race
+    ####################################################################
+    @pytest.mark.parametrize("num_threads_arg", [1, 4])
+    def test_diag_msg_writer_stop_race(
+        self, num_threads_arg: int, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        """Test messages added while the writer stops are not lost.
+
+        Args:
+            num_threads_arg: number of threads adding messages
+            capsys: pytest fixture to capture print output
+
+        """
+        stream = io.StringIO()
+        writer = DiagMsgWriter(stream=stream, interval=0.001, holdback=0)
+        writer.start()
+        barrier = threading.Barrier(num_threads_arg + 1)
+        not_added: list[str] = []
+
+        def f1(thread_idx: int) -> None:
+            barrier.wait()
+            for idx in range(2000):
+                if not writer.add(time.time(), f"{thread_idx} {idx}\n"):
+                    not_added.append(f"{thread_idx} {idx}")
+
+        threads = [
+            threading.Thread(target=f1, args=(idx,)) for idx in range(num_threads_arg)
+        ]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        time.sleep(0.001)
+        writer.stop()
+        for thread in threads:
+            thread.join()
+
+        # each message is either written by the writer or given back
+        assert sorted(stream.getvalue().splitlines() + not_added) == sorted(
+            f"{thread_idx} {idx}"
+            for thread_idx in range(num_threads_arg)
+            for idx in range(2000)
+        )
+
+        # diag_msg prints a message that the stopped writer gives back
+        writer = start_diag_msg_writer(stream=stream)
+        try:
+            writer.stop()
+            diag_msg("after stop")
+        finally:
+            stop_diag_msg_writer()
+        assert capsys.readouterr().out.endswith(" after stop\n")
+
+
+########################################################################
+# TestFormatTimestamp class
+########################################################################
+class TestFormatTimestamp:
+    """Test format_timestamp and the perf_counter_ns dt_format."""
+
+    ####################################################################
+    # test_format_timestamp
+    ####################################################################
+    @pytest.mark.parametrize(
+        "dt_format_arg",
+        [
+            "%H:%M:%S.%f",
+            "%b %d %H:%M:%S.%f",
+            "%f %H:%M:%S",
+            "%a %b-%d %H:%M:%S",
+            "%f %f",
+            "%H:%M:%S %%f",
+            "",
+        ],
+    )
+    def test_format_timestamp(self, dt_format_arg: str) -> None:
+        """Test format_timestamp matches datetime strftime.
+
+        Args:
+            dt_format_arg: datetime format to use
+
+        """
+        base = datetime(2026, 3, 1, 12, 30, 59).timestamp()
+        for offset in (
+            0.0,
+            0.1234564,
+            0.1234565,
+            0.9999994,
+            0.9999996,
+            1.0,
+            1.000001,
+            61.5,
+            3600.25,
+        ):
+            timestamp = base + offset
+            assert format_timestamp(timestamp, dt_format_arg) == (
+                datetime.fromtimestamp(timestamp).strftime(dt_format_arg)
+            )
+
+    ####################################################################
+    # test_diag_msg_perf_counter_fmt
+    ####################################################################
+    @pytest.mark.parametrize("lazy_arg", [False, True])
+    def test_diag_msg_perf_counter_fmt(
+        self, lazy_arg: bool, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        """Test diag_msg with the perf_counter_ns dt_format.
+
+        Args:
+            lazy_arg: if True, use lazy mode
+            capsys: pytest fixture to capture print output
+
+        """
+        try:
+            set_diag_msg_lazy(lazy_arg)
+            diag_msg("first", dt_format=diag_msg_perf_counter_fmt)
+            diag_msg("second", dt_format=diag_msg_perf_counter_fmt)
+        finally:
+            set_diag_msg_lazy(False)
+
+        captured_lines = capsys.readouterr().out.splitlines()
+        assert len(captured_lines) == 2
+        first_ns = int(captured_lines[0].split()[0])
+        second_ns = int(captured_lines[1].split()[0])
+        assert 0 < first_ns <= second_ns
+        assert captured_lines[0].endswith(" first")
+        assert captured_lines[1].endswith(" second")
+
+    ####################################################################
+    # test_format_timestamp_timing
+    ####################################################################
+    def test_format_timestamp_timing(self) -> None:
+        """Test format_timestamp is faster than datetime strftime."""
+        timestamp = time.time()
+        assert format_timestamp(timestamp, diag_msg_datetime_fmt) == (
+            datetime.fromtimestamp(timestamp).strftime(diag_msg_datetime_fmt)
+        )
+
+        # the best of several runs is used to limit the effect of other
+        # activity on the system
+        cached_secs = min(
+            repeat(
+                lambda: format_timestamp(timestamp, diag_msg_datetime_fmt),
+                number=2000,
+            )
+        )
+        strftime_secs = min(
+            repeat(
+                lambda: datetime.fromtimestamp(timestamp).strftime(
+                    diag_msg_datetime_fmt
+                ),
+                number=2000,
+            )
+        )
+        assert cached_secs < strftime_secs
+
+
+########################################################################
+# TestDiagMsgRateLimit class
+########################################################################
+class TestDiagMsgRateLimit:
+    """Test diag_msg rate limiting."""
+
+    ####################################################################
+    # test_diag_msg_every_nth
+    ####################################################################
+    @pytest.mark.parametrize("every_nth_arg", [1, 2, 3, 10, 25])
+    def test_diag_msg_every_nth(
+        self, every_nth_arg: int, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        """Test diag_msg with every_nth.
+
+        Args:
+            every_nth_arg: only every nth call is printed
+            capsys: pytest fixture to capture print output
+
+        """
+        reset_diag_msg_rate_limits()
+        for idx in range(20):
+            diag_msg("loop", idx, every_nth=every_nth_arg)
+        report_diag_msg_suppressed()
+
+        captured_lines = capsys.readouterr().out.splitlines()
+        exp_idxs = list(range(0, 20, every_nth_arg))
+        exp_suppressed = 0 if every_nth_arg == 1 else every_nth_arg - 1
+        for line, idx in zip(captured_lines, exp_idxs):
+            if idx == 0 or not exp_suppressed:
+                assert line.endswith(f" loop {idx}")
+            else:
+                assert line.endswith(f" loop {idx} ({exp_suppressed} suppressed)")
+
+        remaining = 20 - 1 - exp_idxs[-1]
+        if remaining:
+            assert len(captured_lines) == len(exp_idxs) + 1
+            assert captured_lines[-1].endswith(
+                f" {remaining} diag_msg calls suppressed"
+            )
+        else:
+            assert len(captured_lines) == len(exp_idxs)
+
+    ####################################################################
+    # test_diag_msg_max_per_sec
+    ####################################################################
+    def test_diag_msg_max_per_sec(self, capsys: pytest.CaptureFixture[str]) -> None:
+        """Test diag_msg with max_per_sec.
+
+        Args:
+            capsys: pytest fixture to capture print output
+
+        """
+        reset_diag_msg_rate_limits()
+
+        def loop(num_calls: int) -> None:
+            for idx in range(num_calls):
+                diag_msg("loop", idx, max_per_sec=5)
+
+        # the first 5 are printed as a burst and the rest suppressed
+        loop(1000)
+        captured_lines = capsys.readouterr().out.splitlines()
+        assert len(captured_lines) == 5
+        for idx, line in enumerate(captured_lines):
+            assert line.endswith(f" loop {idx}")
+
+        # after a fifth of a second one more message is allowed
+        time.sleep(0.25)
+        loop(10)
+        captured_lines = capsys.readouterr().out.splitlines()
+        assert len(captured_lines) == 1
+        assert captured_lines[0].endswith(" loop 0 (995 suppressed)")
+
+        report_diag_msg_suppressed()
+        captured_lines = capsys.readouterr().out.splitlines()
+        assert len(captured_lines) == 1
+        assert captured_lines[0].endswith(" 9 diag_msg calls suppressed")
+
+        report_diag_msg_suppressed()
+        assert capsys.readouterr().out == ""
+
+    ####################################################################
+    # test_diag_msg_rate_limit_timing
+    ####################################################################
+    def test_diag_msg_rate_limit_timing(
+        self, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        """Test a suppressed diag_msg is faster than its call sequence.
+
+        Args:
+            capsys: pytest fixture to capture print output
+
+        """
+        reset_diag_msg_rate_limits()
+
+        def suppressed_call() -> None:
+            diag_msg("never printed", every_nth=1_000_000_000, depth=10)
+
+        # only the first call is printed
+        suppressed_call()
+        assert capsys.readouterr().out.endswith(" never printed\n")
+
+        # the best of several runs is used to limit the effect of other
+        # activity on the system
+        suppressed_secs = min(repeat(suppressed_call, number=2000))
+        get_seq_secs = min(
+            repeat(lambda: get_formatted_call_sequence(0, 10), number=2000)
+        )
+        assert suppressed_secs < get_seq_secs
+
+        report_diag_msg_suppressed()
+        captured_lines = capsys.readouterr().out.splitlines()
+        assert len(captured_lines) == 1
+        assert captured_lines[0].endswith(" 10000 diag_msg calls suppressed")
@@ -3,15 +3,21 @@
 ########################################################################
 # Standard Library
 ########################################################################
+import asyncio
 import functools as ft
 import inspect
 import itertools as it
 import logging
 import os
 import re
-from collections.abc import Iterable
+import sys
+import threading
+import time
+from collections.abc import Generator, Iterable
 from dataclasses import dataclass, field
 from enum import Enum, auto
+from pathlib import Path
+from timeit import repeat
 from typing import Any, Callable, Iterator, Optional, Union
 
 ########################################################################
@@ -24,7 +30,15 @@ from typing_extensions import Protocol
 ########################################################################
 # Local
 ########################################################################
-from scottbrian_utils.entry_trace import etrace
+from scottbrian_utils.entry_trace import (
+    etrace,
+    etrace_all,
+    BoundedRepr,
+    EntryFormatter,
+    etrace_timelines,
+    EtraceMonitor,
+    OverheadGovernor,
+)
 from scottbrian_utils.log_verifier import LogVer
 from scottbrian_utils.testlib_verifier import verify_lib
 
@@ -78,15 +92,14 @@ class TestEntryTraceErrors:
 
         from scottbrian_utils.entry_trace import etrace
 
-        @etrace(omit_parms=["a2"])
-        def f1(a1: int, kw1: str = "42") -> str:
-            return f"{a1=}, {kw1=}"
-
         ################################################################
         # mainline
         ################################################################
         with pytest.raises(ValueError):
-            f1(42, kw1="forty two")
+
+            @etrace(omit_parms=["a2"])
+            def f1(a1: int, kw1: str = "42") -> str:
+                return f"{a1=}, {kw1=}"
 
 
 ########################################################################
@@ -5630,3 +5643,1648 @@ class TestEntryTraceCombos:
         match_results = log_ver.get_match_results(caplog=caplog)
         log_ver.print_match_results(match_results, print_matched=True)
         log_ver.verify_match_results(match_results)
+
+
+########################################################################
+# TestEntryFormatter class
+########################################################################
+class TestEntryFormatter:
+    """Test the entry message formatter used by etrace."""
+
+    mutable_default: list[int] = []
+
+    @staticmethod
+    def f1(
+        a1: int,
+        a2: str = "{a2}",
+        *args: Any,
+        kw1: Any = mutable_default,
+        **kwargs: Any,
+    ) -> None:
+        """Function whose entry message is formatted.
+
+        Args:
+            a1: positional arg
+            a2: positional arg with a default
+            args: var positional args
+            kw1: keyword only arg with a mutable default
+            kwargs: var keyword args
+
+        """
+        pass
+
+    ####################################################################
+    # test_entry_formatter
+    ####################################################################
+    @pytest.mark.parametrize(
+        "args_arg, kwargs_arg, omit_parms_arg, exp_msg",
+        [
+            ((), {}, set(), "t entry: a1=?, a2='{a2}', kw1=[], caller: seq"),
+            ((1,), {}, set(), "t entry: a1=1, a2='{a2}', kw1=[], caller: seq"),
+            (
+                (1, "x", 3, "{y}"),
+                {},
+                set(),
+                "t entry: a1=1, a2='x', args=(3, '{y}'), kw1=[], caller: seq",
+            ),
+            (
+                (1,),
+                {"k2": "v", "a2": None, "kw1": 5},
+                set(),
+                "t entry: a1=1, a2=None, kw1=5, k2='v', caller: seq",
+            ),
+            (
+                (1, 2, 3),
+                {"k2": "v"},
+                {"a1", "args", "kw1", "k2"},
+                "t entry: a1='...', a2=2, args='...', kw1='...', k2='...', "
+                "caller: seq",
+            ),
+            (
+                (),
+                {},
+                {"args", "k3"},
+                "t entry: a1=?, a2='{a2}', args='...', kw1=[], caller: seq",
+            ),
+        ],
+    )
+    def test_entry_formatter(
+        self,
+        args_arg: tuple[Any, ...],
+        kwargs_arg: dict[str, Any],
+        omit_parms_arg: set[str],
+        exp_msg: str,
+    ) -> None:
+        """Test EntryFormatter format.
+
+        Args:
+            args_arg: positional args of the call
+            kwargs_arg: keyword args of the call
+            omit_parms_arg: names of the parms to omit
+            exp_msg: expected entry message
+
+        """
+        entry_formatter = EntryFormatter(
+            target="t",
+            parms=list(inspect.signature(self.f1).parameters.values()),
+            omit_parms=omit_parms_arg,
+            omit_caller=False,
+        )
+        self.mutable_default.clear()
+
+        # the second call uses the formatter generated by the first
+        for _ in range(2):
+            assert entry_formatter.format(args_arg, kwargs_arg, "seq") == exp_msg
+
+        assert len(entry_formatter.formatters) == 1
+
+        # the shapes past max_formatters give the same message
+        assert entry_formatter._format_generic(args_arg, kwargs_arg, "seq") == exp_msg
+
+        # a default that is not immutable is formatted on each call
+        if "kw1" not in kwargs_arg and "kw1" not in omit_parms_arg:
+            self.mutable_default.append(42)
+            assert entry_formatter.format(args_arg, kwargs_arg, "seq") == (
+                exp_msg.replace("kw1=[]", "kw1=[42]")
+            )
+            self.mutable_default.clear()
+
+    ####################################################################
+    # test_entry_formatter_omit_caller
+    ####################################################################
+    def test_entry_formatter_omit_caller(self) -> None:
+        """Test EntryFormatter with omit_caller."""
+
+        def f2(*args: Any) -> None:
+            pass
+
+        entry_formatter = EntryFormatter(
+            target="t{}",
+            parms=list(inspect.signature(f2).parameters.values()),
+            omit_parms=set(),
+            omit_caller=True,
+        )
+        assert entry_formatter.format((), {}, "seq") == "t{} entry:"
+        assert entry_formatter.format((1,), {}, "seq") == "t{} entry: args=(1,)"
+
+    ####################################################################
+    # test_entry_formatter_unknown_omit_parm
+    ####################################################################
+    @pytest.mark.parametrize(
+        "omit_parms_arg, exp_error",
+        [({"a3"}, True), ({"kwargs"}, True), ({"a3", "a1"}, True), ({"a1"}, False)],
+    )
+    @pytest.mark.parametrize("var_kw_arg", [True, False])
+    def test_entry_formatter_unknown_omit_parm(
+        self, omit_parms_arg: set[str], exp_error: bool, var_kw_arg: bool
+    ) -> None:
+        """Test omit_parms is checked when decorated.
+
+        Args:
+            omit_parms_arg: names of the parms to omit
+            exp_error: if True, ValueError is expected
+            var_kw_arg: if True, the function has **kwargs
+
+        """
+        if var_kw_arg:
+
+            def f2(a1: int, **kwargs: Any) -> None:
+                pass
+
+            # with **kwargs, any name other than kwargs could be a
+            # keyword argument
+            exp_error = "kwargs" in omit_parms_arg
+
+        else:
+
+            def f2(a1: int) -> None:  # type: ignore
+                pass
+
+        # etrace checks the names from the code object when decorating
+        # and the EntryFormatter checks them from the signature
+        parms = list(inspect.signature(f2).parameters.values())
+        if exp_error:
+            with pytest.raises(ValueError, match="is not a known parameter"):
+                etrace(f2, omit_parms=omit_parms_arg)
+            with pytest.raises(ValueError, match="is not a known parameter"):
+                EntryFormatter(
+                    target="t", parms=parms, omit_parms=omit_parms_arg, omit_caller=True
+                )
+        else:
+            etrace(f2, omit_parms=omit_parms_arg)
+            EntryFormatter(
+                target="t", parms=parms, omit_parms=omit_parms_arg, omit_caller=True
+            )
+
+    ####################################################################
+    # test_entry_formatter_max_formatters
+    ####################################################################
+    @pytest.mark.parametrize("value_repr_arg", [None, ascii])
+    def test_entry_formatter_max_formatters(
+        self, value_repr_arg: Optional[Callable[[Any], str]]
+    ) -> None:
+        """Test the number of generated formatters is limited.
+
+        Args:
+            value_repr_arg: function to format the argument values
+
+        """
+        entry_formatter = EntryFormatter(
+            target="t",
+            parms=list(inspect.signature(self.f1).parameters.values()),
+            omit_parms={"k0"},
+            omit_caller=True,
+            value_repr=value_repr_arg,
+        )
+        value_repr = value_repr_arg or (lambda value: f"'{value}'")
+        num_shapes = EntryFormatter.max_formatters + 8
+        for idx in range(num_shapes):
+            kwargs = {f"k{idx}": "v", "a1": idx}
+            kw_text = "k0='...'" if idx == 0 else f"k{idx}={value_repr('v')}"
+            assert entry_formatter.format((), kwargs, "seq") == (
+                f"t entry: a1={idx}, a2={value_repr('{a2}')}, kw1=[], {kw_text}"
+            )
+
+        assert len(entry_formatter.formatters) == EntryFormatter.max_formatters
+
+    ####################################################################
+    # test_entry_formatter_timing
+    ####################################################################
+    def test_entry_formatter_timing(self) -> None:
+        """Test the generated formatter is faster than the generic."""
+        entry_formatter = EntryFormatter(
+            target="t",
+            parms=list(inspect.signature(self.f1).parameters.values()),
+            omit_parms={"kw1"},
+            omit_caller=False,
+        )
+        args = (1, "x", 3)
+        kwargs = {"k2": "v"}
+        entry_msg = entry_formatter.format(args, kwargs, "seq")
+        assert entry_formatter._format_generic(args, kwargs, "seq") == entry_msg
+
+        format_secs = min(
+            repeat(lambda: entry_formatter.format(args, kwargs, "seq"), number=2000)
+        )
+        generic_secs = min(
+            repeat(
+                lambda: entry_formatter._format_generic(args, kwargs, "seq"),
+                number=2000,
+            )
+        )
+        assert format_secs < generic_secs
+
+
+########################################################################
+# TestEntryTraceDisabledLogger class
+########################################################################
+class TestEntryTraceDisabledLogger:
+    """Test etrace when the logger is not enabled for DEBUG."""
+
+    ####################################################################
+    # test_etrace_disabled_logger
+    ####################################################################
+    def test_etrace_disabled_logger(
+        self, caplog: pytest.LogCaptureFixture, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test etrace calls straight through when DEBUG is disabled.
+
+        Args:
+            caplog: pytest fixture to capture log output
+            monkeypatch: pytest fixture to patch the call sequence
+
+        """
+        from scottbrian_utils import entry_trace
+
+        @etrace
+        def f1(a1: int) -> int:
+            return a1 * 2
+
+        def no_call_seq(*args: Any, **kwargs: Any) -> str:
+            raise ErrorTstEntryTrace("call sequence should not be built")
+
+        try:
+            logger.setLevel(logging.INFO)
+            with monkeypatch.context() as mp:
+                mp.setattr(entry_trace, "get_formatted_call_sequence", no_call_seq)
+                assert f1(21) == 42
+            assert not [
+                record for record in caplog.records if record.name == logger.name
+            ]
+
+            # the cached answer is cleared when the level changes
+            logger.setLevel(logging.DEBUG)
+            assert f1(21) == 42
+            log_msgs = [
+                record.getMessage()
+                for record in caplog.records
+                if record.name == logger.name
+            ]
+            assert len(log_msgs) == 2
+            assert "f1:" in log_msgs[0] and " entry: a1=21, caller: " in log_msgs[0]
+            assert log_msgs[1].endswith(" exit: return_value=42")
+        finally:
+            logger.setLevel(logging.NOTSET)
+
+
+########################################################################
+# TestEntryTraceCoroutinesGenerators class
+########################################################################
+class TestEntryTraceCoroutinesGenerators:
+    """Test etrace on coroutines and generators."""
+
+    ####################################################################
+    # get_log_msgs
+    ####################################################################
+    @staticmethod
+    def get_log_msgs(caplog: pytest.LogCaptureFixture) -> list[str]:
+        """Return the etrace messages of this module.
+
+        Args:
+            caplog: pytest fixture to capture log output
+
+        Returns:
+            The messages logged by etrace
+
+        """
+        return [
+            record.getMessage()
+            for record in caplog.records
+            if record.name == logger.name
+            and (" entry: " in record.getMessage() or " exit: " in record.getMessage())
+        ]
+
+    ####################################################################
+    # test_etrace_coroutine
+    ####################################################################
+    def test_etrace_coroutine(self, caplog: pytest.LogCaptureFixture) -> None:
+        """Test etrace on a coroutine function.
+
+        Args:
+            caplog: pytest fixture to capture log output
+
+        """
+
+        @etrace
+        async def f1(a1: int) -> int:
+            await asyncio.sleep(0)
+            logger.debug("f1 running")
+            return a1 * 2
+
+        async def main() -> int:
+            coro = f1(21)
+            assert not self.get_log_msgs(caplog)
+            logger.debug("about to await")
+            return await coro
+
+        assert inspect.iscoroutinefunction(f1)
+        assert asyncio.run(main()) == 42
+
+        log_msgs = [
+            record.getMessage()
+            for record in caplog.records
+            if record.name == logger.name
+        ]
+        assert log_msgs[0] == "about to await"
+        assert " entry: a1=21, caller: " in log_msgs[1]
+        assert " caller: test_entry_trace.py::main:" in log_msgs[1]
+        assert log_msgs[2] == "f1 running"
+        assert log_msgs[3].endswith(" exit: return_value=42")
+        assert len(log_msgs) == 4
+
+    ####################################################################
+    # test_etrace_generator
+    ####################################################################
+    def test_etrace_generator(self, caplog: pytest.LogCaptureFixture) -> None:
+        """Test etrace on a generator function.
+
+        Args:
+            caplog: pytest fixture to capture log output
+
+        """
+
+        @etrace
+        def f1(a1: int) -> Generator[int, Optional[int], int]:
+            total = 0
+            for idx in range(a1):
+                sent = yield idx
+                total += sent or 0
+            return total
+
+        gen = f1(3)
+        assert inspect.isgeneratorfunction(f1)
+        assert not self.get_log_msgs(caplog)
+
+        assert next(gen) == 0
+        log_msgs = self.get_log_msgs(caplog)
+        assert len(log_msgs) == 1
+        assert " entry: a1=3, caller: " in log_msgs[0]
+
+        assert gen.send(10) == 1
+        assert gen.send(20) == 2
+        assert len(self.get_log_msgs(caplog)) == 1
+
+        with pytest.raises(StopIteration) as exc:
+            gen.send(5)
+        assert exc.value.value == 35
+
+        log_msgs = self.get_log_msgs(caplog)
+        assert len(log_msgs) == 2
+        assert log_msgs[1].endswith(" exit: return_value=35")
+
+        # a generator that is closed early exits with GeneratorExit
+        gen = f1(3)
+        assert next(gen) == 0
+        gen.close()
+        log_msgs = self.get_log_msgs(caplog)
+        assert len(log_msgs) == 4
+        assert log_msgs[3].endswith(" exit: exception=GeneratorExit")
+
+    ####################################################################
+    # test_etrace_async_generator
+    ####################################################################
+    def test_etrace_async_generator(self, caplog: pytest.LogCaptureFixture) -> None:
+        """Test etrace on an asynchronous generator function.
+
+        Args:
+            caplog: pytest fixture to capture log output
+
+        """
+
+        @etrace
+        async def f1(a1: int) -> Any:
+            for idx in range(a1):
+                try:
+                    sent = yield idx
+                except ErrorTstEntryTrace:
+                    sent = 100
+                if sent:
+                    yield sent
+
+        async def main() -> list[int]:
+            items = []
+            async_gen = f1(2)
+            assert not self.get_log_msgs(caplog)
+            async for item in async_gen:
+                items.append(item)
+            assert len(self.get_log_msgs(caplog)) == 2
+
+            async_gen = f1(2)
+            items.append(await async_gen.asend(None))
+            items.append(await async_gen.asend(7))
+            items.append(await async_gen.asend(None))
+            items.append(await async_gen.athrow(ErrorTstEntryTrace("x")))
+            await async_gen.aclose()
+            assert len(self.get_log_msgs(caplog)) == 4
+            return items
+
+        assert inspect.isasyncgenfunction(f1)
+        assert asyncio.run(main()) == [0, 1, 0, 7, 1, 100]
+
+        log_msgs = self.get_log_msgs(caplog)
+        assert len(log_msgs) == 4
+        assert " entry: a1=2, caller: " in log_msgs[0]
+        assert log_msgs[1].endswith(" exit: return_value=None")
+        assert " entry: a1=2, caller: " in log_msgs[2]
+        assert log_msgs[3].endswith(" exit: exception=GeneratorExit")
+
+
+########################################################################
+# TestEntryTraceExit class
+########################################################################
+class TestEntryTraceExit:
+    """Test the elapsed time and exception in the etrace exit."""
+
+    ####################################################################
+    # get_exit_records
+    ####################################################################
+    @staticmethod
+    def get_exit_records(
+        caplog: pytest.LogCaptureFixture,
+    ) -> list[logging.LogRecord]:
+        """Return the etrace exit records of this module.
+
+        Args:
+            caplog: pytest fixture to capture log output
+
+        Returns:
+            The exit records logged by etrace
+
+        """
+        return [
+            record
+            for record in caplog.records
+            if record.name == logger.name and " exit: " in record.getMessage()
+        ]
+
+    ####################################################################
+    # test_etrace_time_call
+    ####################################################################
+    @pytest.mark.parametrize("time_call_arg", [True, False])
+    def test_etrace_time_call(
+        self, time_call_arg: bool, caplog: pytest.LogCaptureFixture
+    ) -> None:
+        """Test etrace with the elapsed time.
+
+        Args:
+            time_call_arg: if True, time the call
+            caplog: pytest fixture to capture log output
+
+        """
+
+        @etrace(time_call=time_call_arg)
+        def f1(a1: int) -> int:
+            time.sleep(0.01)
+            return a1 * 2
+
+        @etrace(time_call=time_call_arg, omit_return_value=True)
+        async def f2() -> None:
+            await asyncio.sleep(0.01)
+
+        assert f1(21) == 42
+        asyncio.run(f2())
+
+        exit_records = self.get_exit_records(caplog)
+        assert len(exit_records) == 2
+        for exit_record, exp_msg in zip(
+            exit_records, ("exit: return_value=42", "exit: return value omitted")
+        ):
+            assert exit_record.etrace_exc_type is None  # type: ignore
+            if time_call_arg:
+                match = re.search(
+                    f"{exp_msg}, elapsed_ns=([0-9]+)$", exit_record.getMessage()
+                )
+                assert match
+                elapsed_ns = exit_record.etrace_elapsed_ns  # type: ignore
+                assert int(match.group(1)) == elapsed_ns
+                assert elapsed_ns >= 10_000_000
+            else:
+                assert exit_record.getMessage().endswith(exp_msg)
+                assert exit_record.etrace_elapsed_ns is None  # type: ignore
+
+    ####################################################################
+    # test_etrace_exception
+    ####################################################################
+    @pytest.mark.parametrize("time_call_arg", [True, False])
+    def test_etrace_exception(
+        self, time_call_arg: bool, caplog: pytest.LogCaptureFixture
+    ) -> None:
+        """Test etrace when the decorated function raises an error.
+
+        Args:
+            time_call_arg: if True, time the call
+            caplog: pytest fixture to capture log output
+
+        """
+
+        @etrace(time_call=time_call_arg)
+        def f1(a1: int) -> int:
+            raise ErrorTstEntryTrace(f"bad {a1=}")
+
+        @etrace(time_call=time_call_arg)
+        async def f2() -> None:
+            raise ValueError("bad f2")
+
+        with pytest.raises(ErrorTstEntryTrace):
+            f1(42)
+        with pytest.raises(ValueError):
+            asyncio.run(f2())
+
+        exit_records = self.get_exit_records(caplog)
+        assert len(exit_records) == 2
+        for exit_record, exc_type in zip(
+            exit_records, ("ErrorTstEntryTrace", "ValueError")
+        ):
+            exp_msg = f" exit: exception={exc_type}"
+            assert exit_record.etrace_exc_type == exc_type  # type: ignore
+            if time_call_arg:
+                assert f"{exp_msg}, elapsed_ns=" in exit_record.getMessage()
+                assert exit_record.etrace_elapsed_ns >= 0  # type: ignore
+            else:
+                assert exit_record.getMessage().endswith(exp_msg)
+                assert exit_record.etrace_elapsed_ns is None  # type: ignore
+
+    ####################################################################
+    # test_etrace_exception_log_ver
+    ####################################################################
+    def test_etrace_exception_log_ver(self, caplog: pytest.LogCaptureFixture) -> None:
+        """Test etrace exception exit with a log verifier.
+
+        Args:
+            caplog: pytest fixture to capture log output
+
+        """
+        log_ver = LogVer(log_name=__name__)
+
+        @etrace(omit_caller=True, log_ver=log_ver)
+        def f1() -> None:
+            raise ErrorTstEntryTrace("f1 error")
+
+        with pytest.raises(ErrorTstEntryTrace):
+            f1()
+
+        exp_target = f"test_entry_trace.py::f1:{inspect.getsourcelines(f1)[1]}"
+        assert [record.getMessage() for record in caplog.records][-2:] == [
+            f"{exp_target} entry:",
+            f"{exp_target} exit: exception=ErrorTstEntryTrace",
+        ]
+
+        # the entry and exit patterns were added by etrace
+        match_results = log_ver.get_match_results(caplog=caplog)
+        log_ver.print_match_results(match_results, print_matched=True)
+        log_ver.verify_match_results(match_results)
+
+
+########################################################################
+# TestEntryTraceSampling class
+########################################################################
+class TestEntryTraceSampling:
+    """Test the etrace sampling policies."""
+
+    ####################################################################
+    # get_log_msgs
+    ####################################################################
+    @staticmethod
+    def get_log_msgs(caplog: pytest.LogCaptureFixture) -> list[str]:
+        """Return the etrace messages of this module.
+
+        Args:
+            caplog: pytest fixture to capture log output
+
+        Returns:
+            The messages logged by etrace
+
+        """
+        return [
+            record.getMessage()
+            for record in caplog.records
+            if record.name == logger.name
+            and (" entry: " in record.getMessage() or " exit: " in record.getMessage())
+        ]
+
+    ####################################################################
+    # test_etrace_sample_calls
+    ####################################################################
+    @pytest.mark.parametrize(
+        "sample_every_arg, first_calls_arg, exp_traced",
+        [
+            (1, None, list(range(10))),
+            (3, None, [0, 3, 6, 9]),
+            (1, 2, [0, 1]),
+            (2, 5, [0, 2, 4]),
+            (4, 0, []),
+        ],
+    )
+    def test_etrace_sample_calls(
+        self,
+        sample_every_arg: int,
+        first_calls_arg: Optional[int],
+        exp_traced: list[int],
+        caplog: pytest.LogCaptureFixture,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """Test etrace with sample_every and first_calls.
+
+        Args:
+            sample_every_arg: trace one of every sample_every calls
+            first_calls_arg: number of calls to trace
+            exp_traced: the calls expected to be traced
+            caplog: pytest fixture to capture log output
+            monkeypatch: pytest fixture to count the call sequences
+
+        """
+        from scottbrian_utils import entry_trace
+
+        num_call_seqs = 0
+
+        def count_call_seq(*args: Any, **kwargs: Any) -> str:
+            nonlocal num_call_seqs
+            num_call_seqs += 1
+            return "caller"
+
+        @etrace(sample_every=sample_every_arg, first_calls=first_calls_arg)
+        def f1(a1: int) -> int:
+            return a1
+
+        with monkeypatch.context() as mp:
+            mp.setattr(entry_trace, "get_formatted_call_sequence", count_call_seq)
+            assert [f1(idx) for idx in range(10)] == list(range(10))
+
+        # nothing is done for the calls that are not traced
+        assert num_call_seqs == len(exp_traced)
+
+        log_msgs = self.get_log_msgs(caplog)
+        assert len(log_msgs) == 2 * len(exp_traced)
+        for idx, exp_a1 in enumerate(exp_traced):
+            assert log_msgs[2 * idx].endswith(f" entry: a1={exp_a1}, caller: caller")
+            assert log_msgs[2 * idx + 1].endswith(f" exit: return_value={exp_a1}")
+
+    ####################################################################
+    # test_etrace_slow_calls
+    ####################################################################
+    def test_etrace_slow_calls(self, caplog: pytest.LogCaptureFixture) -> None:
+        """Test etrace with slow_secs.
+
+        Args:
+            caplog: pytest fixture to capture log output
+
+        """
+
+        @etrace(slow_secs=0.05)
+        def f1(secs: float, fail: bool = False) -> float:
+            time.sleep(secs)
+            if fail:
+                raise ErrorTstEntryTrace("f1 failed")
+            return secs
+
+        @etrace(slow_secs=0.05, omit_return_value=True)
+        async def f2(secs: float) -> None:
+            await asyncio.sleep(secs)
+
+        assert f1(0) == 0
+        with pytest.raises(ErrorTstEntryTrace):
+            f1(0, fail=True)
+        asyncio.run(f2(0))
+        assert not self.get_log_msgs(caplog)
+
+        call_line_num = inspect.currentframe().f_lineno + 1  # type: ignore
+        assert f1(0.1) == 0.1
+        with pytest.raises(ErrorTstEntryTrace):
+            f1(0.1, fail=True)
+        asyncio.run(f2(0.1))
+
+        log_msgs = self.get_log_msgs(caplog)
+        assert len(log_msgs) == 6
+        assert log_msgs[0].endswith(
+            " entry: secs=0.1, fail=False, caller: test_entry_trace.py::"
+            "TestEntryTraceSampling.test_etrace_slow_calls:"
+            f"{call_line_num}"
+        )
+        assert re.search(" exit: return_value=0.1, elapsed_ns=[0-9]+$", log_msgs[1])
+        assert " entry: secs=0.1, fail=True, caller: " in log_msgs[2]
+        assert re.search(
+            " exit: exception=ErrorTstEntryTrace, elapsed_ns=[0-9]+$", log_msgs[3]
+        )
+        assert " entry: secs=0.1, caller: " in log_msgs[4]
+        assert re.search(" exit: return value omitted, elapsed_ns=[0-9]+$", log_msgs[5])
+
+    ####################################################################
+    # test_etrace_sampling_errors
+    ####################################################################
+    @pytest.mark.parametrize(
+        "sampling_kwargs",
+        [{"sample_every": 0}, {"first_calls": -1}, {"slow_secs": -0.5}],
+    )
+    def test_etrace_sampling_errors(self, sampling_kwargs: dict[str, Any]) -> None:
+        """Test etrace with bad sampling arguments.
+
+        Args:
+            sampling_kwargs: the bad sampling argument
+
+        """
+
+        def f1() -> None:
+            pass
+
+        with pytest.raises(ValueError):
+            etrace(f1, **sampling_kwargs)
+
+    ####################################################################
+    # test_etrace_slow_call_args
+    ####################################################################
+    def test_etrace_slow_call_args(self, caplog: pytest.LogCaptureFixture) -> None:
+        """Test a slow call traces the argument values as passed.
+
+        Args:
+            caplog: pytest fixture to capture log output
+
+        """
+
+        @etrace(slow_secs=0.05, omit_caller=True, omit_return_value=True)
+        def f1(items: list[int]) -> None:
+            items.append(42)
+            time.sleep(0.1)
+
+        items = [1]
+        f1(items)
+        assert items == [1, 42]
+
+        log_msgs = self.get_log_msgs(caplog)
+        assert len(log_msgs) == 2
+        assert log_msgs[0].endswith(" entry: items=[1]")
+
+
+########################################################################
+# Color class
+########################################################################
+class Color(Enum):
+    """Enum with a short repr for the BoundedRepr tests."""
+
+    RED = 1
+
+
+########################################################################
+# TestBoundedRepr class
+########################################################################
+class TestBoundedRepr:
+    """Test BoundedRepr and etrace with bounded_repr."""
+
+    ####################################################################
+    # test_bounded_repr
+    ####################################################################
+    @pytest.mark.parametrize(
+        "value, exp_repr",
+        [
+            (42, "42"),
+            ("abc", "'abc'"),
+            (list(range(1000)), "[0, 1, 2, ...]"),
+            ((1, (2, (3, (4,)))), "(1, (2, (...)))"),
+            ({"a": 1, "b": 2, "c": 3, "d": 4}, "{'a': 1, 'b': 2, 'c': 3, ...}"),
+            ("x" * 1000, "'xxxxxxxxxxxx...xxxxxxxxxxxxx'"),
+            (b"y" * 100_000, "b'yyyyyyyyyyy...yyyyyyyyyyyyy'"),
+            (bytearray(b"ab"), "bytearray(b'ab')"),
+            (["z" * 20, "z" * 20], "['zzzzzzzzzzz...zzzzzzzzzzzz']"),
+            ([1.5, None, True, range(3)], "[1.5, None, True, ...]"),
+            (Color.RED, "<Color.RED: 1>"),
+        ],
+    )
+    def test_bounded_repr(self, value: Any, exp_repr: str) -> None:
+        """Test BoundedRepr limits.
+
+        Args:
+            value: the value to get the repr of
+            exp_repr: the expected repr
+
+        """
+        bounded_repr = BoundedRepr(max_length=30, max_items=3, max_depth=2)
+        assert bounded_repr.repr(value) == exp_repr
+        assert len(bounded_repr.repr(value)) <= 30
+        assert repr(bounded_repr) == (
+            "BoundedRepr(max_length=30, max_items=3, max_depth=2)"
+        )
+
+    ####################################################################
+    # test_bounded_repr_overrides
+    ####################################################################
+    def test_bounded_repr_overrides(self) -> None:
+        """Test BoundedRepr with overrides."""
+
+        class Big:
+            num_reprs = 0
+
+            def __repr__(self) -> str:
+                Big.num_reprs += 1
+                return "Big" * 1000
+
+        class BigSub(Big):
+            pass
+
+        bounded_repr = BoundedRepr(
+            max_length=40, overrides={Big: lambda big: f"{type(big).__name__}()"}
+        )
+        assert bounded_repr.repr(Big()) == "Big()"
+        assert bounded_repr.repr([BigSub(), 1]) == "[BigSub(), 1]"
+        assert Big.num_reprs == 0
+
+        # the repr of a type that is not known is not called
+        big = Big()
+        assert BoundedRepr().repr(big) == object.__repr__(big)
+        limited_repr = BoundedRepr(max_length=20).repr(big)
+        assert len(limited_repr) == 20
+        assert limited_repr.startswith("<tests.") and limited_repr.endswith(">")
+        assert Big.num_reprs == 0
+
+        # unless use_repr is True, and then only the items that are
+        # shown are converted
+        bounded_repr = BoundedRepr(max_items=2, use_repr=True)
+        assert len(bounded_repr.repr([Big()] * 100)) == 200
+        assert Big.num_reprs == 2
+
+    ####################################################################
+    # test_etrace_bounded_repr
+    ####################################################################
+    @pytest.mark.parametrize("bounded_repr_arg", [True, BoundedRepr(max_items=2)])
+    def test_etrace_bounded_repr(
+        self,
+        bounded_repr_arg: Union[bool, BoundedRepr],
+        caplog: pytest.LogCaptureFixture,
+    ) -> None:
+        """Test etrace with bounded_repr.
+
+        Args:
+            bounded_repr_arg: the bounded_repr to use
+            caplog: pytest fixture to capture log output
+
+        """
+
+        @etrace(bounded_repr=bounded_repr_arg, omit_caller=True)
+        def f1(a1: list[int], *args: Any, kw1: str = "x" * 300) -> list[int]:
+            return a1 * 2
+
+        f1(list(range(100)), "a", 2, 3)
+
+        if bounded_repr_arg is True:
+            exp_a1 = "[0, 1, 2, 3, 4, 5, 6, 7, 8, 9, ...]"
+            exp_args = "('a', 2, 3)"
+        else:
+            exp_a1 = "[0, 1, ...]"
+            exp_args = "('a', 2, ...)"
+        exp_kw1 = f"'{'x' * 97}...{'x' * 98}'"
+
+        log_msgs = [
+            record.getMessage()
+            for record in caplog.records
+            if record.name == logger.name
+        ]
+        assert log_msgs[0].endswith(
+            f" entry: a1={exp_a1}, args={exp_args}, kw1={exp_kw1}"
+        )
+        assert log_msgs[1].endswith(f" exit: return_value={exp_a1}")
+
+
+########################################################################
+# TestEtraceAll class
+########################################################################
+class TestEtraceAll:
+    """Test etrace_all."""
+
+    ####################################################################
+    # get_log_msgs
+    ####################################################################
+    @staticmethod
+    def get_log_msgs(caplog: pytest.LogCaptureFixture, log_name: str) -> list[str]:
+        """Return the etrace messages of a logger.
+
+        Args:
+            caplog: pytest fixture to capture log output
+            log_name: name of the logger
+
+        Returns:
+            The messages logged by etrace
+
+        """
+        return [
+            record.getMessage()
+            for record in caplog.records
+            if record.name == log_name
+            and (" entry:" in record.getMessage() or " exit: " in record.getMessage())
+        ]
+
+    ####################################################################
+    # test_etrace_all_class
+    ####################################################################
+    @pytest.mark.parametrize(
+        "include_arg, exclude_arg, exp_names",
+        [
+            ("*", None, ["__init__", "c1", "m1", "s1"]),
+            ("m*", None, ["m1"]),
+            (["m1", "s*", "c*"], "c1", ["m1", "s1"]),
+            ("*", ["m*", "__*"], ["c1", "s1"]),
+        ],
+    )
+    def test_etrace_all_class(
+        self,
+        include_arg: Union[str, list[str]],
+        exclude_arg: Union[str, list[str], None],
+        exp_names: list[str],
+        caplog: pytest.LogCaptureFixture,
+    ) -> None:
+        """Test etrace_all on a class.
+
+        Args:
+            include_arg: names to include
+            exclude_arg: names to exclude
+            exp_names: the expected traced names
+            caplog: pytest fixture to capture log output
+
+        """
+
+        class Cls1:
+            def __init__(self, v1: int) -> None:
+                self.v1 = v1
+
+            def __repr__(self) -> str:
+                return f"Cls1({self.v1})"
+
+            def m1(self, a1: int) -> int:
+                return self.v1 + a1
+
+            @etrace(omit_caller=True)
+            def m2(self) -> int:
+                return self.v1
+
+            @staticmethod
+            def s1(a1: int) -> int:
+                return a1 * 2
+
+            @classmethod
+            def c1(cls, a1: int) -> str:
+                return f"{cls.__name__} {a1}"
+
+        class Cls2(Cls1):
+            pass
+
+        assert etrace_all(Cls1, include=include_arg, exclude=exclude_arg) == exp_names
+
+        call_line_num = inspect.currentframe().f_lineno + 1  # type: ignore
+        cls1 = Cls1(10)
+        assert cls1.m1(5) == 15
+        assert Cls1.m1(cls1, 6) == 16
+        assert cls1.m2() == 10
+        assert cls1.s1(3) == 6
+        assert Cls1.s1(4) == 8
+        assert cls1.c1(1) == "Cls1 1"
+        assert Cls2.c1(2) == "Cls2 2"
+        assert repr(cls1) == "Cls1(10)"
+
+        exp_msgs = []
+        for name, offset, exp_entry, exp_exit in (
+            ("Cls1.__init__", 0, "v1=10", "None"),
+            ("Cls1.m1", 1, "a1=5", "15"),
+            ("Cls1.m1", 2, "a1=6", "16"),
+            ("Cls1.m2", 3, "", "10"),
+            ("Cls1.s1", 4, "a1=3", "6"),
+            ("Cls1.s1", 5, "a1=4", "8"),
+            ("Cls1.c1", 6, "a1=1", "'Cls1 1'"),
+            ("Cls1.c1", 7, "a1=2", "'Cls2 2'"),
+        ):
+            # m2 was already traced by its etrace decorator
+            if name.split(".")[1] in exp_names or name == "Cls1.m2":
+                if name == "Cls1.m2":
+                    exp_msgs.append(f"{name}:[0-9]+ entry:")
+                else:
+                    exp_msgs.append(
+                        f"{name}:[0-9]+ entry: {exp_entry}, caller: "
+                        "test_entry_trace.py::TestEtraceAll.test_etrace_all_class:"
+                        f"{call_line_num + offset}"
+                    )
+                exp_msgs.append(f"{name}:[0-9]+ exit: return_value={exp_exit}")
+
+        log_msgs = self.get_log_msgs(caplog, __name__)
+        assert len(log_msgs) == len(exp_msgs)
+        for log_msg, exp_msg in zip(log_msgs, exp_msgs):
+            assert re.fullmatch(f"test_entry_trace.py::{exp_msg}", log_msg)
+
+        # the traced methods are not traced again
+        assert etrace_all(Cls1) == [
+            name for name in ["__init__", "c1", "m1", "s1"] if name not in exp_names
+        ]
+
+    ####################################################################
+    # test_etrace_all_module
+    ####################################################################
+    def test_etrace_all_module(
+        self,
+        caplog: pytest.LogCaptureFixture,
+        monkeypatch: pytest.MonkeyPatch,
+        tmp_path: Path,
+    ) -> None:
+        """Test etrace_all on a module.
+
+        Args:
+            caplog: pytest fixture to capture log output
+            monkeypatch: pytest fixture to set the module search path
+            tmp_path: pytest fixture for a temporary directory
+
+        """
+        (tmp_path / "etrace_all_mod.py").write_text(
+            "from os.path import join\n"
+            "\n"
+            "\n"
+            "def f1(a1):\n"
+            "    return f2(a1) + 1\n"
+            "\n"
+            "\n"
+            "def f2(a1):\n"
+            "    return a1 * 2\n"
+            "\n"
+            "\n"
+            "def _f3():\n"
+            "    return 3\n"
+            "\n"
+            "\n"
+            "class Cls1:\n"
+            "    def m1(self):\n"
+            "        return 1\n"
+        )
+        monkeypatch.syspath_prepend(tmp_path)
+        import etrace_all_mod  # type: ignore
+
+        assert etrace_all(etrace_all_mod, exclude="_*", omit_caller=True) == [
+            "f1",
+            "f2",
+        ]
+        assert etrace_all_mod.join("a", "b") == os.path.join("a", "b")
+        assert etrace_all_mod._f3() == 3
+        assert etrace_all_mod.Cls1().m1() == 1
+        assert etrace_all_mod.f1(5) == 11
+
+        assert self.get_log_msgs(caplog, "etrace_all_mod") == [
+            "etrace_all_mod.py::f1:4 entry: a1=5",
+            "etrace_all_mod.py::f2:8 entry: a1=5",
+            "etrace_all_mod.py::f2:8 exit: return_value=10",
+            "etrace_all_mod.py::f1:4 exit: return_value=11",
+        ]
+        del sys.modules["etrace_all_mod"]
+
+
+########################################################################
+# TestEntryTraceImportTime class
+########################################################################
+class TestEntryTraceImportTime:
+    """Test the cost of decorating functions with etrace."""
+
+    ####################################################################
+    # test_etrace_import_time
+    ####################################################################
+    def test_etrace_import_time(
+        self,
+        caplog: pytest.LogCaptureFixture,
+        monkeypatch: pytest.MonkeyPatch,
+        tmp_path: Path,
+    ) -> None:
+        """Test importing a module with many traced functions.
+
+        Args:
+            caplog: pytest fixture to capture log output
+            monkeypatch: pytest fixture to patch inspect
+            tmp_path: pytest fixture for a temporary directory
+
+        """
+        num_funcs = 300
+        mod_lines = ["from scottbrian_utils.entry_trace import etrace", ""]
+        # the same functions with a plain decorator to compare with
+        plain_lines = [
+            "import functools",
+            "",
+            "def plain(func):",
+            "    @functools.wraps(func)",
+            "    def wrapper(*args, **kwargs):",
+            "        return func(*args, **kwargs)",
+            "    return wrapper",
+            "",
+        ]
+        for idx in range(num_funcs):
+            func_lines = [
+                f"def f{idx}(a1, a2=None, *args, **kwargs):",
+                f"    return a1 + {idx}",
+                "",
+            ]
+            mod_lines += ["", "@etrace(omit_parms='a2', omit_caller=True)"]
+            mod_lines += func_lines
+            plain_lines += ["", "@plain"] + func_lines
+        (tmp_path / "etrace_import_mod.py").write_text("\n".join(mod_lines))
+        (tmp_path / "plain_import_mod.py").write_text("\n".join(plain_lines))
+        monkeypatch.syspath_prepend(tmp_path)
+
+        start_time = time.perf_counter()
+        import plain_import_mod  # type: ignore
+
+        plain_secs = time.perf_counter() - start_time
+        assert plain_import_mod.f7(1) == 8
+
+        def no_inspect(*args: Any, **kwargs: Any) -> None:
+            raise ErrorTstEntryTrace("inspect should not be called")
+
+        with monkeypatch.context() as mp:
+            for name in ("getsourcefile", "getsourcelines", "signature"):
+                mp.setattr(inspect, name, no_inspect)
+            start_time = time.perf_counter()
+            import etrace_import_mod  # type: ignore
+
+            import_secs = time.perf_counter() - start_time
+
+        # decorating with etrace defers the work to the first call, so
+        # the import costs a small multiple of the plain import, which
+        # also compiles the module
+        assert import_secs < 10 * plain_secs
+
+        # the signature is examined for the first traced call
+        assert etrace_import_mod.f7(1, kw1=2) == 8
+        log_msgs = [
+            record.getMessage()
+            for record in caplog.records
+            if record.name == "etrace_import_mod"
+        ]
+        assert log_msgs == [
+            "etrace_import_mod.py::f7:39 entry: a1=1, a2='...', kw1=2",
+            "etrace_import_mod.py::f7:39 exit: return_value=8",
+        ]
+        del sys.modules["etrace_import_mod"]
+        del sys.modules["plain_import_mod"]
+
+
+########################################################################
+# TestEntryTraceCorrelate class
+########################################################################
+class TestEntryTraceCorrelate:
+    """Test etrace correlate and etrace_timelines."""
+
+    ####################################################################
+    # test_etrace_correlate
+    ####################################################################
+    def test_etrace_correlate(self, caplog: pytest.LogCaptureFixture) -> None:
+        """Test the correlation attributes and the thread timelines.
+
+        Args:
+            caplog: pytest fixture to capture log output
+
+        """
+
+        @etrace(correlate=True, omit_caller=True)
+        def f2(a1: int) -> int:
+            if a1 < 0:
+                raise ValueError("negative")
+            return a1
+
+        @etrace(omit_caller=True)
+        def f3() -> None:
+            pass
+
+        @etrace(correlate=True, omit_caller=True, time_call=True)
+        def f1(a1: int) -> None:
+            f2(a1)
+            f3()
+            try:
+                f2(-a1)
+            except ValueError:
+                pass
+
+        num_threads = 3
+        barrier = threading.Barrier(num_threads)
+
+        def run_f1(a1: int) -> None:
+            # the threads wait for each other so their idents differ
+            barrier.wait()
+            f1(a1)
+
+        caplog.set_level(logging.DEBUG)
+        threads = [
+            threading.Thread(target=run_f1, args=(idx + 1,), name=f"Corr{idx + 1}")
+            for idx in range(num_threads)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        records = [
+            record
+            for record in caplog.records
+            if record.name == __name__ and "etrace_call_id" in record.__dict__
+        ]
+        assert len(records) == 6 * num_threads
+        for record in records:
+            assert record.__dict__["etrace_thread_id"] == record.thread
+
+        timelines = etrace_timelines(caplog.records)
+        assert set(timelines) == {thread.ident for thread in threads}
+        for thread in threads:
+            assert thread.ident is not None
+            timeline = timelines[thread.ident]
+            assert [call.entry_msg.split("::")[1] for call in timeline] == [
+                f"f1:{f1.__code__.co_firstlineno} entry: a1={thread.name[-1]}",
+                f"f2:{f2.__code__.co_firstlineno} entry: a1={thread.name[-1]}",
+                f"f2:{f2.__code__.co_firstlineno} entry: a1=-{thread.name[-1]}",
+            ]
+            f1_call, f2_call, f2_exc_call = timeline
+            assert (f1_call.depth, f1_call.parent_id) == (1, None)
+            assert (f2_call.depth, f2_call.parent_id) == (2, f1_call.call_id)
+            assert (f2_exc_call.depth, f2_exc_call.parent_id) == (2, f1_call.call_id)
+            assert f1_call.exit_msg is not None
+            assert f1_call.exit_msg.startswith(
+                f"{f1_call.entry_msg.split(' ')[0]} exit: return_value=None"
+            )
+            assert f1_call.elapsed_ns is not None
+            assert f1_call.elapsed_ns > 0
+            assert f2_call.exit_msg is not None
+            assert f2_call.exit_msg.endswith(f"exit: return_value={thread.name[-1]}")
+            assert (f2_call.elapsed_ns, f2_call.exc_type) == (None, None)
+            assert f2_exc_call.exc_type == "ValueError"
+            assert f1_call.exit_time is not None
+            assert f1_call.entry_time <= f2_call.entry_time <= f1_call.exit_time
+
+        # records that are missing their entry or exit, passed as a
+        # generator
+        first_record = [rec for rec in records if rec.thread == threads[0].ident][0]
+        last_record = [rec for rec in records if rec.thread == threads[1].ident][-1]
+        calls = {
+            call.call_id: call
+            for timeline in etrace_timelines(
+                rec for rec in records if rec not in (first_record, last_record)
+            ).values()
+            for call in timeline
+        }
+        assert len(calls) == 3 * num_threads - 1
+        assert first_record.__dict__["etrace_call_id"] not in calls
+        assert calls[last_record.__dict__["etrace_call_id"]].exit_msg is None
+
+
+########################################################################
+# TestEntryTraceGovernor class
+########################################################################
+class TestEntryTraceGovernor:
+    """Test etrace with an OverheadGovernor."""
+
+    ####################################################################
+    # get_counts
+    ####################################################################
+    @staticmethod
+    def get_counts(caplog: pytest.LogCaptureFixture) -> tuple[int, int]:
+        """Return the number of traced calls and throttle notices.
+
+        Args:
+            caplog: pytest fixture to capture log output
+
+        Returns:
+            The number of entry messages and the number of notices
+
+        """
+        records = [record for record in caplog.records if record.name == __name__]
+        num_entries = sum(" entry: " in record.getMessage() for record in records)
+        num_notices = sum(
+            "etrace overhead is" in record.getMessage()
+            and record.levelno == logging.INFO
+            for record in records
+        )
+        return num_entries, num_notices
+
+    ####################################################################
+    # test_governor_repr
+    ####################################################################
+    def test_governor_repr(self) -> None:
+        """Test OverheadGovernor repr and errors."""
+        assert repr(OverheadGovernor()) == (
+            "OverheadGovernor(max_overhead=0.1, max_call_rate=None, "
+            "sample_every=100, window_secs=1.0)"
+        )
+        assert repr(OverheadGovernor(None, 50.0, 4, 0.5)) == (
+            "OverheadGovernor(max_overhead=None, max_call_rate=50.0, "
+            "sample_every=4, window_secs=0.5)"
+        )
+
+        with pytest.raises(ValueError, match="sample_every of 0 is less than 1"):
+            OverheadGovernor(sample_every=0)
+        with pytest.raises(ValueError, match="window_secs of 0 is not positive"):
+            OverheadGovernor(window_secs=0)
+
+    ####################################################################
+    # test_governor_call_rate
+    ####################################################################
+    def test_governor_call_rate(self, caplog: pytest.LogCaptureFixture) -> None:
+        """Test throttling on the call rate and restoring the trace.
+
+        Args:
+            caplog: pytest fixture to capture log output
+
+        """
+        governor = OverheadGovernor(
+            max_overhead=None, max_call_rate=50, sample_every=5, window_secs=0.05
+        )
+
+        @etrace(governor=governor, omit_caller=True)
+        def f1(a1: int) -> int:
+            return a1
+
+        @etrace(governor=governor)
+        def gen1() -> Generator[int, None, None]:
+            yield 1
+
+        caplog.set_level(logging.DEBUG)
+
+        def throttle_f1() -> None:
+            for idx in range(1_000_000):
+                assert f1(idx) == idx
+                if governor.get_throttled():
+                    return
+            raise AssertionError("f1 was not throttled")
+
+        throttle_f1()
+        f1_target = governor.get_throttled()[0]
+        assert f1_target.split("::")[1].startswith("f1:")
+        assert self.get_counts(caplog)[1] == 1
+
+        # only the sampled calls are traced
+        num_entries = self.get_counts(caplog)[0]
+        for idx in range(20):
+            f1(idx)
+        assert self.get_counts(caplog)[0] - num_entries <= 5
+
+        # the first window after the pause still has the fast calls,
+        # and the window after that one has only one call
+        for _ in range(2):
+            time.sleep(0.06)
+            f1(1)
+        assert governor.get_throttled() == []
+        num_entries = self.get_counts(caplog)[0]
+        for idx in range(10):
+            f1(idx)
+        assert self.get_counts(caplog)[0] - num_entries == 10
+
+        # the notice is logged only once
+        throttle_f1()
+        assert self.get_counts(caplog)[1] == 1
+
+        # generators are not governed
+        assert list(gen1()) == [1]
+        assert governor.get_throttled() == [f1_target]
+
+    ####################################################################
+    # test_governor_overhead
+    ####################################################################
+    def test_governor_overhead(self, caplog: pytest.LogCaptureFixture) -> None:
+        """Test throttling on the overhead and restoring the trace.
+
+        Args:
+            caplog: pytest fixture to capture log output
+
+        """
+        governor = OverheadGovernor(max_overhead=0.5, sample_every=2, window_secs=0.05)
+
+        @etrace(governor=governor)
+        def f1(secs: float) -> None:
+            if secs:
+                time.sleep(secs)
+
+        caplog.set_level(logging.DEBUG)
+        # the trace of a function that does nothing costs much more than
+        # the function itself
+        for _ in range(1_000_000):
+            f1(0)
+            if governor.get_throttled():
+                break
+        assert len(governor.get_throttled()) == 1
+        assert self.get_counts(caplog)[1] == 1
+        notice = [
+            record.getMessage()
+            for record in caplog.records
+            if record.levelno == logging.INFO and record.name == __name__
+        ][0]
+        assert notice.endswith(
+            "calls per second, so only one of every 2 calls is traced until the "
+            "load drops"
+        )
+
+        # the trace of a slow call costs little in comparison
+        for _ in range(5):
+            f1(0.02)
+        assert governor.get_throttled() == []
+
+    ####################################################################
+    # test_governor_load_drops
+    ####################################################################
+    def test_governor_load_drops(self, caplog: pytest.LogCaptureFixture) -> None:
+        """Test the throttled overhead drops and the trace is restored.
+
+        Args:
+            caplog: pytest fixture to capture log output
+
+        """
+        governor = OverheadGovernor(max_overhead=0.5, sample_every=10, window_secs=1.0)
+        target = governor.register("f1", logger)
+        caplog.set_level(logging.DEBUG)
+
+        def run_window(num_calls: int) -> int:
+            # each traced call spends as much time in etrace as in the
+            # function, which is twice the limit
+            start_ns = target.window_start_ns
+            num_traced = 0
+            for idx in range(num_calls):
+                if not target.skip_call(start_ns + idx):
+                    num_traced += 1
+                    target.add_traced_call(run_ns=1000, overhead_ns=1000)
+            # the next call ends the window
+            target.window_start_ns = start_ns - governor.window_ns
+            return num_traced
+
+        # all the calls are traced in the first window
+        assert run_window(100) == 100
+        target.skip_call(target.window_start_ns + governor.window_ns)
+        assert governor.get_throttled() == ["f1"]
+        assert self.get_counts(caplog)[1] == 1
+
+        # only one in ten calls add to the overhead of the throttled
+        # window, so the overhead drops to a tenth of the function time
+        # and the full trace is restored
+        assert run_window(100) == 10
+        assert not target.skip_call(target.window_start_ns + governor.window_ns)
+        assert governor.get_throttled() == []
+
+
+########################################################################
+# TestEtraceMonitor class
+########################################################################
+class TestEtraceMonitor:
+    """Test EtraceMonitor."""
+
+    ####################################################################
+    # get_log_msgs
+    ####################################################################
+    @staticmethod
+    def get_log_msgs(caplog: pytest.LogCaptureFixture) -> list[str]:
+        """Return the etrace messages.
+
+        Args:
+            caplog: pytest fixture to capture log output
+
+        Returns:
+            The messages logged by etrace or EtraceMonitor
+
+        """
+        return [
+            record.getMessage()
+            for record in caplog.records
+            if record.name == __name__
+            and (" entry:" in record.getMessage() or " exit: " in record.getMessage())
+        ]
+
+    ####################################################################
+    # test_etrace_monitor_same_as_etrace
+    ####################################################################
+    @pytest.mark.parametrize("omit_parms_arg", [None, ["kw1"], "args"])
+    @pytest.mark.parametrize("bounded_repr_arg", [False, True])
+    def test_etrace_monitor_same_as_etrace(
+        self,
+        omit_parms_arg: Optional[Union[str, list[str]]],
+        bounded_repr_arg: bool,
+        caplog: pytest.LogCaptureFixture,
+    ) -> None:
+        """Test the monitor trace is the same as the etrace trace.
+
+        Args:
+            omit_parms_arg: the omit_parms to specify
+            bounded_repr_arg: the bounded_repr to specify
+            caplog: pytest fixture to capture log output
+
+        """
+
+        def f1(a1: int, *args: Any, kw1: str = "42", **kwargs: Any) -> str:
+            return f"{a1=}, {args=}, {kw1=}, {kwargs=}"
+
+        options: dict[str, Any] = {
+            "omit_parms": omit_parms_arg,
+            "bounded_repr": bounded_repr_arg,
+            "omit_caller": True,
+        }
+        traced_f1 = etrace(f1, **options)
+
+        caplog.set_level(logging.DEBUG)
+        traced_f1(1, 2, kw1="forty two", kw2=3)
+        traced_f1(4)
+        exp_msgs = self.get_log_msgs(caplog)
+        assert len(exp_msgs) == 4
+        caplog.clear()
+
+        monitor = EtraceMonitor()
+        f1(5)  # not enabled
+        monitor.enable(f1, **options)
+        assert monitor.is_enabled(f1)
+        f1(1, 2, kw1="forty two", kw2=3)
+        f1(4)
+        monitor.disable(f1)
+        assert not monitor.is_enabled(f1)
+        f1(6)  # disabled
+        monitor.disable(f1)  # already disabled is ignored
+
+        assert self.get_log_msgs(caplog) == exp_msgs
+        assert sys.monitoring.get_tool(monitor.tool_id) is None
+
+    ####################################################################
+    # test_etrace_monitor_methods
+    ####################################################################
+    def test_etrace_monitor_methods(self, caplog: pytest.LogCaptureFixture) -> None:
+        """Test the monitor with methods, exceptions, and generators.
+
+        Args:
+            caplog: pytest fixture to capture log output
+
+        """
+
+        class Cls1:
+            def m1(self, a1: int) -> int:
+                return a1 + 1
+
+            @classmethod
+            def c1(cls, a1: int) -> int:
+                raise ValueError(f"{a1}")
+
+            @staticmethod
+            def s1(a1: int) -> Generator[int, None, None]:
+                yield a1
+                yield a1 + 1
+
+        monitor = EtraceMonitor(tool_id=3)
+        assert repr(monitor) == "EtraceMonitor(tool_id=3)"
+        cls1 = Cls1()
+        monitor.enable(cls1.m1)
+        monitor.enable(Cls1.c1, omit_caller=True)
+        monitor.enable(vars(Cls1)["s1"], omit_return_value=True, omit_caller=True)
+
+        caplog.set_level(logging.DEBUG)
+        call_line_num = inspect.currentframe().f_lineno + 1  # type: ignore
+        assert cls1.m1(1) == 2
+        with pytest.raises(ValueError):
+            Cls1.c1(3)
+        assert list(Cls1.s1(5)) == [5, 6]
+
+        # the tool id is in use until all functions are disabled
+        with pytest.raises(ValueError):
+            EtraceMonitor(tool_id=3).enable(cls1.m1)
+        monitor.disable_all()
+        assert not monitor.is_enabled(Cls1.c1)
+        assert sys.monitoring.get_tool(3) is None
+        cls1.m1(2)
+
+        m1_target = f"test_entry_trace.py::Cls1.m1:{Cls1.m1.__code__.co_firstlineno}"
+        c1_target = f"test_entry_trace.py::Cls1.c1:{Cls1.c1.__code__.co_firstlineno}"
+        s1_target = f"test_entry_trace.py::Cls1.s1:{Cls1.s1.__code__.co_firstlineno}"
+        assert self.get_log_msgs(caplog) == [
+            f"{m1_target} entry: a1=1, caller: test_entry_trace.py::"
+            f"TestEtraceMonitor.test_etrace_monitor_methods:{call_line_num}",
+            f"{m1_target} exit: return_value=2",
+            f"{c1_target} entry: a1=3",
+            f"{c1_target} exit: exception=ValueError",
+            f"{s1_target} entry: a1=5",
+            f"{s1_target} exit: return value omitted",
+        ]
+
+    ####################################################################
+    # test_etrace_monitor_unwind_events
+    ####################################################################
+    def test_etrace_monitor_unwind_events(self) -> None:
+        """Test PY_UNWIND is on only while a traced function runs."""
+        monitor = EtraceMonitor()
+        py_unwind = sys.monitoring.events.PY_UNWIND
+
+        def f1() -> int:
+            return sys.monitoring.get_events(monitor.tool_id)
+
+        def f2() -> None:
+            raise ValueError("f2")
+
+        def f3() -> int:
+            monitor.disable(f3)
+            return sys.monitoring.get_events(monitor.tool_id)
+
+        monitor.enable(f1)
+        monitor.enable(f2)
+        assert sys.monitoring.get_events(monitor.tool_id) == 0
+        assert f1() == py_unwind
+        assert sys.monitoring.get_events(monitor.tool_id) == 0
+        with pytest.raises(ValueError):
+            f2()
+        assert sys.monitoring.get_events(monitor.tool_id) == 0
+
+        # disabling a running function stops counting its frame
+        monitor.enable(f3)
+        assert f3() == 0
+        assert not monitor.is_enabled(f3)
+
+        # the targets are removed and the tool id is freed with the
+        # last target
+        monitor.disable(f1)
+        assert list(monitor._targets) == [f2.__code__]
+        monitor.disable(f2)
+        assert monitor._targets == {}
+        assert monitor._active == {}
+        assert sys.monitoring.get_tool(monitor.tool_id) is None
@@ -0,0 +1,403 @@
+"""test_log_queue.py module."""
+
+########################################################################
+# Standard Library
+########################################################################
+import logging
+import os
+import threading
+from typing import Optional
+
+########################################################################
+# Third Party
+########################################################################
+import pytest
+
+########################################################################
+# Local
+########################################################################
+from scottbrian_utils import log_queue as log_queue_mod
+from scottbrian_utils.diag_msg import diag_msg, set_diag_msg_log_queue
+from scottbrian_utils.entry_trace import etrace
+from scottbrian_utils.log_queue import LogQueue
+from scottbrian_utils.msgs import GetMsgTimedOut, Msgs
+from scottbrian_utils.testlib_verifier import verify_lib
+
+########################################################################
+# Set up logging
+########################################################################
+logger = logging.getLogger(__name__)
+logger.debug("about to start the tests")
+
+
+########################################################################
+# ListHandler class
+########################################################################
+class ListHandler(logging.Handler):
+    """Handler that keeps the records it handles."""
+
+    def __init__(self, hold: Optional[threading.Event] = None) -> None:
+        """Initialize the object.
+
+        Args:
+            hold: if specified, the first record is not handled until
+                the event is set
+
+        """
+        super().__init__()
+        self.hold = hold
+        self.holding = threading.Event()
+        self.records: list[logging.LogRecord] = []
+        self.thread_names: list[str] = []
+        self.num_flushes = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Keep a record.
+
+        Args:
+            record: the log record
+
+        """
+        if self.hold is not None and not self.records:
+            self.holding.set()
+            self.hold.wait()
+        self.records.append(record)
+        self.thread_names.append(threading.current_thread().name)
+
+    def flush(self) -> None:
+        """Count the flushes."""
+        self.num_flushes += 1
+
+    def get_msgs(self) -> list[str]:
+        """Return the messages of the records.
+
+        Returns:
+            The messages of the records that were handled
+
+        """
+        return [record.getMessage() for record in self.records]
+
+
+########################################################################
+# TestLogQueueCorrectSource
+########################################################################
+class TestLogQueueCorrectSource:
+    """Verify that we are testing with correctly built code."""
+
+    ####################################################################
+    # test_log_queue_correct_source
+    ####################################################################
+    def test_log_queue_correct_source(self) -> None:
+        """Test log_queue correct source."""
+        if "TOX_ENV_NAME" in os.environ:
+            verify_lib(obj_to_check=LogQueue)
+
+
+########################################################################
+# TestLogQueue class
+########################################################################
+class TestLogQueue:
+    """Test LogQueue."""
+
+    ####################################################################
+    # test_log_queue_repr
+    ####################################################################
+    def test_log_queue_repr(self) -> None:
+        """Test LogQueue repr."""
+        assert repr(LogQueue()) == "LogQueue(batch_size=100)"
+        assert repr(LogQueue(batch_size=5)) == "LogQueue(batch_size=5)"
+
+        with pytest.raises(ValueError, match="batch_size of 0 is less than 1"):
+            LogQueue(batch_size=0)
+
+    ####################################################################
+    # test_log_queue_threads
+    ####################################################################
+    def test_log_queue_threads(self) -> None:
+        """Test records from several threads are handled in order."""
+        handler = ListHandler()
+        handler.setLevel(logging.INFO)
+        log_queue = LogQueue(handlers=[handler])
+        log_queue.start()
+        log_queue.start()  # already started
+
+        def f1(thread_num: int) -> None:
+            for idx in range(50):
+                log_queue.log(logger, logging.INFO, f"{thread_num} {idx}")
+                # below the level of the handler
+                log_queue.log(logger, logging.DEBUG, f"{thread_num} debug")
+
+        threads = [threading.Thread(target=f1, args=(idx,)) for idx in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert log_queue.flush(timeout=10)
+
+        msgs = handler.get_msgs()
+        assert len(msgs) == 200
+        for thread_num in range(4):
+            assert [msg for msg in msgs if msg.startswith(f"{thread_num} ")] == [
+                f"{thread_num} {idx}" for idx in range(50)
+            ]
+        assert set(handler.thread_names) == {"LogQueueListener"}
+        assert {record.threadName for record in handler.records} == {
+            thread.name for thread in threads
+        }
+
+        log_queue.stop()
+        log_queue.stop()  # already stopped
+        assert log_queue.flush()
+
+        # a record logged after the stop is handled in the thread that
+        # logs it
+        log_queue.log(logger, logging.INFO, "after stop")
+        assert handler.get_msgs()[-1] == "after stop"
+        assert handler.thread_names[-1] == threading.current_thread().name
+
+    ####################################################################
+    # test_log_queue_batches
+    ####################################################################
+    def test_log_queue_batches(self) -> None:
+        """Test the handlers are flushed once for each batch."""
+        hold = threading.Event()
+        handler = ListHandler(hold=hold)
+        log_queue = LogQueue(handlers=[handler], batch_size=3)
+        log_queue.start()
+
+        log_queue.log(logger, logging.WARNING, "0")
+        assert handler.holding.wait(timeout=10)
+        for idx in range(1, 7):
+            log_queue.log(logger, logging.WARNING, f"{idx}")
+        hold.set()
+        log_queue.flush()
+
+        assert handler.get_msgs() == [f"{idx}" for idx in range(7)]
+        # one batch of the first record and two batches of three
+        assert handler.num_flushes == 3
+
+        # the records still queued are handled by stop
+        hold.clear()
+        handler.records = []
+        handler.hold = hold
+        log_queue.log(logger, logging.WARNING, "0")
+        assert handler.holding.wait(timeout=10)
+        for idx in range(1, 8):
+            log_queue.log(logger, logging.WARNING, f"{idx}")
+        threading.Timer(0.1, hold.set).start()
+        log_queue_mod._log_queues_at_exit()
+        assert handler.get_msgs() == [f"{idx}" for idx in range(8)]
+
+    ####################################################################
+    # test_log_queue_stop_race
+    ####################################################################
+    def test_log_queue_stop_race(self) -> None:
+        """Test stop while other threads log and flush."""
+        for _ in range(20):
+            handler = ListHandler()
+            log_queue = LogQueue(handlers=[handler], batch_size=5)
+            log_queue.start()
+            barrier = threading.Barrier(5)
+            num_flushed = []
+
+            def log_msgs(thread_num: int) -> None:
+                barrier.wait()
+                for idx in range(200):
+                    log_queue.log(logger, logging.WARNING, f"{thread_num} {idx}")
+
+            def flush_queue() -> None:
+                barrier.wait()
+                for _ in range(50):
+                    assert log_queue.flush()
+                num_flushed.append(50)
+
+            threads = [
+                threading.Thread(target=log_msgs, args=(idx,)) for idx in range(3)
+            ]
+            threads.append(threading.Thread(target=flush_queue))
+            for thread in threads:
+                thread.start()
+            barrier.wait()
+            log_queue.stop()
+            for thread in threads:
+                thread.join(timeout=10)
+                assert not thread.is_alive()
+
+            # every record is handled once, whether before or after the
+            # stop, and no flush is left waiting
+            assert sorted(handler.get_msgs()) == sorted(
+                f"{thread_num} {idx}" for thread_num in range(3) for idx in range(200)
+            )
+            assert num_flushed == [50]
+
+    ####################################################################
+    # test_log_queue_filters
+    ####################################################################
+    def test_log_queue_filters(self) -> None:
+        """Test log drops records of disabled and filtered loggers."""
+        handler = ListHandler()
+        log_queue = LogQueue(handlers=[handler])
+        filter_logger = logging.getLogger(f"{__name__}.filters")
+        filter_logger.setLevel(logging.INFO)
+
+        def drop_secret(record: logging.LogRecord) -> bool:
+            return "secret" not in record.getMessage()
+
+        filter_logger.addFilter(drop_secret)
+        log_queue.start()
+        try:
+            log_queue.log(filter_logger, logging.INFO, "shown 1")
+            log_queue.log(filter_logger, logging.INFO, "a secret")
+            log_queue.log(filter_logger, logging.DEBUG, "not enabled")
+            filter_logger.disabled = True
+            log_queue.log(filter_logger, logging.INFO, "disabled")
+            filter_logger.disabled = False
+            log_queue.log(filter_logger, logging.INFO, "shown 2")
+            assert log_queue.flush(timeout=10)
+        finally:
+            filter_logger.removeFilter(drop_secret)
+            log_queue.stop()
+
+        assert handler.get_msgs() == ["shown 1", "shown 2"]
+
+    ####################################################################
+    # test_log_queue_handler
+    ####################################################################
+    def test_log_queue_handler(self) -> None:
+        """Test the QueueHandler and the handlers of the loggers."""
+        parent_handler = ListHandler()
+        parent_logger = logging.getLogger(f"{__name__}.parent")
+        parent_logger.addHandler(parent_handler)
+        parent_logger.propagate = False
+        child_logger = logging.getLogger(f"{__name__}.parent.child")
+        child_logger.setLevel(logging.INFO)
+
+        # by default, the handlers of the logger and its ancestors are
+        # used, other than the QueueHandler
+        log_queue = LogQueue()
+        parent_logger.addHandler(log_queue.handler)
+        log_queue.start()
+        try:
+            log_queue.log(child_logger, logging.INFO, "from the child")
+            log_queue.log(child_logger, logging.DEBUG, "not enabled")
+            assert log_queue.flush(timeout=10)
+        finally:
+            parent_logger.removeHandler(log_queue.handler)
+            log_queue.stop()
+
+        assert parent_handler.get_msgs() == ["from the child"]
+        assert parent_handler.thread_names == ["LogQueueListener"]
+
+        # the QueueHandler in place of the handler of the logger
+        parent_logger.removeHandler(parent_handler)
+        log_queue = LogQueue(handlers=[parent_handler])
+        parent_logger.addHandler(log_queue.handler)
+        log_queue.start()
+        try:
+            child_logger.info("from %s", "the QueueHandler")
+            assert log_queue.flush(timeout=10)
+        finally:
+            parent_logger.removeHandler(log_queue.handler)
+            log_queue.stop()
+
+        assert parent_handler.get_msgs() == [
+            "from the child",
+            "from the QueueHandler",
+        ]
+        assert parent_handler.thread_names == ["LogQueueListener"] * 2
+
+
+########################################################################
+# TestLogQueueOptIn class
+########################################################################
+class TestLogQueueOptIn:
+    """Test etrace, diag_msg, and Msgs with a LogQueue."""
+
+    ####################################################################
+    # test_log_queue_etrace
+    ####################################################################
+    def test_log_queue_etrace(self, caplog: pytest.LogCaptureFixture) -> None:
+        """Test etrace with a log queue.
+
+        Args:
+            caplog: pytest fixture to capture log output
+
+        """
+        log_queue = LogQueue()
+        log_queue.start()
+
+        @etrace(log_queue=log_queue, omit_caller=True, correlate=True)
+        def f1(a1: int) -> int:
+            return a1
+
+        caplog.set_level(logging.DEBUG)
+        assert f1(42) == 42
+        log_queue.stop()
+
+        records = [record for record in caplog.records if record.name == __name__]
+        assert [record.getMessage().split(" ", 1)[1] for record in records] == [
+            "entry: a1=42",
+            "exit: return_value=42",
+        ]
+        for record in records:
+            assert record.threadName == threading.current_thread().name
+            assert record.lineno == 0
+        assert records[1].__dict__["etrace_call_id"] == (
+            records[0].__dict__["etrace_call_id"]
+        )
+
+    ####################################################################
+    # test_log_queue_diag_msg
+    ####################################################################
+    def test_log_queue_diag_msg(self, capsys: pytest.CaptureFixture[str]) -> None:
+        """Test diag_msg with a log queue.
+
+        Args:
+            capsys: pytest fixture to capture print output
+
+        """
+        handler = ListHandler()
+        log_queue = LogQueue(handlers=[handler])
+        log_queue.start()
+        set_diag_msg_log_queue(log_queue, level=logging.WARNING)
+        try:
+            diag_msg("hello", 42, sep="|")
+        finally:
+            set_diag_msg_log_queue(None)
+            log_queue.stop()
+        diag_msg("printed")
+
+        assert len(handler.records) == 1
+        assert handler.records[0].name == "scottbrian_utils.diag_msg"
+        assert handler.records[0].levelno == logging.WARNING
+        assert handler.get_msgs()[0].endswith(
+            "test_log_queue.py::TestLogQueueOptIn.test_log_queue_diag_msg:"
+            f"{self.test_log_queue_diag_msg.__code__.co_firstlineno + 12}|hello|42"
+        )
+        assert capsys.readouterr().out.endswith(" printed\n")
+
+    ####################################################################
+    # test_log_queue_msgs
+    ####################################################################
+    def test_log_queue_msgs(self, caplog: pytest.LogCaptureFixture) -> None:
+        """Test Msgs with a log queue.
+
+        Args:
+            caplog: pytest fixture to capture log output
+
+        """
+        log_queue = LogQueue()
+        log_queue.start()
+        msgs = Msgs(log_queue=log_queue)
+        caplog.set_level(logging.DEBUG)
+        with pytest.raises(GetMsgTimedOut):
+            msgs.get_msg("alpha", timeout=0.1)
+        log_queue.stop()
+
+        records = [
+            record
+            for record in caplog.records
+            if record.name == "scottbrian_utils.msgs"
+        ]
+        assert len(records) == 1
+        assert "timed out on get_msg for recipient: alpha" in records[0].getMessage()
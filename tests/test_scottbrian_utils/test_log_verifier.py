@@ -31,6 +31,8 @@ from scottbrian_utils.diag_msg import get_formatted_call_sequence
 from scottbrian_utils.log_verifier import (
     InvalidLogNameSpecified,
     InvalidStrColWidthSpecified,
+    PatternsReadOnly,
+    SnapshotMismatch,
     UnmatchedExpectedMessages,
     UnmatchedActualMessages,
     UnmatchedPatterns,
@@ -3811,3 +3813,259 @@ class TestLogVerCombos:
             exp_num_unmatched_log_msgs=len(unmatched_msgs2),
             exp_num_matched_log_msgs=len(matched_msgs2),
         )
+
+
+########################################################################
+# TestLogVerThreads class
+########################################################################
+class TestLogVerThreads:
+    """Test LogVer with patterns added from multiple threads."""
+
+    ####################################################################
+    # test_log_verifier_thread_stress
+    ####################################################################
+    @pytest.mark.parametrize("num_threads_arg", [1, 2, 8, 16])
+    @pytest.mark.parametrize("num_msgs_arg", [1, 10, 100])
+    def test_log_verifier_thread_stress(
+        self,
+        num_threads_arg: int,
+        num_msgs_arg: int,
+        caplog: pytest.LogCaptureFixture,
+    ) -> None:
+        """Test log_verifier with concurrent add_pattern and test_msg.
+
+        Args:
+            num_threads_arg: number of threads adding patterns
+            num_msgs_arg: number of messages issued by each thread
+            caplog: pytest fixture to capture log output
+
+        """
+        t_logger = logging.getLogger("stress_1")
+        log_ver = LogVer(log_name="stress_1")
+        start_barrier = threading.Barrier(num_threads_arg)
+
+        def f1(thread_idx: int) -> None:
+            start_barrier.wait()
+            for msg_idx in range(num_msgs_arg):
+                if msg_idx % 2:
+                    log_ver.test_msg(f"thread_{thread_idx}_msg_{msg_idx}")
+                else:
+                    log_ver.add_pattern(
+                        pattern=f"thread_{thread_idx}_pattern_{msg_idx}"
+                    )
+                    t_logger.debug(f"thread_{thread_idx}_pattern_{msg_idx}")
+
+        # the patterns added before the threads start and after they
+        # end are first and last
+        log_ver.add_pattern(pattern="main_first")
+        t_logger.debug("main_first")
+
+        threads = [
+            threading.Thread(target=f1, args=(idx,)) for idx in range(num_threads_arg)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        log_ver.add_pattern(pattern="main_last")
+        t_logger.debug("main_last")
+
+        ################################################################
+        # the merged order must be deterministic and must preserve the
+        # order in which each thread added its patterns
+        ################################################################
+        num_patterns = num_threads_arg * num_msgs_arg + 2
+        patterns = log_ver.patterns
+        assert patterns is log_ver.patterns
+        assert len(patterns) == num_patterns
+        assert patterns[0][2] == "main_first"
+        assert patterns[-1][2] == "main_last"
+
+        for thread_idx in range(num_threads_arg):
+            thread_patterns = [
+                pattern[2]
+                for pattern in patterns
+                if pattern[2].startswith(f"thread_{thread_idx}_")
+            ]
+            assert len(thread_patterns) == num_msgs_arg
+            for msg_idx, pattern in enumerate(thread_patterns):
+                assert pattern.endswith(f"_{msg_idx}")
+
+        match_results = log_ver.get_match_results(caplog=caplog)
+        log_ver.verify_match_results(match_results)
+
+        assert match_results.num_patterns == num_patterns
+        assert match_results.num_matched_patterns == num_patterns
+        assert match_results.num_unmatched_patterns == 0
+        assert match_results.num_log_msgs == num_patterns
+        assert match_results.num_matched_log_msgs == num_patterns
+        assert match_results.num_unmatched_log_msgs == 0
+
+    ####################################################################
+    # test_log_verifier_thread_order
+    ####################################################################
+    def test_log_verifier_thread_order(self) -> None:
+        """Test patterns added in turn by two threads stay in turn."""
+        log_ver = LogVer(log_name="order_1")
+        turns = [threading.Event(), threading.Event()]
+
+        def f1(thread_idx: int) -> None:
+            for msg_idx in range(20):
+                assert turns[thread_idx].wait(timeout=10)
+                turns[thread_idx].clear()
+                log_ver.add_pattern(pattern=f"thread_{thread_idx}_{msg_idx}")
+                turns[1 - thread_idx].set()
+
+        threads = [threading.Thread(target=f1, args=(idx,)) for idx in range(2)]
+        for thread in threads:
+            thread.start()
+        turns[0].set()
+        for thread in threads:
+            thread.join()
+
+        assert [pattern[2] for pattern in log_ver.patterns] == [
+            f"thread_{thread_idx}_{msg_idx}"
+            for msg_idx in range(20)
+            for thread_idx in range(2)
+        ]
+
+    ####################################################################
+    # test_log_verifier_patterns_read_only
+    ####################################################################
+    def test_log_verifier_patterns_read_only(self) -> None:
+        """Test the patterns are cached and can not be changed."""
+        log_ver = LogVer(log_name="read_only_1")
+        log_ver.add_pattern(pattern="pattern_0")
+        patterns = log_ver.patterns
+        assert patterns == [("read_only_1", logging.DEBUG, "pattern_0", True)]
+        assert log_ver.patterns is patterns
+
+        # appending to the patterns is deprecated and adds the pattern
+        # to the LogVer
+        with pytest.warns(DeprecationWarning, match="LogVer.add_pattern"):
+            patterns.append(("read_only_1", logging.INFO, "pattern_1", False))
+        assert patterns == [("read_only_1", logging.DEBUG, "pattern_0", True)]
+        assert log_ver.patterns is not patterns
+        assert log_ver.patterns == [
+            ("read_only_1", logging.DEBUG, "pattern_0", True),
+            ("read_only_1", logging.INFO, "pattern_1", False),
+        ]
+
+        patterns = log_ver.patterns
+        with pytest.raises(PatternsReadOnly):
+            patterns.insert(0, ("read_only_1", logging.DEBUG, "pattern_2", True))
+        with pytest.raises(PatternsReadOnly):
+            del patterns[0]
+        with pytest.raises(PatternsReadOnly):
+            patterns[0] = ("read_only_1", logging.DEBUG, "pattern_2", True)
+        with pytest.raises(PatternsReadOnly):
+            patterns.clear()
+        assert log_ver.patterns is patterns
+        assert len(patterns) == 2
+
+
+########################################################################
+# TestLogVerSnapshot class
+########################################################################
+class TestLogVerSnapshot:
+    """Test LogVer golden snapshots."""
+
+    ####################################################################
+    # test_log_verifier_snapshot_match
+    ####################################################################
+    def test_log_verifier_snapshot_match(
+        self,
+        tmp_path: Any,
+        caplog: pytest.LogCaptureFixture,
+    ) -> None:
+        """Test log_verifier snapshot with masked volatile fields.
+
+        Args:
+            tmp_path: pytest fixture for a temporary directory
+            caplog: pytest fixture to capture log output
+
+        """
+        t_logger = logging.getLogger("snapshot_1")
+        snapshot_path = tmp_path / "snapshot_1.golden"
+
+        log_ver = LogVer(log_name="snapshot_1")
+        t_logger.debug("started at 10:11:12.123456")
+        t_logger.debug("caller: test_mod.py::Cls1.f1:42")
+        t_logger.debug("caller: test_mod.py::Cls1.f1:42")
+        t_logger.error("request id=17 failed")
+
+        # first verify records the snapshot
+        log_ver.verify_snapshot(caplog, snapshot_path)
+        assert snapshot_path.exists()
+        snapshot_lines = snapshot_path.read_text().splitlines()
+        assert len(snapshot_lines) == 4
+        assert '["snapshot_1",10,"started at <time>",1]' in snapshot_lines
+        assert '["snapshot_1",10,"caller: test_mod.py::Cls1.f1:<line>",2]' in (
+            snapshot_lines
+        )
+
+        # a later run with different times and line numbers matches
+        caplog.clear()
+        log_ver = LogVer(log_name="snapshot_1")
+        log_ver.add_snapshot_mask(r"id=\d+", "id=<id>")
+        t_logger.error("request id=18 failed")
+        t_logger.debug("caller: test_mod.py::Cls1.f1:43")
+        t_logger.debug("started at 23:59:59.000001")
+        t_logger.debug("caller: test_mod.py::Cls1.f1:44")
+
+        with pytest.raises(SnapshotMismatch):
+            # the id mask was not used when the snapshot was saved
+            log_ver.verify_snapshot(caplog, snapshot_path)
+
+        log_ver.save_snapshot(caplog, snapshot_path)
+        log_ver.verify_snapshot(caplog, snapshot_path)
+
+        caplog.clear()
+        t_logger.debug("caller: test_mod.py::Cls1.f1:45")
+        t_logger.error("request id=19 failed")
+        t_logger.debug("caller: test_mod.py::Cls1.f1:46")
+        t_logger.debug("started at 01:02:03.456789")
+        log_ver.verify_snapshot(caplog, snapshot_path)
+
+    ####################################################################
+    # test_log_verifier_snapshot_mismatch
+    ####################################################################
+    def test_log_verifier_snapshot_mismatch(
+        self,
+        tmp_path: Any,
+        capsys: pytest.CaptureFixture[str],
+        caplog: pytest.LogCaptureFixture,
+    ) -> None:
+        """Test log_verifier snapshot per-group differences.
+
+        Args:
+            tmp_path: pytest fixture for a temporary directory
+            capsys: pytest fixture to capture print output
+            caplog: pytest fixture to capture log output
+
+        """
+        t_logger = logging.getLogger("snapshot_2")
+        snapshot_path = tmp_path / "snapshot_2.golden"
+
+        log_ver = LogVer(log_name="snapshot_2")
+        t_logger.debug("hello")
+        t_logger.debug("hello")
+        t_logger.debug("goodbye")
+        log_ver.save_snapshot(caplog, snapshot_path)
+
+        caplog.clear()
+        t_logger.debug("hello")
+        t_logger.debug("see you soon")
+        capsys.readouterr()
+
+        with pytest.raises(SnapshotMismatch, match="There are 3 log record groups"):
+            log_ver.verify_snapshot(caplog, snapshot_path)
+
+        captured_lines = capsys.readouterr().out.splitlines()
+        assert captured_lines[-4:] == [
+            "log_name   level log_msg      golden current",
+            "snapshot_2    10 goodbye           1       0",
+            "snapshot_2    10 hello             2       1",
+            "snapshot_2    10 see you soon      0       1",
+        ]
@@ -0,0 +1,431 @@
+"""test_memoize.py module."""
+
+########################################################################
+# Standard Library
+########################################################################
+import inspect
+import logging
+import os
+import threading
+import time
+from collections.abc import Generator
+from typing import Any
+
+########################################################################
+# Third Party
+########################################################################
+import pytest
+
+########################################################################
+# Local
+########################################################################
+from scottbrian_utils.entry_trace import etrace
+from scottbrian_utils.memoize import CacheKeyBuilder, CacheStats, memoize
+from scottbrian_utils.testlib_verifier import verify_lib
+
+########################################################################
+# Set up logging
+########################################################################
+logger = logging.getLogger(__name__)
+logger.debug("about to start the tests")
+
+
+########################################################################
+# TestMemoizeCorrectSource
+########################################################################
+class TestMemoizeCorrectSource:
+    """Verify that we are testing with correctly built code."""
+
+    ####################################################################
+    # test_memoize_correct_source
+    ####################################################################
+    def test_memoize_correct_source(self) -> None:
+        """Test memoize correct source."""
+        if "TOX_ENV_NAME" in os.environ:
+            verify_lib(obj_to_check=memoize)
+
+
+########################################################################
+# TestMemoizeErrors class
+########################################################################
+class TestMemoizeErrors:
+    """Test memoize errors."""
+
+    ####################################################################
+    # test_memoize_errors
+    ####################################################################
+    @pytest.mark.parametrize(
+        "memoize_kwargs, exp_msg",
+        [
+            ({"max_size": 0}, "max_size of 0 is less than 1"),
+            ({"ttl_secs": 0}, "ttl_secs of 0 is not positive"),
+            ({"omit_parms": ["a2"]}, "a2 specified in omit_parms is not a known"),
+        ],
+    )
+    def test_memoize_errors(self, memoize_kwargs: dict[str, Any], exp_msg: str) -> None:
+        """Test memoize with bad arguments.
+
+        Args:
+            memoize_kwargs: the bad argument
+            exp_msg: the expected error message
+
+        """
+        with pytest.raises(ValueError, match=exp_msg):
+
+            @memoize(**memoize_kwargs)  # type: ignore[untyped-decorator]
+            def f1(a1: int) -> int:
+                return a1
+
+    ####################################################################
+    # test_memoize_generator
+    ####################################################################
+    def test_memoize_generator(self) -> None:
+        """Test memoize on a generator function."""
+        with pytest.raises(TypeError, match="since it is a coroutine or generator"):
+
+            @memoize
+            def gen1() -> Generator[int, None, None]:
+                yield 1
+
+
+########################################################################
+# TestMemoize class
+########################################################################
+class TestMemoize:
+    """Test memoize."""
+
+    ####################################################################
+    # test_memoize_keys
+    ####################################################################
+    @pytest.mark.parametrize("max_key_funcs_arg", [32, 0])
+    def test_memoize_keys(
+        self, max_key_funcs_arg: int, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test the calls that share a cache entry.
+
+        Args:
+            max_key_funcs_arg: the number of key functions generated,
+                with 0 to build all of the keys one value at a time
+            monkeypatch: pytest fixture to set max_key_funcs
+
+        """
+        monkeypatch.setattr(CacheKeyBuilder, "max_key_funcs", max_key_funcs_arg)
+        calls = []
+
+        @memoize(omit_parms=["verbose", "kw_omit"])
+        def f1(
+            a1: int,
+            a2: Any = 2,
+            *args: Any,
+            verbose: bool = False,
+            **kwargs: Any,
+        ) -> int:
+            calls.append((a1, a2, args, kwargs))
+            return len(calls)
+
+        # positional, keyword, and default values make the same key
+        assert f1(1) == 1
+        assert f1(1, 2) == 1
+        assert f1(a2=2, a1=1) == 1
+        assert f1(1, verbose=True) == 1
+        assert f1(1, 3) == 2
+
+        # *args and **kwargs, in any order of the keyword arguments
+        assert f1(1, 2, 3, x=1, y=2) == 3
+        assert f1(1, 2, 3, y=2, x=1, kw_omit=5) == 3
+        assert f1(1, 2, 3, 4, x=1, y=2) == 4
+
+        # unhashable values of the builtin types are frozen, and a list
+        # does not match a tuple
+        assert f1(1, [1, {"k": {2, 3}}]) == 5
+        assert f1(1, [1, {"k": {3, 2}}]) == 5
+        assert f1(1, (1, {"k": {2, 3}})) == 6
+        assert f1(1, (1, {"k": {2, 3}})) == 6
+
+        # other unhashable values and bad arguments are not cached
+        class Unhashable:
+            __hash__ = None  # type: ignore
+
+        unhashable = Unhashable()
+        assert f1(1, unhashable) == 7
+        assert f1(1, unhashable) == 8
+        with pytest.raises(TypeError):
+            f1()  # type: ignore[call-arg]
+        with pytest.raises(TypeError):
+            f1(1, a1=1)  # type: ignore[misc]
+
+        assert f1.cache_info() == CacheStats(  # type: ignore[attr-defined]
+            hits=6, misses=6, waits=0, uncached=4, evictions=0, size=6
+        )
+
+        f1.cache_clear()  # type: ignore[attr-defined]
+        assert f1.cache_info() == CacheStats(0, 0, 0, 0, 0, 0)  # type: ignore
+        assert f1(1) == 9
+
+    ####################################################################
+    # test_memoize_max_key_funcs
+    ####################################################################
+    def test_memoize_max_key_funcs(self) -> None:
+        """Test the number of generated key functions is limited."""
+
+        def f1(a1: int, a2: int = 2, *args: Any, **kwargs: Any) -> None:
+            pass
+
+        key_builder = CacheKeyBuilder(
+            parms=list(inspect.signature(f1).parameters.values()),
+            omit_parms={"k0"},
+        )
+        for idx in range(CacheKeyBuilder.max_key_funcs + 8):
+            extras = ((f"k{idx}", "v"),) if idx else ()
+            assert key_builder.get_key(None, (idx,), {f"k{idx}": "v", "a2": 3}) == (
+                None,
+                idx,
+                3,
+                (),
+                extras,
+            )
+
+        assert len(key_builder.key_funcs) == CacheKeyBuilder.max_key_funcs
+
+    ####################################################################
+    # test_memoize_positional_only
+    ####################################################################
+    def test_memoize_positional_only(self) -> None:
+        """Test a keyword argument named as a positional-only parm."""
+
+        @memoize
+        def f1(a1: int, /, **kwargs: Any) -> tuple[int, dict[str, Any]]:
+            return a1, kwargs
+
+        assert f1(1, a1=2) == (1, {"a1": 2})
+        assert f1(1, a1=3) == (1, {"a1": 3})
+        assert f1(1) == (1, {})
+
+    ####################################################################
+    # test_memoize_lru
+    ####################################################################
+    def test_memoize_lru(self) -> None:
+        """Test the least recently used entry is evicted."""
+        calls = []
+
+        @memoize(max_size=2)
+        def f1(a1: int) -> int:
+            calls.append(a1)
+            return a1
+
+        for a1 in (1, 2, 1, 3, 2, 1):
+            f1(a1)
+
+        # 2 is evicted by 3 since 1 was used after it, then 1 is evicted
+        # by 2
+        assert calls == [1, 2, 3, 2, 1]
+        assert f1.cache_info() == CacheStats(  # type: ignore[attr-defined]
+            hits=1, misses=5, waits=0, uncached=0, evictions=3, size=2
+        )
+
+    ####################################################################
+    # test_memoize_ttl
+    ####################################################################
+    def test_memoize_ttl(self) -> None:
+        """Test entries expire after their time to live."""
+        calls = []
+
+        @memoize(max_size=None, ttl_secs=0.05)
+        def f1(a1: int) -> int:
+            calls.append(a1)
+            return a1
+
+        f1(1)
+        f1(1)
+        time.sleep(0.1)
+        f1(1)
+
+        assert calls == [1, 1]
+        assert f1.cache_info().hits == 1  # type: ignore[attr-defined]
+
+    ####################################################################
+    # test_memoize_methods
+    ####################################################################
+    def test_memoize_methods(self) -> None:
+        """Test memoize on methods."""
+        calls = []
+
+        class Cls1:
+            def __init__(self, factor: int) -> None:
+                self.factor = factor
+
+            @memoize
+            def m1(self, a1: int) -> int:
+                calls.append("m1")
+                return a1 * self.factor
+
+            @memoize
+            @classmethod
+            def m2(cls, a1: int) -> int:
+                calls.append("m2")
+                return a1
+
+            @memoize
+            @staticmethod
+            def m3(a1: int) -> int:
+                calls.append("m3")
+                return a1
+
+        cls1a = Cls1(2)
+        cls1b = Cls1(3)
+        # each instance has its own entries
+        assert [cls1a.m1(2), cls1b.m1(2), cls1a.m1(a1=2)] == [4, 6, 4]
+        assert [Cls1.m2(1), cls1a.m2(1), Cls1.m3(1), cls1b.m3(1)] == [1, 1, 1, 1]
+        assert calls == ["m1", "m1", "m2", "m3"]
+        assert cls1a.m1.cache_info().hits == 1  # type: ignore[attr-defined]
+        assert Cls1.m2.cache_info().hits == 1  # type: ignore[attr-defined]
+        assert cls1a.m3.cache_info().hits == 1  # type: ignore[attr-defined]
+
+    ####################################################################
+    # test_memoize_single_flight
+    ####################################################################
+    @pytest.mark.parametrize("fail_arg", [False, True])
+    def test_memoize_single_flight(self, fail_arg: bool) -> None:
+        """Test concurrent calls with the same key call once.
+
+        Args:
+            fail_arg: if True, the call raises an exception
+
+        """
+        num_threads = 4
+        calls = []
+        barrier = threading.Barrier(num_threads)
+        started = threading.Event()
+
+        @memoize
+        def f1(a1: int) -> int:
+            calls.append(a1)
+            started.set()
+            # wait for the other threads to be waiting for this call
+            while f1.cache_info().waits < num_threads - 1:  # type: ignore
+                time.sleep(0.01)
+            if fail_arg:
+                raise ValueError("f1 failed")
+            return a1
+
+        results: list[Any] = []
+
+        def run_f1() -> None:
+            barrier.wait()
+            try:
+                results.append(f1(1))
+            except ValueError as exc:
+                results.append(str(exc))
+
+        threads = [threading.Thread(target=run_f1) for _ in range(num_threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert calls == [1]
+        assert results == ["f1 failed" if fail_arg else 1] * num_threads
+        assert f1.cache_info() == CacheStats(  # type: ignore[attr-defined]
+            hits=0,
+            misses=1,
+            waits=num_threads - 1,
+            uncached=0,
+            evictions=0,
+            size=0 if fail_arg else 1,
+        )
+
+    ####################################################################
+    # test_memoize_recursive
+    ####################################################################
+    def test_memoize_recursive(self) -> None:
+        """Test recursive calls with the same and other keys."""
+
+        @memoize
+        def fib(num: int) -> int:
+            return num if num < 2 else fib(num - 1) + fib(num - 2)
+
+        assert fib(30) == 832040
+        assert fib.cache_info() == CacheStats(  # type: ignore[attr-defined]
+            hits=28, misses=31, waits=0, uncached=0, evictions=0, size=31
+        )
+
+        num_calls = 0
+
+        @memoize
+        def f1(a1: int) -> int:
+            nonlocal num_calls
+            num_calls += 1
+            if num_calls == 1:
+                # the same call does not wait for itself
+                return f1(a1) + 1
+            return a1
+
+        assert f1(1) == 2
+        assert f1(1) == 2
+        assert f1.cache_info() == CacheStats(  # type: ignore[attr-defined]
+            hits=1, misses=1, waits=0, uncached=1, evictions=0, size=1
+        )
+
+    ####################################################################
+    # test_memoize_etrace
+    ####################################################################
+    def test_memoize_etrace(self, caplog: pytest.LogCaptureFixture) -> None:
+        """Test etrace applied to a memoized function.
+
+        Args:
+            caplog: pytest fixture to capture log output
+
+        """
+        calls = []
+
+        @etrace(omit_caller=True)
+        @memoize
+        def f1(a1: int, a2: int = 2) -> int:
+            calls.append(a1)
+            return a1 * a2
+
+        caplog.set_level(logging.DEBUG)
+        assert f1(3) == 6
+        assert f1(a1=3) == 6
+
+        log_msgs = [
+            record.getMessage() for record in caplog.records if record.name == __name__
+        ]
+        assert len(log_msgs) == 4
+        # etrace and memoize bind the arguments the same way
+        assert log_msgs[0].endswith(
+            f"f1:{f1.__code__.co_firstlineno} entry: a1=3, a2=2"
+        )
+        assert log_msgs[2].endswith(" entry: a1=3, a2=2")
+        assert calls == [3]
+        assert f1.cache_info().hits == 1  # type: ignore[attr-defined]
+
+    ####################################################################
+    # test_memoize_stacked
+    ####################################################################
+    def test_memoize_stacked(self) -> None:
+        """Test each memoize of a function has its own cache_info."""
+
+        def f1(a1: int) -> int:
+            return a1
+
+        inner = memoize(f1, omit_parms=["a1"])
+        outer = memoize(inner)
+        assert not hasattr(f1, "cache_info")
+
+        assert outer(1) == 1
+        assert outer(1) == 1
+        # the outer cache is hit for the second call, so the inner
+        # function is called only once, and a call with another
+        # argument is a hit on the inner cache, which omits a1
+        assert outer(2) == 1
+        assert outer.cache_info() == CacheStats(  # type: ignore[attr-defined]
+            hits=1, misses=2, waits=0, uncached=0, evictions=0, size=2
+        )
+        assert inner.cache_info() == CacheStats(  # type: ignore[attr-defined]
+            hits=1, misses=1, waits=0, uncached=0, evictions=0, size=1
+        )
+
+        outer.cache_clear()  # type: ignore[attr-defined]
+        assert outer.cache_info().size == 0  # type: ignore[attr-defined]
+        assert inner.cache_info().size == 1  # type: ignore[attr-defined]
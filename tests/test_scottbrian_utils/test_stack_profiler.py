@@ -0,0 +1,213 @@
+"""test_stack_profiler.py module."""
+
+########################################################################
+# Standard Library
+########################################################################
+import io
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+########################################################################
+# Third Party
+########################################################################
+import pytest
+
+########################################################################
+# Local
+########################################################################
+from scottbrian_utils.stack_profiler import StackProfiler
+from scottbrian_utils.testlib_verifier import verify_lib
+
+########################################################################
+# Set up logging
+########################################################################
+logger = logging.getLogger(__name__)
+logger.debug("about to start the tests")
+
+
+########################################################################
+# busy functions to be sampled
+########################################################################
+def busy_outer(secs: float) -> None:
+    """Call busy_inner.
+
+    Args:
+        secs: number of seconds to be busy
+
+    """
+    busy_inner(secs)
+
+
+def busy_inner(secs: float) -> None:
+    """Loop for the given number of seconds.
+
+    Args:
+        secs: number of seconds to be busy
+
+    """
+    stop_time = time.time() + secs
+    while time.time() < stop_time:
+        pass
+
+
+class BusyCls:
+    """Class with a busy method."""
+
+    def busy_method(self, secs: float) -> None:
+        """Loop for the given number of seconds.
+
+        Args:
+            secs: number of seconds to be busy
+
+        """
+        busy_inner(secs)
+
+
+########################################################################
+# TestStackProfilerCorrectSource
+########################################################################
+class TestStackProfilerCorrectSource:
+    """Verify that we are testing with correctly built code."""
+
+    ####################################################################
+    # test_stack_profiler_correct_source
+    ####################################################################
+    def test_stack_profiler_correct_source(self) -> None:
+        """Test stack_profiler correct source."""
+        if "TOX_ENV_NAME" in os.environ:
+            verify_lib(obj_to_check=StackProfiler)
+
+
+########################################################################
+# TestStackProfiler class
+########################################################################
+class TestStackProfiler:
+    """Test StackProfiler."""
+
+    ####################################################################
+    # test_stack_profiler_repr
+    ####################################################################
+    def test_stack_profiler_repr(self) -> None:
+        """Test StackProfiler repr."""
+        assert repr(StackProfiler()) == (
+            "StackProfiler(interval=0.005, max_depth=200, line_nums=True, "
+            "per_thread=True)"
+        )
+        assert repr(StackProfiler(interval=0.01, line_nums=False)) == (
+            "StackProfiler(interval=0.01, max_depth=200, line_nums=False, "
+            "per_thread=True)"
+        )
+
+    ####################################################################
+    # test_stack_profiler_folded_stacks
+    ####################################################################
+    @pytest.mark.parametrize("line_nums_arg", [True, False])
+    def test_stack_profiler_folded_stacks(self, line_nums_arg: bool) -> None:
+        """Test the folded stacks of the main thread and a thread.
+
+        Args:
+            line_nums_arg: if True, include line numbers in the labels
+
+        """
+        busy_thread = threading.Thread(
+            target=BusyCls().busy_method, args=(0.3,), name="BusyThread"
+        )
+        with StackProfiler(interval=0.001, line_nums=line_nums_arg) as profiler:
+            busy_thread.start()
+            busy_outer(0.3)
+            busy_thread.join()
+
+        assert profiler.num_samples > 0
+        folded_stacks = profiler.get_folded_stacks()
+        assert folded_stacks
+
+        outer_label = "test_stack_profiler.py::busy_outer"
+        inner_label = "test_stack_profiler.py::busy_inner"
+        method_label = "test_stack_profiler.py::BusyCls.busy_method"
+        main_stacks = []
+        thread_stacks = []
+        for folded_stack in folded_stacks:
+            stack, count = folded_stack.rsplit(" ", 1)
+            assert int(count) > 0
+            labels = stack.split(";")
+            assert "StackProfiler" not in labels[0]
+            for label in labels[1:]:
+                assert (":" in label.rsplit("::", 1)[-1]) == line_nums_arg
+            if labels[0] == threading.main_thread().name:
+                main_stacks.append(labels)
+            elif labels[0] == "BusyThread":
+                thread_stacks.append(labels)
+
+        assert any(
+            labels[-2].startswith(outer_label) and labels[-1].startswith(inner_label)
+            for labels in main_stacks
+        )
+        assert any(
+            labels[-2].startswith(method_label) and labels[-1].startswith(inner_label)
+            for labels in thread_stacks
+        )
+
+        if not line_nums_arg:
+            # all lines of busy_inner are combined under one label
+            assert [labels[-1] for labels in main_stacks].count(inner_label) == 1
+
+    ####################################################################
+    # test_stack_profiler_combined_threads
+    ####################################################################
+    def test_stack_profiler_combined_threads(self) -> None:
+        """Test the samples of all threads are combined."""
+        busy_threads = [
+            threading.Thread(target=busy_inner, args=(0.2,)) for _ in range(3)
+        ]
+        with StackProfiler(
+            interval=0.001, line_nums=False, per_thread=False
+        ) as profiler:
+            for busy_thread in busy_threads:
+                busy_thread.start()
+            for busy_thread in busy_threads:
+                busy_thread.join()
+
+        inner_stacks = [
+            folded_stack
+            for folded_stack in profiler.get_folded_stacks()
+            if folded_stack.rsplit(" ", 1)[0].endswith("busy_inner")
+        ]
+        assert len(inner_stacks) == 1
+        assert inner_stacks[0].startswith("threading.py::Thread._bootstrap")
+
+    ####################################################################
+    # test_stack_profiler_write
+    ####################################################################
+    def test_stack_profiler_write(self, tmp_path: Path) -> None:
+        """Test writing the folded stacks.
+
+        Args:
+            tmp_path: pytest fixture for a temporary directory
+
+        """
+        profiler = StackProfiler(interval=0.001, max_depth=3)
+        profiler.start()
+        profiler.start()  # already started is ignored
+        busy_outer(0.1)
+        profiler.stop()
+        profiler.stop()  # already stopped is ignored
+
+        num_samples = profiler.num_samples
+        busy_outer(0.05)
+        assert profiler.num_samples == num_samples
+
+        stream = io.StringIO()
+        profiler.write_folded_stacks(stream)
+        file_name = tmp_path / "stacks.folded"
+        profiler.write_folded_stacks(file_name)
+
+        exp_text = "".join(f"{line}\n" for line in profiler.get_folded_stacks())
+        assert stream.getvalue() == exp_text
+        assert file_name.read_text() == exp_text
+
+        for line in exp_text.splitlines():
+            # thread name plus at most max_depth frames
+            assert len(line.rsplit(" ", 1)[0].split(";")) <= 4
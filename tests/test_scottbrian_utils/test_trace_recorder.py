@@ -0,0 +1,249 @@
+"""test_trace_recorder.py module."""
+
+########################################################################
+# Standard Library
+########################################################################
+import asyncio
+import io
+import json
+import logging
+import os
+import threading
+from collections.abc import Generator
+from pathlib import Path
+
+########################################################################
+# Third Party
+########################################################################
+import pytest
+
+########################################################################
+# Local
+########################################################################
+from scottbrian_utils.entry_trace import etrace
+from scottbrian_utils.trace_recorder import TraceRecorder
+from scottbrian_utils.testlib_verifier import verify_lib
+
+########################################################################
+# Set up logging
+########################################################################
+logger = logging.getLogger(__name__)
+logger.debug("about to start the tests")
+
+
+########################################################################
+# TestTraceRecorderCorrectSource
+########################################################################
+class TestTraceRecorderCorrectSource:
+    """Verify that we are testing with correctly built code."""
+
+    ####################################################################
+    # test_trace_recorder_correct_source
+    ####################################################################
+    def test_trace_recorder_correct_source(self) -> None:
+        """Test trace_recorder correct source."""
+        if "TOX_ENV_NAME" in os.environ:
+            verify_lib(obj_to_check=TraceRecorder)
+
+
+########################################################################
+# TestTraceRecorder class
+########################################################################
+class TestTraceRecorder:
+    """Test TraceRecorder."""
+
+    ####################################################################
+    # test_trace_recorder_repr
+    ####################################################################
+    def test_trace_recorder_repr(self) -> None:
+        """Test TraceRecorder repr."""
+        assert repr(TraceRecorder()) == "TraceRecorder(capacity=65536)"
+        assert repr(TraceRecorder(capacity=8)) == "TraceRecorder(capacity=8)"
+
+        with pytest.raises(ValueError, match="capacity of 0 is less than 1"):
+            TraceRecorder(capacity=0)
+
+    ####################################################################
+    # test_trace_recorder_ring
+    ####################################################################
+    @pytest.mark.parametrize("num_events_arg", [0, 1, 7, 8, 9, 20])
+    def test_trace_recorder_ring(self, num_events_arg: int) -> None:
+        """Test the ring buffer keeps the most recent events.
+
+        Args:
+            num_events_arg: number of events to record
+
+        """
+        recorder = TraceRecorder(capacity=8)
+        f1_id = recorder.register("f1")
+        f2_id = recorder.register("f2")
+        assert (f1_id, f2_id) == (0, 1)
+
+        exp_events = []
+        for idx in range(num_events_arg):
+            func_id = idx % 2
+            is_entry = idx % 3 == 0
+            recorder.record(func_id, is_entry)
+            exp_events.append((("f1", "f2")[func_id], is_entry))
+
+        events = recorder.get_events()
+        assert [(event.func_name, event.is_entry) for event in events] == (
+            exp_events[-8:]
+        )
+        assert all(event.thread_id == threading.get_ident() for event in events)
+        assert [event.time_ns for event in events] == sorted(
+            event.time_ns for event in events
+        )
+
+        recorder.clear()
+        assert recorder.get_events() == []
+
+    ####################################################################
+    # test_trace_recorder_threads
+    ####################################################################
+    def test_trace_recorder_threads(self) -> None:
+        """Test recording from several threads."""
+        recorder = TraceRecorder(capacity=1000)
+        func_id = recorder.register("f1")
+        # the threads wait for each other so that their idents differ
+        barrier = threading.Barrier(4)
+
+        def f1() -> None:
+            barrier.wait()
+            for _ in range(100):
+                recorder.record(func_id, True)
+                recorder.record(func_id, False)
+
+        threads = [threading.Thread(target=f1) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        events = recorder.get_events()
+        assert len(events) == 800
+        assert len({event.thread_id for event in events}) == 4
+
+    ####################################################################
+    # test_trace_recorder_chrome_trace
+    ####################################################################
+    def test_trace_recorder_chrome_trace(self, tmp_path: Path) -> None:
+        """Test the Chrome trace event output.
+
+        Args:
+            tmp_path: pytest fixture for a temporary directory
+
+        """
+        recorder = TraceRecorder()
+        func_id = recorder.register("f1")
+
+        def f2() -> None:
+            recorder.record(func_id, True)
+            recorder.record(func_id, False)
+
+        f2()
+        thread = threading.Thread(target=f2, name="RecThread")
+        thread.start()
+        thread.join()
+
+        chrome_trace = recorder.get_chrome_trace()
+        assert chrome_trace["displayTimeUnit"] == "ns"
+        trace_events = chrome_trace["traceEvents"]
+        events = recorder.get_events()
+        assert len(trace_events) == 5
+        for trace_event, event in zip(trace_events, events):
+            assert trace_event == {
+                "name": "f1",
+                "ph": "B" if event.is_entry else "E",
+                "ts": event.time_ns / 1000,
+                "pid": os.getpid(),
+                "tid": event.thread_id,
+            }
+        # the thread that ended has no thread_name metadata
+        assert trace_events[4] == {
+            "name": "thread_name",
+            "ph": "M",
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": {"name": threading.current_thread().name},
+        }
+
+        stream = io.StringIO()
+        recorder.write_chrome_trace(stream)
+        file_name = tmp_path / "trace.json"
+        recorder.write_chrome_trace(file_name)
+        assert json.loads(stream.getvalue()) == chrome_trace
+        assert json.loads(file_name.read_text()) == chrome_trace
+
+
+########################################################################
+# TestTraceRecorderEtrace class
+########################################################################
+class TestTraceRecorderEtrace:
+    """Test etrace with a TraceRecorder."""
+
+    ####################################################################
+    # test_trace_recorder_etrace
+    ####################################################################
+    def test_trace_recorder_etrace(self, caplog: pytest.LogCaptureFixture) -> None:
+        """Test etrace records into the recorder instead of logging.
+
+        Args:
+            caplog: pytest fixture to capture log output
+
+        """
+        recorder = TraceRecorder()
+
+        @etrace(recorder=recorder, sample_every=2)
+        def f1(a1: int) -> int:
+            if a1 < 0:
+                raise ValueError("negative")
+            return a1 * 2
+
+        class Cls1:
+            @etrace(recorder=recorder)
+            def m1(self) -> None:
+                f1(2)
+
+        @etrace(recorder=recorder)
+        def gen1() -> Generator[int, None, None]:
+            yield 1
+            yield 2
+
+        @etrace(recorder=recorder)
+        async def coro1() -> int:
+            return f1(4)
+
+        caplog.set_level(logging.DEBUG)
+        assert f1(1) == 2
+        assert f1(2) == 4  # not sampled
+        with pytest.raises(ValueError):
+            f1(-1)
+        Cls1().m1()  # f1 not sampled
+        assert list(gen1()) == [1, 2]
+        assert asyncio.run(coro1()) == 8
+
+        assert not [record for record in caplog.records if record.name == __name__]
+
+        labels = [
+            f"{event.func_name.split('::')[1].split(':')[0]} "
+            f"{'entry' if event.is_entry else 'exit'}"
+            for event in recorder.get_events()
+        ]
+        assert labels == [
+            "f1 entry",
+            "f1 exit",
+            "f1 entry",
+            "f1 exit",
+            "Cls1.m1 entry",
+            "Cls1.m1 exit",
+            "gen1 entry",
+            "gen1 exit",
+            "coro1 entry",
+            "f1 entry",
+            "f1 exit",
+            "coro1 exit",
+        ]
+        assert recorder.get_events()[0].func_name.startswith(
+            "test_trace_recorder.py::f1:"
+        )